@@ -73,6 +73,13 @@ class Config:
     # SNOWFLAKE.CORTEX.COMPLETE con CORTEX_ENABLED_CROSS_REGION='ANY_REGION'.
     cortex_modelo: str = field(default_factory=lambda: _env("SF_CORTEX_MODELO", "claude-sonnet-4-6"))
     proveedor_defecto: str = field(default_factory=lambda: _env("PROVEEDOR_REDACCION", "cortex"))
+    # Carrera (opt-in): el siguiente proveedor de la cadena arranca si el primero tarda
+    # más de REDACCION_COBERTURA_MS (0 = ambos a la vez); gana la primera respuesta válida.
+    redaccion_carrera: bool = field(default_factory=lambda: _env_bool("REDACCION_CARRERA", False))
+    redaccion_cobertura_ms: int = field(default_factory=lambda: _env_int("REDACCION_COBERTURA_MS", 4000))
+    # En vivo: la prosa se transmite por fragmentos (etapa "texto_parcial") y las cifras se
+    # verifican frase a frase. No aplica en carrera (no hay un único proveedor que transmitir).
+    redaccion_en_vivo: bool = field(default_factory=lambda: _env_bool("REDACCION_EN_VIVO", True))
 
     # ── Identidad de la app (telemetría estándar GIC 2026-05-13) ────
     app_nombre: str = field(default_factory=lambda: _env("APP_NOMBRE", "exportbot"))
@@ -82,6 +89,20 @@ class Config:
     # ── Telemetría / auditoría ──────────────────────────────────────
     telemetria_activa: bool = field(default_factory=lambda: _env_bool("TELEMETRIA_ACTIVA", True))
     esquema_telemetria: str = field(default_factory=lambda: _env("SF_ESQUEMA_TELEMETRIA", ""))
+    telemetria_lote_filas: int = field(default_factory=lambda: _env_int("TELEMETRIA_LOTE_FILAS", 500))
+    telemetria_lote_ms: int = field(default_factory=lambda: _env_int("TELEMETRIA_LOTE_MS", 2000))
+    # Spool en disco para desbordes/caídas (0 MB = desactivado, se descarta como antes).
+    telemetria_spool_dir: str = field(
+        default_factory=lambda: _env("TELEMETRIA_SPOOL_DIR", str(RAIZ_PROYECTO / "var" / "spool_telemetria"))
+    )
+    telemetria_spool_max_mb: int = field(default_factory=lambda: _env_int("TELEMETRIA_SPOOL_MAX_MB", 64))
+    # insert = INSERT por lotes (defecto) · stage = EVENT_LOG/UI_EVENT vía PUT + COPY INTO.
+    telemetria_modo: str = field(default_factory=lambda: _env("TELEMETRIA_MODO", "insert").lower())
+    telemetria_stage: str = field(default_factory=lambda: _env("TELEMETRIA_STAGE"))  # ej. DB.SCH.STG_TELEMETRIA
+    telemetria_stage_intervalo_s: int = field(default_factory=lambda: _env_int("TELEMETRIA_STAGE_INTERVALO_S", 60))
+    telemetria_stage_dir: str = field(
+        default_factory=lambda: _env("TELEMETRIA_STAGE_DIR", str(RAIZ_PROYECTO / "var" / "stage_telemetria"))
+    )
 
     # ── Seguridad y límites operativos ──────────────────────────────
     admin_token: str = field(default_factory=lambda: _env("ADMIN_TOKEN"))
@@ -93,6 +114,70 @@ class Config:
     timeout_sql_s: int = field(default_factory=lambda: _env_int("TIMEOUT_SQL_S", 90))
     timeout_analyst_s: int = field(default_factory=lambda: _env_int("TIMEOUT_ANALYST_S", 60))
     timeout_redaccion_s: int = field(default_factory=lambda: _env_int("TIMEOUT_REDACCION_S", 60))
+    # Admisión del chat: flujos simultáneos, cola justa y fichas por usuario (0 = sin tope).
+    chat_max_concurrentes: int = field(default_factory=lambda: _env_int("CHAT_MAX_CONCURRENTES", 16))
+    chat_max_cola: int = field(default_factory=lambda: _env_int("CHAT_MAX_COLA", 64))
+    chat_tasa_por_min: int = field(default_factory=lambda: _env_int("CHAT_TASA_POR_MIN", 20))
+    chat_rafaga: int = field(default_factory=lambda: _env_int("CHAT_RAFAGA", 5))
+
+    # ── Cachés (memoria acotada; 0 entradas = desactivada) ──────────
+    cache_respuestas_max: int = field(default_factory=lambda: _env_int("CACHE_RESPUESTAS_MAX", 256))
+    cache_respuestas_ttl_s: int = field(default_factory=lambda: _env_int("CACHE_RESPUESTAS_TTL_S", 6 * 3600))
+    cache_respuestas_max_mb: int = field(default_factory=lambda: _env_int("CACHE_RESPUESTAS_MAX_MB", 64))
+    cache_sql_max: int = field(default_factory=lambda: _env_int("CACHE_SQL_MAX", 512))
+    cache_sql_max_mb: int = field(default_factory=lambda: _env_int("CACHE_SQL_MAX_MB", 128))
+    # Marca de agua de los datos: si cambia, la caché SQL se vacía (carga mensual).
+    marca_datos_sql: str = field(default_factory=lambda: _env("CACHE_SQL_MARCA_SQL"))
+    marca_intervalo_s: int = field(default_factory=lambda: _env_int("MARCA_INTERVALO_S", 300))
+    cache_analyst_max: int = field(default_factory=lambda: _env_int("CACHE_ANALYST_MAX", 512))
+    cache_analyst_ttl_s: int = field(default_factory=lambda: _env_int("CACHE_ANALYST_TTL_S", 24 * 3600))
+    # Resultados completos por chat_id (paginación): LRU en memoria que derrama a disco.
+    resultados_max: int = field(default_factory=lambda: _env_int("RESULTADOS_MAX", 64))
+    resultados_max_mb: int = field(default_factory=lambda: _env_int("RESULTADOS_MAX_MB", 128))
+    resultados_ttl_s: int = field(default_factory=lambda: _env_int("RESULTADOS_TTL_S", 2 * 3600))
+    resultados_dir: str = field(
+        default_factory=lambda: _env("RESULTADOS_DIR", str(RAIZ_PROYECTO / "var" / "resultados"))
+    )
+    resultados_disco_max_mb: int = field(default_factory=lambda: _env_int("RESULTADOS_DISCO_MAX_MB", 512))
+    # Tope de filas de los exportes CSV/Parquet/Arrow leídos del cursor (RESULT_SCAN), por lotes.
+    export_max_filas: int = field(default_factory=lambda: _env_int("EXPORT_MAX_FILAS", 1_000_000))
+    # Exportes leídos del cursor a la vez: cada uno retiene una conexión del pool mientras el
+    # cliente descarga, así que se acota por debajo de SF_POOL_MAX (el chat conserva el resto).
+    export_cursor_max: int = field(default_factory=lambda: _env_int("EXPORT_CURSOR_MAX", 2))
+    # Exportes Excel/PPTX en segundo plano: procesos del pool (0 = apagado), cupo y vida del archivo.
+    export_trabajadores: int = field(default_factory=lambda: _env_int("EXPORT_TRABAJADORES", 2))
+    export_trabajos_max: int = field(default_factory=lambda: _env_int("EXPORT_TRABAJOS_MAX", 32))
+    export_trabajos_ttl_s: int = field(default_factory=lambda: _env_int("EXPORT_TRABAJOS_TTL_S", 3600))
+    export_trabajos_dir: str = field(
+        default_factory=lambda: _env("EXPORT_TRABAJOS_DIR", str(RAIZ_PROYECTO / "var" / "exportes"))
+    )
+    # Caché por contenido de los Excel/PPTX generados (memoria + disco; 0 entradas = desactivada).
+    export_cache_max: int = field(default_factory=lambda: _env_int("EXPORT_CACHE_MAX", 64))
+    export_cache_max_mb: int = field(default_factory=lambda: _env_int("EXPORT_CACHE_MAX_MB", 64))
+    export_cache_ttl_s: int = field(default_factory=lambda: _env_int("EXPORT_CACHE_TTL_S", 6 * 3600))
+    export_cache_dir: str = field(
+        default_factory=lambda: _env("EXPORT_CACHE_DIR", str(RAIZ_PROYECTO / "var" / "cache_exportes"))
+    )
+    export_cache_disco_max_mb: int = field(default_factory=lambda: _env_int("EXPORT_CACHE_DISCO_MAX_MB", 512))
+
+    # ── Consultas verificadas (atajo sin Analyst para preguntas conocidas) ──
+    verificadas_activas: bool = field(default_factory=lambda: _env_bool("VERIFICADAS_ACTIVAS", True))
+    verificadas_umbral_pct: int = field(default_factory=lambda: _env_int("VERIFICADAS_UMBRAL_PCT", 80))
+
+    # ── Pool de conexiones Snowflake ────────────────────────────────
+    pool_min: int = field(default_factory=lambda: _env_int("SF_POOL_MIN", 1))
+    pool_max: int = field(default_factory=lambda: _env_int("SF_POOL_MAX", 8))
+    pool_espera_s: int = field(default_factory=lambda: _env_int("SF_POOL_ESPERA_S", 30))
+    pool_inactividad_s: int = field(default_factory=lambda: _env_int("SF_POOL_INACTIVIDAD_S", 600))
+    # Filas por lectura al driver (memoria por lote en ejecutar_select_por_lotes).
+    sf_lote_filas: int = field(default_factory=lambda: _env_int("SF_LOTE_FILAS", 1000))
+    # Circuito de reconexión: tras N fallos seguidos se reintenta en segundo plano.
+    circuito_fallos: int = field(default_factory=lambda: _env_int("SF_CIRCUITO_FALLOS", 2))
+    circuito_espera_s: int = field(default_factory=lambda: _env_int("SF_CIRCUITO_ESPERA_S", 5))
+    circuito_espera_max_s: int = field(default_factory=lambda: _env_int("SF_CIRCUITO_ESPERA_MAX_S", 60))
+    # Sesión HTTP compartida (Cortex Analyst y proveedores LLM): conexiones vivas por host.
+    http_pool_max: int = field(default_factory=lambda: _env_int("HTTP_POOL_MAX", 10))
+    http_reintentos: int = field(default_factory=lambda: _env_int("HTTP_REINTENTOS", 2))
 
     # ── Alcance de datos permitido para la SQL generada ─────────────
     esquemas_permitidos_crudo: str = field(default_factory=lambda: _env("ESQUEMAS_PERMITIDOS", ""))
@@ -126,6 +211,35 @@ class Config:
             base.add(self.esquema_telemetria.upper())
         return frozenset(base)
 
+    @property
+    def consulta_marca_datos(self) -> str:
+        """SQL escalar cuya variación indica datos nuevos (por defecto, LAST_ALTERED del esquema)."""
+        if self.marca_datos_sql:
+            return self.marca_datos_sql
+        return (
+            f"SELECT TO_VARCHAR(MAX(LAST_ALTERED)) FROM {self.sf_database}.INFORMATION_SCHEMA.TABLES "
+            f"WHERE TABLE_SCHEMA = '{self.sf_schema.upper()}'"
+        )
+
+    @property
+    def consulta_huella_semantica(self) -> str:
+        """SQL cuya primera fila identifica la versión de la fuente semántica.
+
+        YAML en stage: ``LIST`` devuelve tamaño, md5 y fecha del archivo.
+        Vista semántica: ``SHOW SEMANTIC VIEWS`` cambia con cada CREATE OR REPLACE.
+        """
+        if self.semantic_model_file:
+            return f"LIST {self.semantic_model_file}"
+        partes = self.semantic_view.split(".")
+        nombre = partes[-1]
+        ambito = ".".join(partes[:-1]) if len(partes) == 3 else f"{self.sf_database}.{self.sf_schema}"
+        return f"SHOW SEMANTIC VIEWS LIKE '{nombre}' IN SCHEMA {ambito}"
+
+    @property
+    def stage_telemetria(self) -> str:
+        """Stage interno para la carga masiva (por defecto ``<esquema>.STG_TELEMETRIA``)."""
+        return self.telemetria_stage or f"{self.esquema_telemetria}.STG_TELEMETRIA"
+
     @property
     def fuente_semantica(self) -> dict[str, str]:
         """Cuerpo parcial para la API de Analyst: vista semántica o YAML en stage."""
@@ -154,6 +268,8 @@ class Config:
             problemas.append("Defina SF_SEMANTIC_VIEW o SF_SEMANTIC_MODEL_FILE.")
         if self.telemetria_activa and not self.esquema_telemetria:
             problemas.append("TELEMETRIA_ACTIVA=true exige SF_ESQUEMA_TELEMETRIA (ej. DB_EXPORTBOT.TELEMETRY).")
+        if self.telemetria_modo not in {"insert", "stage"}:
+            problemas.append(f"TELEMETRIA_MODO='{self.telemetria_modo}' no reconocido (use insert o stage).")
         return problemas
 
 
@@ -1,67 +1,139 @@
-"""Excel institucional de un resultado de ExportBot (openpyxl, server-side)."""
+"""Excel institucional de un resultado de ExportBot (openpyxl, server-side).
+
+Se escribe en modo *write-only*: cada fila sale al XML de la hoja en cuanto
+llega (``filas`` puede ser un generador por lotes) y la memoria no crece
+con el resultado. Los estilos son estilos con nombre registrados una vez
+por libro; cada columna reutiliza dos celdas prototipo (texto y número)
+ya estilizadas, en vez de crear un `Border`, un relleno y un formato por
+celda. Los anchos salen de una muestra de las primeras filas, porque en
+este modo las columnas se declaran antes de escribir la primera.
+"""
 
 from __future__ import annotations
 
 import io
+from collections.abc import Iterable, Iterator, Sequence
 from datetime import datetime
+from itertools import chain, islice
+from typing import IO, Any
 from zoneinfo import ZoneInfo
 
 _TZ_BOGOTA = ZoneInfo("America/Bogota")
-from typing import Any
 
 from openpyxl import Workbook
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 
 from config import VERSION_APP
 from exportadores import ADVERTENCIA_LEGAL, AZUL_INSTITUCIONAL
 
 _MAX_ANCHO = 60
+_MUESTRA_ANCHOS = 200  # filas que se miran para dimensionar las columnas
+_TROZO_BYTES = 64 * 1024  # lectura del archivo ya generado hacia la respuesta
 
 
-def construir(pregunta: str, texto: str, sql: str, columnas: list[str], filas: list[list[Any]]) -> bytes:
-    """Construye el archivo .xlsx con pregunta, respuesta, tabla, SQL y advertencia."""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Resultado"
-
-    titulo = Font(bold=True, size=14, color=AZUL_INSTITUCIONAL)
-    etiqueta = Font(bold=True, size=10, color=AZUL_INSTITUCIONAL)
-    cab_fill = PatternFill("solid", fgColor=AZUL_INSTITUCIONAL)
-    cab_font = Font(bold=True, color="FFFFFF")
+def _registrar_estilos(wb: Workbook) -> None:
+    """Estilos con nombre del libro (``eb_*``): se guardan una vez en styles.xml."""
     borde = Border(*(Side(style="thin", color="C9D2E0"),) * 4)
+    etiqueta = Font(bold=True, size=10, color=AZUL_INSTITUCIONAL)
+    for estilo in (
+        NamedStyle("eb_titulo", font=Font(bold=True, size=14, color=AZUL_INSTITUCIONAL)),
+        NamedStyle("eb_etiqueta", font=etiqueta),
+        NamedStyle("eb_ajuste", font=DEFAULT_FONT, alignment=Alignment(wrap_text=True, vertical="top")),
+        NamedStyle(
+            "eb_cabecera",
+            font=Font(bold=True, color="FFFFFF"),
+            fill=PatternFill("solid", fgColor=AZUL_INSTITUCIONAL),
+            border=borde,
+        ),
+        NamedStyle("eb_celda", font=DEFAULT_FONT, border=borde),
+        NamedStyle("eb_numero", font=DEFAULT_FONT, border=borde, number_format="#,##0.00"),
+        NamedStyle("eb_legal", font=Font(italic=True, size=8), alignment=Alignment(wrap_text=True)),
+    ):
+        wb.add_named_style(estilo)
 
-    ws["A1"] = "ExportBot 2.0 · ProColombia — Cifras de exportaciones de bienes"
-    ws["A1"].font = titulo
-    ws["A2"] = f"Generado: {datetime.now(_TZ_BOGOTA):%Y-%m-%d %H:%M} · Versión app: {VERSION_APP}"
-    ws["A3"] = "Pregunta:"
-    ws["A3"].font = etiqueta
-    ws["B3"] = pregunta
-    ws["A4"] = "Respuesta:"
-    ws["A4"].font = etiqueta
-    ws["B4"] = texto
-    ws["B4"].alignment = Alignment(wrap_text=True, vertical="top")
-
-    fila_inicio = 6
-    for j, col in enumerate(columnas, start=1):
-        c = ws.cell(row=fila_inicio, column=j, value=col)
-        c.fill, c.font, c.border = cab_fill, cab_font, borde
-    for i, fila in enumerate(filas, start=fila_inicio + 1):
-        for j, v in enumerate(fila, start=1):
-            c = ws.cell(row=i, column=j, value=v)
-            c.border = borde
-            if isinstance(v, (int, float)) and not isinstance(v, bool):
-                c.number_format = "#,##0.00"
+
+def _celda(ws: WriteOnlyWorksheet, valor: Any, estilo: str) -> WriteOnlyCell:
+    c = WriteOnlyCell(ws, value=valor)
+    c.style = estilo
+    return c
+
+
+def _es_numero(v: Any) -> bool:
+    return isinstance(v, int | float) and not isinstance(v, bool)
+
+
+def escribir(
+    destino: IO[bytes],
+    pregunta: str,
+    texto: str,
+    sql: str,
+    columnas: list[str],
+    filas: Iterable[Sequence[Any]],
+) -> int:
+    """Escribe el .xlsx en ``destino`` consumiendo ``filas`` una vez; devuelve cuántas escribió.
+
+    Diseño (igual al de siempre): título y fecha, pregunta, respuesta,
+    tabla con cabecera institucional, SQL ejecutada y advertencia legal.
+    """
+    wb = Workbook(write_only=True)
+    _registrar_estilos(wb)
+    ws = wb.create_sheet("Resultado")
+
+    filas = iter(filas)
+    muestra = list(islice(filas, _MUESTRA_ANCHOS))
     for j, col in enumerate(columnas, start=1):
-        ancho = max([len(str(col))] + [len(str(f[j - 1])) for f in filas[:200] if j - 1 < len(f)] + [10])
+        ancho = max([len(str(col))] + [len(str(f[j - 1])) for f in muestra if j - 1 < len(f)] + [10])
         ws.column_dimensions[get_column_letter(j)].width = min(ancho + 2, _MAX_ANCHO)
 
-    fila_sql = fila_inicio + len(filas) + 2
-    ws.cell(row=fila_sql, column=1, value="SQL ejecutada (auditoría):").font = etiqueta
-    ws.cell(row=fila_sql + 1, column=1, value=sql).alignment = Alignment(wrap_text=True, vertical="top")
-    ws.cell(row=fila_sql + 3, column=1, value=ADVERTENCIA_LEGAL).alignment = Alignment(wrap_text=True)
-    ws.cell(row=fila_sql + 3, column=1).font = Font(italic=True, size=8)
+    ws.append([_celda(ws, "ExportBot 2.0 · ProColombia — Cifras de exportaciones de bienes", "eb_titulo")])
+    ws.append([f"Generado: {datetime.now(_TZ_BOGOTA):%Y-%m-%d %H:%M} · Versión app: {VERSION_APP}"])
+    ws.append([_celda(ws, "Pregunta:", "eb_etiqueta"), pregunta])
+    ws.append([_celda(ws, "Respuesta:", "eb_etiqueta"), _celda(ws, texto, "eb_ajuste")])
+    ws.append([])
+    ws.append([_celda(ws, col, "eb_cabecera") for col in columnas])
+
+    # Celdas prototipo por columna: ``append`` serializa la fila en el acto,
+    # así que la misma celda puede llevar el valor de la fila siguiente.
+    textos = [_celda(ws, None, "eb_celda") for _ in columnas]
+    numeros = [_celda(ws, None, "eb_numero") for _ in columnas]
+    n = 0
+    for fila in chain(muestra, filas):
+        salida = []
+        for j, v in enumerate(fila):
+            if j < len(textos):
+                c = numeros[j] if _es_numero(v) else textos[j]
+            else:  # fila más ancha que las columnas declaradas
+                c = _celda(ws, None, "eb_numero" if _es_numero(v) else "eb_celda")
+            c.value = v
+            salida.append(c)
+        ws.append(salida)
+        n += 1
+
+    ws.append([])
+    ws.append([_celda(ws, "SQL ejecutada (auditoría):", "eb_etiqueta")])
+    ws.append([_celda(ws, sql, "eb_ajuste")])
+    ws.append([])
+    ws.append([_celda(ws, ADVERTENCIA_LEGAL, "eb_legal")])
+    wb.save(destino)
+    return n
 
+
+def construir(pregunta: str, texto: str, sql: str, columnas: list[str], filas: list[list[Any]]) -> bytes:
+    """Construye el archivo .xlsx con pregunta, respuesta, tabla, SQL y advertencia."""
     buf = io.BytesIO()
-    wb.save(buf)
+    escribir(buf, pregunta, texto, sql, columnas, filas)
     return buf.getvalue()
+
+
+def trozos(archivo: IO[bytes], tamano: int = _TROZO_BYTES) -> Iterator[bytes]:
+    """Lee el archivo generado de a ``tamano`` bytes (cuerpo de una respuesta en streaming) y lo cierra."""
+    try:
+        archivo.seek(0)
+        while trozo := archivo.read(tamano):
+            yield trozo
+    finally:
+        archivo.close()
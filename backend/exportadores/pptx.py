@@ -1,9 +1,19 @@
-"""Presentación institucional de un resultado de ExportBot (python-pptx)."""
+"""Presentación institucional de un resultado de ExportBot (python-pptx).
+
+Portada y cierre van por la API de objetos de python-pptx. Las láminas de
+tabla no: fijar texto, tamaño, color y relleno celda por celda con esa API
+es lento, y por eso la tabla quedaba en 30 filas. `_laminas_tabla` crea
+solo el marco de cada tabla con python-pptx y escribe sus filas de una vez
+como DrawingML, a partir de fragmentos ya estilizados (`_CELDA_CABECERA`,
+`_CELDA`). El XML resultante es el mismo que dejaba la API de objetos.
+"""
 
 from __future__ import annotations
 
 import io
+import re
 from datetime import datetime
+from xml.sax.saxutils import escape
 from zoneinfo import ZoneInfo
 
 _TZ_BOGOTA = ZoneInfo("America/Bogota")
@@ -11,6 +21,7 @@ from typing import Any
 
 from pptx import Presentation
 from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
 from pptx.util import Inches, Pt
 
 from config import VERSION_APP
@@ -19,8 +30,22 @@ from exportadores import ADVERTENCIA_LEGAL, AMARILLO_ACENTO, AZUL_INSTITUCIONAL
 _AZUL = RGBColor.from_string(AZUL_INSTITUCIONAL)
 _AMARILLO = RGBColor.from_string(AMARILLO_ACENTO)
 _FILAS_POR_LAMINA = 10
-_MAX_LAMINAS_TABLA = 3
-_MAX_COLUMNAS = 8
+_MAX_LAMINAS_TABLA = 50
+_MAX_COLUMNAS = 8  # ancho de la lámina: más columnas no se leen
+_ALTO_FILA = Inches(0.4)
+
+# Fragmentos DrawingML de las celdas, ya estilizados; ``{parrafos}`` es el texto.
+_NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_PPR_CABECERA = (
+    '<a:pPr><a:defRPr sz="1100" b="1"><a:solidFill><a:srgbClr val="FFFFFF"/></a:solidFill></a:defRPr></a:pPr>'
+)
+_PPR_CELDA = '<a:pPr><a:defRPr sz="1000"/></a:pPr>'
+_CELDA_CABECERA = (
+    "<a:tc><a:txBody><a:bodyPr/><a:lstStyle/>{parrafos}</a:txBody>"
+    f'<a:tcPr><a:solidFill><a:srgbClr val="{AZUL_INSTITUCIONAL}"/></a:solidFill></a:tcPr></a:tc>'
+)
+_CELDA = "<a:tc><a:txBody><a:bodyPr/><a:lstStyle/>{parrafos}</a:txBody><a:tcPr/></a:tc>"
+_RE_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")  # caracteres que XML 1.0 no admite
 
 
 def _lamina_titulo(prs: Presentation, pregunta: str, texto: str) -> None:
@@ -51,36 +76,54 @@ def _lamina_titulo(prs: Presentation, pregunta: str, texto: str) -> None:
     p3.font.size = Pt(10)
 
 
+def _parrafos(texto: str, ppr: str) -> str:
+    """Párrafos de una celda como los deja ``celda.text``: uno por línea, el formato en el primero."""
+    partes = []
+    for k, linea in enumerate(_RE_NO_XML.sub("", texto).split("\n")):
+        run = f"<a:r><a:t>{escape(linea)}</a:t></a:r>" if linea else ""
+        partes.append(f"<a:p>{ppr if k == 0 else ''}{run}</a:p>")
+    return "".join(partes)
+
+
+def _texto(v: Any) -> str:
+    if isinstance(v, float):
+        return f"{v:,.2f}"
+    return "" if v is None else str(v)
+
+
 def _laminas_tabla(prs: Presentation, columnas: list[str], filas: list[list[Any]]) -> None:
+    """Tabla paginada: python-pptx crea el marco; las filas entran en bloque como DrawingML."""
     columnas = columnas[:_MAX_COLUMNAS]
+    n = len(columnas)
+    cabecera = (
+        f'<a:tr h="{_ALTO_FILA}">'
+        + "".join(_CELDA_CABECERA.format(parrafos=_parrafos(str(c), _PPR_CABECERA)) for c in columnas)
+        + "</a:tr>"
+    )
     for bloque in range(0, min(len(filas), _FILAS_POR_LAMINA * _MAX_LAMINAS_TABLA), _FILAS_POR_LAMINA):
         trozo = filas[bloque : bloque + _FILAS_POR_LAMINA]
         lam = prs.slides.add_slide(prs.slide_layouts[6])
         forma = lam.shapes.add_table(
-            rows=len(trozo) + 1,
-            cols=len(columnas),
+            rows=1,
+            cols=n,
             left=Inches(0.4),
             top=Inches(0.5),
             width=prs.slide_width - Inches(0.8),
-            height=Inches(0.4) * (len(trozo) + 1),
+            height=_ALTO_FILA * (len(trozo) + 1),
+        )
+        tbl = forma.table._tbl
+        for tr in tbl.tr_lst:
+            tbl.remove(tr)
+        cuerpo = "".join(
+            f'<a:tr h="{_ALTO_FILA}">'
+            + "".join(
+                _CELDA.format(parrafos=_parrafos(_texto(fila[j] if j < len(fila) else ""), _PPR_CELDA))
+                for j in range(n)
+            )
+            + "</a:tr>"
+            for fila in trozo
         )
-        tabla = forma.table
-        for j, col in enumerate(columnas):
-            celda = tabla.cell(0, j)
-            celda.text = str(col)
-            celda.fill.solid()
-            celda.fill.fore_color.rgb = _AZUL
-            celda.text_frame.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
-            celda.text_frame.paragraphs[0].font.size = Pt(11)
-            celda.text_frame.paragraphs[0].font.bold = True
-        for i, fila in enumerate(trozo, start=1):
-            for j in range(len(columnas)):
-                v = fila[j] if j < len(fila) else ""
-                if isinstance(v, float):
-                    v = f"{v:,.2f}"
-                c = tabla.cell(i, j)
-                c.text = "" if v is None else str(v)
-                c.text_frame.paragraphs[0].font.size = Pt(10)
+        tbl.extend(parse_xml(f'<a:tbl xmlns:a="{_NS_A}">{cabecera}{cuerpo}</a:tbl>'))
 
 
 def _lamina_cierre(prs: Presentation, sql: str) -> None:
@@ -0,0 +1,209 @@
+"""Exportes de datos (CSV, Parquet, Arrow IPC) escritos por lotes mientras se envían.
+
+A diferencia del Excel y el PPTX, estos formatos son para reimportar en
+pandas/Arrow: sin diseño institucional, con los tipos del resultado. Cada
+función recibe las columnas y un iterable de lotes — tablas pyarrow (tal
+como las entrega el conector, sin copiarlas a Python) o listas de columnas —
+y devuelve un generador de trozos de bytes para una respuesta en streaming:
+en memoria solo vive el lote en curso.
+
+El esquema de Parquet y Arrow se fija antes del primer lote: con los
+``tipos`` de cada columna (``bool``/``int``/``float``/``texto``, ver
+`tipos_de`) o, para lotes que ya son tablas Arrow, con el tipo del primer
+lote ensanchado (enteros a ``int64``; una columna toda nula toma su tipo
+de ``tipos`` o texto). Así un lote posterior nunca deja de encajar en un
+archivo cuyas cabeceras ya salieron.
+
+Parquet y Arrow usan ``pyarrow`` (dependencia de runtime, la misma que
+le permite al conector entregar lotes Arrow). Se importa de forma diferida:
+en una instalación sin él responden `FormatoNoDisponible` (501) y el CSV
+sigue funcionando.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+FORMATOS = ("csv", "parquet", "arrow")
+MIME = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+EXTENSION = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}
+
+
+class FormatoNoDisponible(RuntimeError):
+    """El formato pedido necesita una dependencia que no está instalada."""
+
+
+class _Tubo(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que el generador los retira."""
+
+    def __init__(self) -> None:
+        self._partes: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos: Any) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def retirar(self) -> bytes:
+        datos, self._partes = b"".join(self._partes), []
+        return datos
+
+
+def _columnas_python(datos: Any) -> list[list[Any]]:
+    if hasattr(datos, "num_rows"):
+        return [c.to_pylist() for c in datos.columns]
+    return datos
+
+
+def csv_por_lotes(columnas: list[str], lotes: Iterable[Any], contador: Callable[[int], None]) -> Iterator[bytes]:
+    """CSV UTF-8 con cabecera; ``contador(n)`` recibe las filas de cada lote escrito."""
+    buf = io.StringIO()
+    escritor = csv.writer(buf, lineterminator="\n")
+    escritor.writerow(columnas)
+    for datos in lotes:
+        filas = list(zip(*_columnas_python(datos), strict=True))
+        escritor.writerows(filas)
+        contador(len(filas))
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+_TIPOS_SIMPLES = frozenset({"bool", "int", "float"})
+
+
+def _tipo_valor(valor: Any) -> str:
+    if isinstance(valor, bool):
+        return "bool"
+    if isinstance(valor, int):
+        return "int"
+    if isinstance(valor, float):
+        return "float"
+    return "texto"
+
+
+def tipos_de(columnas_valores: Iterable[Iterable[Any]]) -> list[str]:
+    """Tipo de cada columna que admite todos sus valores.
+
+    ``int`` y ``float`` se promueven a ``float``; cualquier otra mezcla (o una
+    columna sin valores) queda como ``texto``.
+    """
+    tipos = []
+    for valores in columnas_valores:
+        vistos = {_tipo_valor(v) for v in valores if v is not None}
+        if vistos == {"int", "float"}:
+            tipos.append("float")
+        elif len(vistos) == 1 and next(iter(vistos)) in _TIPOS_SIMPLES:
+            tipos.append(vistos.pop())
+        else:
+            tipos.append("texto")
+    return tipos
+
+
+def _tipo_arrow(pa: Any, tipo: str) -> Any:
+    return {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64()}.get(tipo, pa.string())
+
+
+def _arreglo(pa: Any, valores: list[Any], tipo: str) -> Any:
+    if tipo == "float":
+        valores = [None if v is None else float(v) for v in valores]
+    elif tipo == "texto":
+        valores = [v if v is None or isinstance(v, str) else str(v) for v in valores]
+    return pa.array(valores, type=_tipo_arrow(pa, tipo))
+
+
+def _esquema(pa: Any, tabla: Any, tipos: list[str] | None) -> Any:
+    """Esquema de un lote Arrow ensanchado para que los lotes siguientes quepan."""
+    campos = []
+    for j, campo in enumerate(tabla.schema):
+        tipo = campo.type
+        if pa.types.is_integer(tipo):
+            tipo = pa.int64()
+        elif pa.types.is_null(tipo):
+            tipo = _tipo_arrow(pa, tipos[j] if tipos else "texto")
+        campos.append(pa.field(campo.name, tipo))
+    return pa.schema(campos)
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ModuleNotFoundError as exc:
+        raise FormatoNoDisponible("Parquet y Arrow requieren pyarrow instalado en el servidor.") from exc
+    return pyarrow
+
+
+def verificar(formato: str) -> None:
+    """Falla antes de abrir la fuente si el formato no puede escribirse aquí.
+
+    Raises:
+        FormatoNoDisponible: Parquet o Arrow sin pyarrow instalado.
+    """
+    if formato != "csv":
+        _pyarrow()
+
+
+def arrow_por_lotes(
+    formato: str,
+    columnas: list[str],
+    lotes: Iterable[Any],
+    contador: Callable[[int], None],
+    tipos: list[str] | None = None,
+) -> Iterator[bytes]:
+    """Parquet (un row group por lote) o Arrow IPC en stream.
+
+    ``tipos`` fija el esquema de los lotes de listas; sin ellos se deducen
+    del primer lote con `tipos_de`.
+
+    Raises:
+        FormatoNoDisponible: sin pyarrow (antes de producir el primer trozo).
+    """
+    pa = _pyarrow()
+    tubo = _Tubo()
+
+    def generar() -> Iterator[bytes]:
+        escritor = None
+        esquema = None
+        fijos = tipos
+        try:
+            for datos in lotes:
+                if hasattr(datos, "num_rows"):
+                    tabla = datos
+                else:
+                    fijos = fijos or tipos_de(datos)
+                    tabla = pa.Table.from_arrays(
+                        [_arreglo(pa, list(c), t) for c, t in zip(datos, fijos, strict=True)], names=columnas
+                    )
+                if esquema is None:
+                    esquema = _esquema(pa, tabla, fijos)
+                    escritor = _abrir(pa, formato, tubo, esquema)
+                if tabla.schema != esquema:
+                    tabla = tabla.cast(esquema)
+                escritor.write_table(tabla)
+                contador(tabla.num_rows)
+                yield tubo.retirar()
+        finally:
+            if escritor is not None:
+                escritor.close()
+        yield tubo.retirar()
+
+    return generar()
+
+
+def _abrir(pa: Any, formato: str, destino: _Tubo, esquema: Any) -> Any:
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(destino, esquema)
+    return pa.ipc.new_stream(destino, esquema)
@@ -9,18 +9,28 @@ mismo dominio, cero CORS, un solo contenedor en Railway (ADR D5).
 from __future__ import annotations
 
 import logging
+import threading
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from middleware import AuditoriaHTTP
 
-from config import RAIZ_PROYECTO, VERSION_APP, cargar_config
+from config import RAIZ_PROYECTO, VERSION_APP, Config, cargar_config
+from motores.admision import ControlAdmision
+from motores.almacen_resultados import AlmacenResultados
+from motores.cache import CacheLRU
+from motores.cache_exportes import CacheExportes
+from motores.cliente_http import cerrar_cliente_http, cerrar_cliente_http_async
+from motores.consultas_verificadas import IndiceVerificadas
 from motores.redactor import proveedores_disponibles
+from motores.trabajos_export import ColaExportes
 from orquestador import Orquestador
-from routers import chat, exportar, metricas, salud, track
+from routers import chat, exportar, metricas, resultados, salud, track
 from snowflake_.analyst import ClienteAnalyst
+from snowflake_.cache_sql import MARCA_DATOS, MARCA_SEMANTICA, CacheResultados, VigiaMarcas
 from snowflake_.conexion import GestorConexion
 from snowflake_.ejecutor import Telemetria
 
@@ -31,6 +41,24 @@ logger = logging.getLogger("exportbot")
 # en desarrollo local vive en frontend/dist. Se sirve el primero que exista.
 _CANDIDATOS_DIST = (RAIZ_PROYECTO / "frontend" / "dist", RAIZ_PROYECTO / "dist")
 DIR_DIST = next((d for d in _CANDIDATOS_DIST if (d / "index.html").exists()), _CANDIDATOS_DIST[0])
+DIR_SEMANTICO = RAIZ_PROYECTO / "semantic"
+
+
+def _indice_verificadas(cfg: Config) -> IndiceVerificadas | None:
+    """Índice de consultas verificadas desde ``semantic/`` (None si está apagado o falta el YAML)."""
+    if not cfg.verificadas_activas:
+        return None
+    try:
+        indice = IndiceVerificadas.desde_yaml(
+            DIR_SEMANTICO / "modelo_exportaciones_analyst.yaml",
+            DIR_SEMANTICO / "preguntas_doradas.yaml",
+            umbral=cfg.verificadas_umbral_pct / 100,
+        )
+    except Exception as exc:  # noqa: BLE001 - sin índice se sigue por Analyst
+        logger.warning("Consultas verificadas no disponibles: %s", exc)
+        return None
+    logger.info("Consultas verificadas: %d plantillas.", len(indice))
+    return indice
 
 
 @asynccontextmanager
@@ -64,7 +92,60 @@ async def ciclo_vida(app: FastAPI):
     fabrica = gestor.fabrica() if con_credenciales else None
     telemetria = Telemetria(cfg, fabrica)
     telemetria.iniciar()
-    analyst = ClienteAnalyst(cfg) if con_credenciales else None
+    marcas = {MARCA_DATOS: cfg.consulta_marca_datos, MARCA_SEMANTICA: cfg.consulta_huella_semantica}
+    vigia = VigiaMarcas(fabrica, marcas, cfg.marca_intervalo_s) if fabrica else None
+    analyst = None
+    if vigia is not None:
+        memo = (
+            CacheLRU(cfg.cache_analyst_max, 16 * 1024 * 1024, cfg.cache_analyst_ttl_s)
+            if cfg.cache_analyst_max > 0
+            else None
+        )
+        analyst = ClienteAnalyst(cfg, memo, lambda: vigia.marca(MARCA_SEMANTICA))
+        vigia.suscribir(lambda nombre, *_: analyst.invalidar_memo() if nombre == MARCA_SEMANTICA else None)
+    cache_respuestas = (
+        CacheLRU(cfg.cache_respuestas_max, cfg.cache_respuestas_max_mb * 1024 * 1024, cfg.cache_respuestas_ttl_s)
+        if cfg.cache_respuestas_max > 0
+        else None
+    )
+    cache_sql = (
+        CacheResultados(cfg.cache_sql_max, cfg.cache_sql_max_mb * 1024 * 1024, vigia)
+        if vigia is not None and cfg.cache_sql_max > 0
+        else None
+    )
+    almacen = AlmacenResultados(
+        cfg.resultados_max,
+        cfg.resultados_max_mb * 1024 * 1024,
+        cfg.resultados_ttl_s,
+        Path(cfg.resultados_dir) if cfg.resultados_dir else None,
+        cfg.resultados_disco_max_mb * 1024 * 1024,
+    )
+    cache_exportes = (
+        CacheExportes(
+            cfg.export_cache_max,
+            cfg.export_cache_max_mb * 1024 * 1024,
+            cfg.export_cache_ttl_s,
+            Path(cfg.export_cache_dir) if cfg.export_cache_dir else None,
+            cfg.export_cache_disco_max_mb * 1024 * 1024,
+        )
+        if cfg.export_cache_max > 0
+        else None
+    )
+    exportes = ColaExportes(
+        cfg.export_trabajadores,
+        cfg.export_trabajos_max,
+        cfg.export_trabajos_ttl_s,
+        Path(cfg.export_trabajos_dir),
+        al_terminar=(
+            (lambda t, ruta: cache_exportes.guardar_archivo(t.clave, t.nombre, ruta))
+            if cache_exportes is not None
+            else None
+        ),
+    )
+    if vigia is not None:
+        if cache_respuestas is not None:
+            vigia.suscribir(lambda *_: cache_respuestas.invalidar())  # datos o modelo nuevos
+        vigia.iniciar()
 
     app.state.cfg = cfg
     app.state.problemas_config = problemas
@@ -72,15 +153,29 @@ async def ciclo_vida(app: FastAPI):
     app.state.llave_rsa_2 = llave_rsa_2 if cfg.modo_auth == "keypair" else ""
     app.state.gestor = gestor
     app.state.telemetria = telemetria
-    app.state.orquestador = Orquestador(cfg, fabrica, telemetria, analyst)
+    app.state.resultados = almacen
+    app.state.exportes = exportes
+    app.state.cache_exportes = cache_exportes
+    app.state.exportes_cursor = threading.BoundedSemaphore(max(1, min(cfg.export_cursor_max, cfg.pool_max - 1)))
+    app.state.orquestador = Orquestador(
+        cfg, fabrica, telemetria, analyst, cache_respuestas, cache_sql, _indice_verificadas(cfg), almacen
+    )
+    app.state.admision = ControlAdmision(
+        cfg.chat_max_concurrentes, cfg.chat_max_cola, cfg.chat_tasa_por_min, cfg.chat_rafaga
+    )
 
     telemetria.log_evento("app_inicio", {"auth": cfg.modo_auth}, detalle=f"arranque {cfg.entorno}")
     logger.info("ExportBot %s listo (auth=%s, telemetria=%s)", VERSION_APP, cfg.modo_auth, telemetria.activa)
     try:
         yield
     finally:
+        if vigia is not None:
+            vigia.detener()
+        exportes.cerrar()
         telemetria.detener()
         gestor.cerrar()
+        cerrar_cliente_http()
+        await cerrar_cliente_http_async()
 
 
 def crear_app() -> FastAPI:
@@ -97,7 +192,7 @@ def crear_app() -> FastAPI:
             allow_headers=["*"],
         )
 
-    for r in (salud.router, chat.router, exportar.router, metricas.router, track.router):
+    for r in (salud.router, chat.router, exportar.router, metricas.router, resultados.router, track.router):
         app.include_router(r, prefix="/api")
 
     @app.get("/api/proveedores")
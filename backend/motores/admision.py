@@ -0,0 +1,224 @@
+"""Control de admisión del chat: tope global, cubetas por usuario y cola justa.
+
+Cada pregunta arranca un ciclo Analyst → warehouse → LLM; sin tope, una
+ráfaga de usuarios reparte la misma cuota entre todos y todos se vuelven
+lentos a la vez. `ControlAdmision` se pone delante del orquestador:
+
+- **Tope global** (``CHAT_MAX_CONCURRENTES``): flujos en curso a la vez.
+- **Cubeta de fichas por usuario** (``CHAT_TASA_POR_MIN`` con ráfaga
+  ``CHAT_RAFAGA``), por ``user_id`` / ``x-user-id`` / ``session_id``: quien
+  se queda sin fichas recibe 429 aunque haya cupo.
+- **Cola justa acotada** (``CHAT_MAX_COLA``): sin cupo, la pregunta espera
+  en una fila por usuario y los cupos que se liberan se reparten por turnos
+  entre usuarios (round-robin), no por orden de llegada: diez preguntas de
+  una misma persona no dejan atrás a la siguiente. Con la cola llena, 429.
+
+Vive en el event loop del servidor: ``solicitar``, ``esperar`` y ``liberar``
+se llaman solo desde código async; ``estadisticas`` es de solo lectura.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+_MAX_CUBETAS = 10_000  # al pasarlo se olvidan las cubetas llenas (usuarios inactivos)
+
+
+class Rechazo(Exception):
+    """La pregunta no se admite: HTTP 429 con ``Retry-After``."""
+
+    def __init__(self, motivo: str, reintentar_en_s: int) -> None:
+        super().__init__(motivo)
+        self.reintentar_en_s = max(1, reintentar_en_s)
+
+
+@dataclass
+class Turno:
+    """Lugar de una pregunta: admitida o esperando en la fila de su usuario."""
+
+    clave: str
+    llegada: float
+    admitido: bool = False
+    liberado: bool = False
+    posicion_inicial: int = 0
+    espera_ms: int = 0
+    inicio: float = 0.0
+    _cambio: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+
+@dataclass
+class _Cubeta:
+    fichas: float
+    ts: float
+
+
+class ControlAdmision:
+    """Admite, encola o rechaza preguntas del chat.
+
+    Args:
+        max_activos: Flujos simultáneos (0 = sin tope).
+        max_cola: Preguntas esperando como máximo; más allá, 429.
+        tasa_por_min: Fichas por minuto y usuario (0 = sin límite por usuario).
+        rafaga: Capacidad de la cubeta (preguntas seguidas permitidas).
+        reloj: Fuente de tiempo monótono (inyectable en pruebas).
+    """
+
+    def __init__(
+        self,
+        max_activos: int,
+        max_cola: int,
+        tasa_por_min: int = 0,
+        rafaga: int = 5,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_activos = max(0, max_activos)
+        self._max_cola = max(0, max_cola)
+        self._tasa_s = max(0, tasa_por_min) / 60
+        self._rafaga = max(1, rafaga)
+        self._reloj = reloj
+        self._cubetas: dict[str, _Cubeta] = {}
+        self._filas: OrderedDict[str, deque[Turno]] = OrderedDict()
+        self.activos = 0
+        self.admitidos = 0
+        self.encolados = 0
+        self.rechazos_cola = 0
+        self.rechazos_tasa = 0
+        self._espera_total_ms = 0
+        self.espera_max_ms = 0
+        self._duracion_prom_s = 10.0  # media móvil del tiempo en curso (para Retry-After)
+
+    @property
+    def en_cola(self) -> int:
+        return sum(len(f) for f in self._filas.values())
+
+    # ------------------------------------------------------------------
+    def solicitar(self, clave: str) -> Turno:
+        """Toma una ficha del usuario y un cupo (o un lugar en la cola).
+
+        Raises:
+            Rechazo: sin fichas para el usuario o con la cola llena.
+        """
+        ahora = self._reloj()
+        self._tomar_ficha(clave, ahora)
+        turno = Turno(clave=clave or "anonimo", llegada=ahora)
+        if self._max_activos == 0 or (self.activos < self._max_activos and not self._filas):
+            self._admitir(turno, ahora)
+            return turno
+        if self.en_cola >= self._max_cola:
+            self.rechazos_cola += 1
+            raise Rechazo(
+                "ExportBot está atendiendo el máximo de preguntas; intente de nuevo en unos segundos.",
+                round(self._duracion_prom_s),
+            )
+        self._filas.setdefault(turno.clave, deque()).append(turno)
+        self.encolados += 1
+        turno.posicion_inicial = self.posicion(turno)
+        return turno
+
+    def _tomar_ficha(self, clave: str, ahora: float) -> None:
+        if self._tasa_s <= 0 or not clave:
+            return
+        cubeta = self._cubetas.get(clave)
+        if cubeta is None:
+            if len(self._cubetas) >= _MAX_CUBETAS:
+                self._olvidar_cubetas_llenas(ahora)
+            cubeta = self._cubetas[clave] = _Cubeta(float(self._rafaga), ahora)
+        cubeta.fichas = min(self._rafaga, cubeta.fichas + (ahora - cubeta.ts) * self._tasa_s)
+        cubeta.ts = ahora
+        if cubeta.fichas < 1:
+            self.rechazos_tasa += 1
+            raise Rechazo(
+                "Demasiadas preguntas seguidas; espere unos segundos antes de la próxima.",
+                int((1 - cubeta.fichas) / self._tasa_s) + 1,
+            )
+        cubeta.fichas -= 1
+
+    def _olvidar_cubetas_llenas(self, ahora: float) -> None:
+        for clave, c in list(self._cubetas.items()):
+            if c.fichas + (ahora - c.ts) * self._tasa_s >= self._rafaga:
+                del self._cubetas[clave]
+
+    def _admitir(self, turno: Turno, ahora: float) -> None:
+        turno.admitido = True
+        turno.inicio = ahora
+        turno.espera_ms = int((ahora - turno.llegada) * 1000)
+        self.activos += 1
+        self.admitidos += 1
+        self._espera_total_ms += turno.espera_ms
+        self.espera_max_ms = max(self.espera_max_ms, turno.espera_ms)
+        turno._cambio.set()
+
+    # ------------------------------------------------------------------
+    def posicion(self, turno: Turno) -> int:
+        """Puesto (1 = el siguiente) según el reparto por turnos; 0 si ya fue admitido."""
+        if turno.admitido or turno.liberado:
+            return 0
+        filas = [list(f) for f in self._filas.values()]
+        puesto = 0
+        for ronda in range(max((len(f) for f in filas), default=0)):
+            for fila in filas:
+                if ronda < len(fila):
+                    puesto += 1
+                    if fila[ronda] is turno:
+                        return puesto
+        return 0
+
+    async def esperar(self, turno: Turno, timeout_s: float) -> None:
+        """Espera a que el turno sea admitido o avance en la cola (o vence ``timeout_s``)."""
+        if turno.admitido:
+            return
+        try:
+            await asyncio.wait_for(turno._cambio.wait(), timeout_s)
+        except TimeoutError:
+            pass
+        turno._cambio.clear()
+
+    def liberar(self, turno: Turno) -> None:
+        """Devuelve el cupo (o sale de la cola) y admite al siguiente. Idempotente."""
+        if turno.liberado:
+            return
+        turno.liberado = True
+        ahora = self._reloj()
+        if turno.admitido:
+            self.activos -= 1
+            self._duracion_prom_s = 0.8 * self._duracion_prom_s + 0.2 * (ahora - turno.inicio)
+        else:
+            fila = self._filas.get(turno.clave)
+            if fila is not None and turno in fila:
+                fila.remove(turno)
+                if not fila:
+                    del self._filas[turno.clave]
+        self._despachar(ahora)
+
+    def _despachar(self, ahora: float) -> None:
+        """Reparte cupos libres por turnos entre usuarios y avisa a toda la cola."""
+        while self._filas and self.activos < self._max_activos:
+            clave, fila = next(iter(self._filas.items()))
+            self._admitir(fila.popleft(), ahora)
+            if fila:
+                self._filas.move_to_end(clave)  # el usuario vuelve al final de la ronda
+            else:
+                del self._filas[clave]
+        for fila in self._filas.values():
+            for turno in fila:
+                turno._cambio.set()  # las posiciones cambiaron
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Activos, en cola, rechazos y espera en cola (para ``/api/salud``)."""
+        return {
+            "max_activos": self._max_activos,
+            "activos": self.activos,
+            "en_cola": self.en_cola,
+            "usuarios_en_cola": len(self._filas),
+            "admitidos": self.admitidos,
+            "encolados": self.encolados,
+            "rechazos_cola": self.rechazos_cola,
+            "rechazos_tasa": self.rechazos_tasa,
+            "espera_prom_ms": round(self._espera_total_ms / self.admitidos) if self.admitidos else 0,
+            "espera_max_ms": self.espera_max_ms,
+        }
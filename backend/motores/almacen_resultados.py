@@ -0,0 +1,345 @@
+"""Resultados completos por ``chat_id``: memoria LRU con derrame a disco y TTL.
+
+Al cliente viajan solo ``MAX_FILAS_CLIENTE`` filas, pero Snowflake ya
+devolvió hasta ``MAX_FILAS_RESULTADO``. `AlmacenResultados` retiene el
+`ResultadoConsulta` completo de cada conversación (con su SQL, pregunta
+y prosa) para paginarlo, ordenarlo y filtrarlo sin repetir el flujo:
+
+- **Memoria**: LRU acotada por entradas y bytes estimados.
+- **Disco**: lo que se desaloja de memoria se escribe como JSON en
+  ``RESULTADOS_DIR`` (tope ``RESULTADOS_DISCO_MAX_MB``; al pasarlo se
+  borran los archivos más viejos) y vuelve a memoria al consultarse.
+- **TTL**: cada entrada vence ``RESULTADOS_TTL_S`` después de guardarse,
+  esté en memoria o en disco.
+- **Referencias**: de cada conversación se recuerda aparte, sin filas, su
+  SQL, prosa y ``query_id`` durante las 24 h en que Snowflake conserva el
+  resultado; vencidas las filas, `referencia` permite releerlas con
+  ``RESULT_SCAN`` en vez de volver a escanear la tabla.
+
+Los archivos se nombran por la huella del ``chat_id`` (nunca por el
+valor recibido) y los de un proceso anterior se borran al arrancar.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from motores.cache import huella
+from snowflake_.ejecutor import ResultadoConsulta
+
+logger = logging.getLogger(__name__)
+
+_PREFIJO = "resultado-"
+_SUFIJO = ".json"
+_TTL_REFERENCIA_S = 23 * 3600  # RESULT_SCAN admite 24 h desde la ejecución; se deja margen
+
+
+@dataclass
+class ResultadoGuardado:
+    """Resultado completo de una conversación y el contexto con que se obtuvo."""
+
+    resultado: ResultadoConsulta
+    sql: str = ""
+    pregunta: str = ""
+    texto: str = ""  # prosa final; se anota cuando termina la redacción
+
+
+def _a_json(guardado: ResultadoGuardado) -> str:
+    r = guardado.resultado
+    return json.dumps(
+        {
+            "sql": guardado.sql,
+            "pregunta": guardado.pregunta,
+            "texto": guardado.texto,
+            "columnas": r.columnas,
+            "filas": r.filas,
+            "n_filas": r.n_filas,
+            "truncado": r.truncado,
+            "duracion_ms": r.duracion_ms,
+            "query_id": r.query_id,
+        },
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def _de_json(crudo: str) -> ResultadoGuardado:
+    d = json.loads(crudo)
+    resultado = ResultadoConsulta(
+        columnas=d["columnas"],
+        filas=d["filas"],
+        n_filas=d["n_filas"],
+        truncado=d["truncado"],
+        duracion_ms=d["duracion_ms"],
+        query_id=d.get("query_id", ""),
+    )
+    return ResultadoGuardado(resultado, sql=d["sql"], pregunta=d["pregunta"], texto=d["texto"])
+
+
+class AlmacenResultados:
+    """Resultados por ``chat_id`` en memoria (LRU) con derrame a disco y vencimiento.
+
+    Args:
+        max_entradas: Conversaciones retenidas en memoria.
+        max_bytes: Presupuesto de memoria estimado (JSON de columnas y filas).
+        ttl_s: Vigencia de cada entrada en segundos (``<= 0`` = sin vencimiento).
+        directorio: Carpeta del derrame a disco; ``None`` lo desactiva (se descarta al desalojar).
+        max_bytes_disco: Tope total de los archivos derramados.
+        max_referencias: Referencias sin filas retenidas (para ``RESULT_SCAN``).
+        reloj: Fuente de tiempo monótono (inyectable en pruebas).
+    """
+
+    def __init__(
+        self,
+        max_entradas: int,
+        max_bytes: int,
+        ttl_s: float,
+        directorio: Path | None = None,
+        max_bytes_disco: int = 512 * 1024 * 1024,
+        max_referencias: int = 4096,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entradas = max(1, int(max_entradas))
+        self._max_bytes = max(1, int(max_bytes))
+        self._ttl_s = ttl_s if ttl_s and ttl_s > 0 else None
+        self._dir = directorio
+        self._max_bytes_disco = max(1, int(max_bytes_disco))
+        self._reloj = reloj
+        self._memoria: OrderedDict[str, tuple[ResultadoGuardado, int, float]] = OrderedDict()
+        self._disco: OrderedDict[str, tuple[Path, int, float]] = OrderedDict()
+        self._referencias: OrderedDict[str, tuple[ResultadoGuardado, float]] = OrderedDict()
+        self._max_referencias = max(1, int(max_referencias))
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.bytes_disco = 0
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.derrames = 0
+        self.descartes = 0
+        self._limpiar_directorio()
+
+    # ------------------------------------------------------------------
+    def guardar(self, chat_id: str, guardado: ResultadoGuardado) -> bool:
+        """Retiene el resultado; ``False`` si por sí solo excede el presupuesto de memoria."""
+        tamano = len(_a_json(guardado).encode("utf-8"))
+        if tamano > self._max_bytes:
+            return False
+        vence = self._reloj() + self._ttl_s if self._ttl_s else 0.0
+        with self._lock:
+            self._quitar(chat_id)
+            self._meter(chat_id, guardado, tamano, vence)
+            self._referir(chat_id, guardado)
+        return True
+
+    def enlazar(self, chat_id: str, origen: str) -> bool:
+        """Sirve bajo ``chat_id`` el resultado de ``origen`` (respuesta de caché o coalescida)."""
+        with self._lock:
+            guardado = self._buscar(origen, contar=False)
+            if guardado is None:
+                return False
+            _, tamano, vence = self._memoria[origen]
+            self._quitar(chat_id)
+            self._meter(chat_id, guardado, tamano, vence)
+            self._referir(chat_id, guardado)
+        return True
+
+    def anotar_texto(self, chat_id: str, texto: str) -> None:
+        """Agrega la prosa final a un resultado ya guardado (si sigue vigente)."""
+        with self._lock:
+            guardado = self._buscar(chat_id, contar=False)
+            if guardado is not None:
+                guardado.texto = texto
+            referencia = self._referencias.get(chat_id)
+            if referencia is not None:
+                referencia[0].texto = texto
+
+    def obtener(self, chat_id: str) -> ResultadoGuardado | None:
+        """Resultado vigente (de memoria o recuperado del disco) o ``None``."""
+        with self._lock:
+            return self._buscar(chat_id, contar=True)
+
+    def referencia(self, chat_id: str) -> ResultadoGuardado | None:
+        """Contexto de una conversación sin sus filas (SQL, prosa, ``query_id``) o ``None``."""
+        with self._lock:
+            entrada = self._referencias.get(chat_id)
+            if entrada is None:
+                return None
+            if self._reloj() >= entrada[1]:
+                del self._referencias[chat_id]
+                return None
+            return entrada[0]
+
+    # ------------------------------------------------------------------
+    def _referir(self, chat_id: str, guardado: ResultadoGuardado) -> None:
+        r = guardado.resultado
+        sin_filas = ResultadoConsulta(columnas=r.columnas, n_filas=r.n_filas, truncado=r.truncado, query_id=r.query_id)
+        copia = ResultadoGuardado(sin_filas, sql=guardado.sql, pregunta=guardado.pregunta, texto=guardado.texto)
+        self._referencias.pop(chat_id, None)
+        self._referencias[chat_id] = (copia, self._reloj() + _TTL_REFERENCIA_S)
+        while len(self._referencias) > self._max_referencias:
+            self._referencias.popitem(last=False)
+
+    def _buscar(self, chat_id: str, *, contar: bool) -> ResultadoGuardado | None:
+        ahora = self._reloj()
+        entrada = self._memoria.get(chat_id)
+        if entrada is not None:
+            guardado, _, vence = entrada
+            if vence and ahora >= vence:
+                self._quitar(chat_id)
+            else:
+                self._memoria.move_to_end(chat_id)
+                if contar:
+                    self.aciertos += 1
+                return guardado
+        en_disco = self._disco.get(chat_id)
+        if en_disco is not None and not (en_disco[2] and ahora >= en_disco[2]):
+            ruta, tamano, vence = en_disco
+            try:
+                guardado = _de_json(ruta.read_text(encoding="utf-8"))
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("Resultado derramado ilegible (%s): %s", ruta.name, exc)
+            else:
+                self._quitar(chat_id)
+                self._meter(chat_id, guardado, tamano, vence)
+                if contar:
+                    self.aciertos_disco += 1
+                return guardado
+        self._quitar(chat_id)
+        if contar:
+            self.fallos += 1
+        return None
+
+    def _meter(self, chat_id: str, guardado: ResultadoGuardado, tamano: int, vence: float) -> None:
+        self._memoria[chat_id] = (guardado, tamano, vence)
+        self.bytes += tamano
+        while len(self._memoria) > self._max_entradas or self.bytes > self._max_bytes:
+            antiguo, (desalojado, tam, venc) = next(iter(self._memoria.items()))
+            del self._memoria[antiguo]
+            self.bytes -= tam
+            self._derramar(antiguo, desalojado, tam, venc)
+
+    def _derramar(self, chat_id: str, guardado: ResultadoGuardado, tamano: int, vence: float) -> None:
+        """Escribe en disco lo desalojado de memoria; sin directorio (o sin espacio) se descarta."""
+        if self._dir is None or tamano > self._max_bytes_disco or (vence and self._reloj() >= vence):
+            self.descartes += 1
+            return
+        ruta = self._dir / f"{_PREFIJO}{huella(chat_id)[:32]}{_SUFIJO}"
+        try:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            ruta.write_text(_a_json(guardado), encoding="utf-8")
+        except OSError as exc:
+            logger.warning("No se pudo derramar el resultado a disco: %s", exc)
+            self.descartes += 1
+            return
+        self._disco[chat_id] = (ruta, tamano, vence)
+        self.bytes_disco += tamano
+        self.derrames += 1
+        while self.bytes_disco > self._max_bytes_disco:
+            antiguo = next(iter(self._disco))
+            self._borrar_de_disco(antiguo)
+            self.descartes += 1
+
+    def _quitar(self, chat_id: str) -> None:
+        entrada = self._memoria.pop(chat_id, None)
+        if entrada is not None:
+            self.bytes -= entrada[1]
+        self._borrar_de_disco(chat_id)
+
+    def _borrar_de_disco(self, chat_id: str) -> None:
+        en_disco = self._disco.pop(chat_id, None)
+        if en_disco is None:
+            return
+        self.bytes_disco -= en_disco[1]
+        en_disco[0].unlink(missing_ok=True)
+
+    def _limpiar_directorio(self) -> None:
+        """Borra los derrames de un proceso anterior (sus ``chat_id`` ya no se conocen)."""
+        if self._dir is None or not self._dir.is_dir():
+            return
+        for ruta in self._dir.glob(f"{_PREFIJO}*{_SUFIJO}"):
+            ruta.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._memoria) + len(self._disco)
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Contadores para ``/api/salud``: entradas y bytes por nivel, aciertos y derrames."""
+        return {
+            "entradas": len(self._memoria),
+            "bytes": self.bytes,
+            "entradas_disco": len(self._disco),
+            "bytes_disco": self.bytes_disco,
+            "aciertos": self.aciertos,
+            "aciertos_disco": self.aciertos_disco,
+            "fallos": self.fallos,
+            "derrames": self.derrames,
+            "descartes": self.descartes,
+            "referencias": len(self._referencias),
+        }
+
+
+# ----------------------------------------------------------------------
+def _clave_orden(valor: Any) -> tuple[int, Any]:
+    """Números antes que texto: tipos mezclados en una columna no se comparan entre sí."""
+    if isinstance(valor, int | float):
+        return (0, valor)
+    return (1, str(valor).lower())
+
+
+def paginar(
+    guardado: ResultadoGuardado,
+    offset: int = 0,
+    limite: int = 100,
+    orden: str = "",
+    descendente: bool = False,
+    filtro: str = "",
+    columna: str = "",
+) -> dict[str, Any]:
+    """Una página de las filas guardadas, filtradas y ordenadas.
+
+    Args:
+        guardado: Resultado de `AlmacenResultados.obtener`.
+        offset: Primera fila de la página (sobre las filas ya filtradas).
+        limite: Filas por página.
+        orden: Columna por la que se ordena (``""`` = orden original).
+        descendente: Invierte el orden (los nulos siguen al final).
+        filtro: Texto que debe aparecer en la celda (sin distinguir mayúsculas).
+        columna: Restringe el filtro a esa columna (``""`` = cualquiera).
+
+    Raises:
+        ValueError: si ``orden`` o ``columna`` no son columnas del resultado.
+    """
+    r = guardado.resultado
+    indices = {nombre: i for i, nombre in enumerate(r.columnas)}
+    for nombre in (orden, columna):
+        if nombre and nombre not in indices:
+            raise ValueError(f"La columna '{nombre}' no existe en el resultado.")
+    filas = r.filas
+    if filtro:
+        aguja = filtro.lower()
+        cols = [indices[columna]] if columna else range(len(r.columnas))
+        filas = [f for f in filas if any(f[i] is not None and aguja in str(f[i]).lower() for i in cols)]
+    if orden:
+        i = indices[orden]
+        nulos = [f for f in filas if f[i] is None]
+        filas = sorted((f for f in filas if f[i] is not None), key=lambda f: _clave_orden(f[i]), reverse=descendente)
+        filas += nulos
+    return {
+        "columnas": r.columnas,
+        "filas": filas[offset : offset + limite],
+        "offset": offset,
+        "limite": limite,
+        "total": len(filas),
+        "n_filas": r.n_filas,
+        "truncado": r.truncado,
+    }
@@ -0,0 +1,134 @@
+"""Caché LRU en memoria con TTL, tope de bytes y contadores de uso.
+
+Una sola implementación para todas las memorias del backend (respuestas
+completas, resultados SQL, Analyst…): thread-safe, acotada por número de
+entradas Y por bytes estimados, con vencimiento opcional por entrada.
+`canonizar` define cuándo dos preguntas son "la misma" para efectos de
+caché: sin mayúsculas, tildes, signos ni espacios repetidos.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+_RE_NO_PALABRA = re.compile(r"[^\w\s]")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def canonizar(texto: str) -> str:
+    """Forma canónica de una pregunta: minúsculas, sin tildes, sin signos, espacios simples."""
+    plano = unicodedata.normalize("NFKD", (texto or "").lower())
+    plano = "".join(c for c in plano if not unicodedata.combining(c))
+    plano = _RE_NO_PALABRA.sub(" ", plano)
+    return _RE_ESPACIOS.sub(" ", plano).strip()
+
+
+def huella(*partes: Any) -> str:
+    """SHA-256 hex de las partes serializadas en JSON estable (clave de caché)."""
+    crudo = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(crudo.encode("utf-8")).hexdigest()
+
+
+def _medir_json(valor: Any) -> int:
+    """Tamaño aproximado en bytes: longitud de su JSON en UTF-8."""
+    return len(json.dumps(valor, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class CacheLRU:
+    """LRU acotada por entradas y bytes, con TTL opcional (``ttl_s=None`` = sin vencimiento).
+
+    Args:
+        max_entradas: Número máximo de claves vivas.
+        max_bytes: Presupuesto de memoria estimado; se desaloja por LRU al superarlo.
+        ttl_s: Vigencia de cada entrada en segundos; ``None`` o ``<= 0`` la desactiva.
+        medir: Función que estima los bytes de un valor (por defecto, su JSON).
+    """
+
+    def __init__(
+        self,
+        max_entradas: int,
+        max_bytes: int,
+        ttl_s: float | None = None,
+        medir: Callable[[Any], int] | None = None,
+    ) -> None:
+        self._max_entradas = max(1, int(max_entradas))
+        self._max_bytes = max(1, int(max_bytes))
+        self._ttl_s = ttl_s if ttl_s and ttl_s > 0 else None
+        self._medir = medir or _medir_json
+        self._datos: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    # ------------------------------------------------------------------
+    def obtener(self, clave: str) -> Any | None:
+        """Devuelve el valor vigente (y lo marca como reciente) o ``None``."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            valor, _, vence = entrada
+            if vence and time.monotonic() >= vence:
+                self._quitar(clave)
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave: str, valor: Any) -> bool:
+        """Guarda el valor; ``False`` si por sí solo excede el presupuesto de bytes."""
+        tamano = self._medir(valor)
+        if tamano > self._max_bytes:
+            return False
+        vence = time.monotonic() + self._ttl_s if self._ttl_s else 0.0
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (valor, tamano, vence)
+            self.bytes += tamano
+            while len(self._datos) > self._max_entradas or self.bytes > self._max_bytes:
+                antigua = next(iter(self._datos))
+                self._quitar(antigua)
+                self.desalojos += 1
+        return True
+
+    def invalidar(self, clave: str | None = None) -> None:
+        """Borra una clave, o toda la caché si no se indica ninguna."""
+        with self._lock:
+            if clave is None:
+                self._datos.clear()
+                self.bytes = 0
+            elif clave in self._datos:
+                self._quitar(clave)
+
+    def _quitar(self, clave: str) -> None:
+        _, tamano, _ = self._datos.pop(clave)
+        self.bytes -= tamano
+
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Contadores para ``/api/salud``: tamaño, bytes, aciertos, fallos y ratio."""
+        consultas = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._datos),
+            "bytes": self.bytes,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "ratio_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+        }
@@ -0,0 +1,171 @@
+"""Caché por contenido de los archivos Excel/PPTX ya generados (memoria + disco).
+
+Descargar dos veces la misma respuesta, o compartirla, regeneraba el
+archivo cada vez. `CacheExportes` guarda sus bytes bajo `clave_exporte`:
+la huella de pregunta, prosa, SQL, columnas, filas, formato y
+``VERSION_APP``. La clave sirve también de ETag, así que una petición con
+``If-None-Match`` igual se responde 304 sin generar nada.
+
+**La fecha de generación.** Excel y PPTX imprimen "Generado: <fecha hora>";
+dos archivos con el mismo contenido nunca son idénticos byte a byte. Por
+eso el día (hora de Bogotá) entra en la clave: un archivo cacheado se
+reutiliza solo el mismo día en que se generó, y su sello dice la hora
+real de su generación (a lo sumo ``EXPORT_CACHE_TTL_S`` antes). El ETag es
+débil (``W/``): dos archivos con la misma clave tienen el mismo contenido,
+aunque el sello pueda diferir en la hora si uno no pasó por la caché.
+
+- **Memoria**: `CacheLRU` acotada por entradas y bytes (``EXPORT_CACHE_MAX``,
+  ``EXPORT_CACHE_MAX_MB``).
+- **Disco**: cada archivo también se escribe en ``EXPORT_CACHE_DIR`` (tope
+  ``EXPORT_CACHE_DISCO_MAX_MB``; al pasarlo se borran los más viejos), y un
+  acierto en disco vuelve a memoria. Los de un proceso anterior se borran
+  al arrancar.
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from config import VERSION_APP
+from motores.cache import CacheLRU, huella
+
+logger = logging.getLogger(__name__)
+
+_PREFIJO = "archivo-"
+MAX_ARCHIVO_BYTES = 32 * 1024 * 1024  # más grandes se envían sin cachear
+
+
+def clave_exporte(
+    formato: str,
+    pregunta: str,
+    texto: str,
+    sql: str,
+    columnas: list[str],
+    filas: list[list[Any]],
+    ahora: datetime,
+) -> str:
+    """Clave (y ETag) del archivo: contenido, formato, versión y día de generación."""
+    return huella("exporte", VERSION_APP, formato, f"{ahora:%Y-%m-%d}", pregunta, texto, sql, columnas, filas)
+
+
+class CacheExportes:
+    """Archivos generados por clave de contenido: LRU en memoria con respaldo en disco.
+
+    Args:
+        max_entradas: Archivos en memoria como máximo.
+        max_bytes: Presupuesto de memoria.
+        ttl_s: Vigencia de cada archivo (en memoria y en disco).
+        directorio: Carpeta del nivel en disco (``None`` = solo memoria).
+        max_bytes_disco: Tope del nivel en disco.
+        reloj: Fuente de tiempo monótono del nivel en disco (inyectable en pruebas).
+    """
+
+    def __init__(
+        self,
+        max_entradas: int,
+        max_bytes: int,
+        ttl_s: int,
+        directorio: Path | None = None,
+        max_bytes_disco: int = 512 * 1024 * 1024,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._memoria = CacheLRU(max_entradas, max_bytes, ttl_s, medir=lambda v: len(v[1]))
+        self._ttl_s = ttl_s
+        self._dir = directorio
+        self._max_bytes_disco = max_bytes_disco
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        # clave -> (nombre, tamaño, vence); en orden de escritura (el primero es el más viejo).
+        self._disco: OrderedDict[str, tuple[str, int, float]] = OrderedDict()
+        self._bytes_disco = 0
+        self.aciertos_disco = 0
+        if self._dir is not None:
+            try:
+                self._dir.mkdir(parents=True, exist_ok=True)
+                for viejo in self._dir.glob(_PREFIJO + "*"):
+                    viejo.unlink(missing_ok=True)
+            except OSError as exc:
+                logger.warning("Caché de exportes sin disco (%s): %s", self._dir, exc)
+                self._dir = None
+
+    def _ruta(self, clave: str) -> Path:
+        return self._dir / f"{_PREFIJO}{clave}"
+
+    def _quitar_disco(self, clave: str) -> None:
+        _, tamano, _ = self._disco.pop(clave)
+        self._bytes_disco -= tamano
+        self._ruta(clave).unlink(missing_ok=True)
+
+    def obtener(self, clave: str) -> tuple[str, bytes] | None:
+        """``(nombre, contenido)`` del archivo vigente, o ``None``."""
+        valor = self._memoria.obtener(clave)
+        if valor is not None or self._dir is None:
+            return valor
+        with self._lock:
+            entrada = self._disco.get(clave)
+            if entrada is None:
+                return None
+            if self._reloj() >= entrada[2]:
+                self._quitar_disco(clave)
+                return None
+            try:
+                contenido = self._ruta(clave).read_bytes()
+            except OSError:
+                self._quitar_disco(clave)
+                return None
+            self.aciertos_disco += 1
+        valor = (entrada[0], contenido)
+        self._memoria.guardar(clave, valor)
+        return valor
+
+    def guardar(self, clave: str, nombre: str, contenido: bytes) -> None:
+        """Guarda el archivo en memoria y en disco (si cabe)."""
+        if len(contenido) > MAX_ARCHIVO_BYTES:
+            return
+        self._memoria.guardar(clave, (nombre, contenido))
+        self._escribir_disco(clave, nombre, len(contenido), lambda ruta: ruta.write_bytes(contenido))
+
+    def guardar_archivo(self, clave: str, nombre: str, origen: Path) -> None:
+        """Guarda un archivo ya escrito en disco (el de un trabajo en segundo plano)."""
+        try:
+            tamano = origen.stat().st_size
+        except OSError:
+            return
+        if tamano > MAX_ARCHIVO_BYTES:
+            return
+        if self._dir is None:
+            self._memoria.guardar(clave, (nombre, origen.read_bytes()))
+            return
+        self._escribir_disco(clave, nombre, tamano, lambda ruta: shutil.copyfile(origen, ruta))
+
+    def _escribir_disco(self, clave: str, nombre: str, tamano: int, escribir: Callable[[Path], Any]) -> None:
+        if self._dir is None or tamano > self._max_bytes_disco:
+            return
+        with self._lock:
+            if clave in self._disco:
+                self._quitar_disco(clave)
+            try:
+                escribir(self._ruta(clave))
+            except OSError as exc:  # disco lleno o sin permisos: queda solo en memoria
+                logger.warning("No se pudo escribir el exporte en caché: %s", exc)
+                return
+            self._disco[clave] = (nombre, tamano, self._reloj() + self._ttl_s)
+            self._bytes_disco += tamano
+            while self._bytes_disco > self._max_bytes_disco:
+                self._quitar_disco(next(iter(self._disco)))
+
+    def estadisticas(self) -> dict[str, Any]:
+        return {
+            **self._memoria.estadisticas(),
+            "archivos_disco": len(self._disco),
+            "bytes_disco": self._bytes_disco,
+            "aciertos_disco": self.aciertos_disco,
+        }
@@ -0,0 +1,405 @@
+"""Cliente HTTP compartido: keep-alive, pool por host, reintentos y medición.
+
+Cortex Analyst y los proveedores compatibles con OpenAI se llamaban con
+``requests.post`` suelto: cada pregunta pagaba DNS + TCP + TLS de nuevo.
+Aquí vive UNA ``requests.Session`` por proceso (thread-safe para
+peticiones concurrentes) con un pool de conexiones por host
+(``HTTP_POOL_MAX``), reintentos de conexión —seguros para cualquier
+método: la petición no llegó a salir— y, solo en llamadas marcadas
+``idempotente``, reintentos ante 502/503/504 respetando ``Retry-After``.
+
+El flujo asíncrono del chat usa `ClienteHTTPAsync` (``httpx``, un cliente
+por event loop) con los mismos topes y la misma política de reintentos;
+`ClienteHTTPAsync.post_lineas` entrega por líneas las respuestas en streaming.
+
+Cada petición se mide partida en dos: ``conexion_ms`` (DNS + TCP + TLS,
+0 si se reusó una conexión viva) y ``servidor_ms`` (envío → cabeceras de
+respuesta, menos la conexión), agregadas por host para ``/api/salud``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_ESTADOS_REINTENTABLES = frozenset({502, 503, 504})
+_ESPERA_MAX_REINTENTO_S = 5.0
+_medicion = threading.local()  # segundos de conexión de la petición en curso (por hilo)
+
+
+def _medir_conexion(conectar: Any) -> None:
+    t0 = time.perf_counter()
+    try:
+        conectar()
+    finally:
+        _medicion.conexion_s = getattr(_medicion, "conexion_s", 0.0) + time.perf_counter() - t0
+        _medicion.nuevas = getattr(_medicion, "nuevas", 0) + 1
+
+
+class _ConexionHTTPMedida(HTTPConnection):
+    def connect(self) -> None:
+        _medir_conexion(super().connect)
+
+
+class _ConexionHTTPSMedida(HTTPSConnection):
+    def connect(self) -> None:
+        _medir_conexion(super().connect)
+
+
+class _PoolHTTP(HTTPConnectionPool):
+    ConnectionCls = _ConexionHTTPMedida
+
+
+class _PoolHTTPS(HTTPSConnectionPool):
+    ConnectionCls = _ConexionHTTPSMedida
+
+
+class _AdaptadorMedido(HTTPAdapter):
+    """``HTTPAdapter`` cuyos pools usan conexiones que cronometran su ``connect``."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _PoolHTTP, "https": _PoolHTTPS}
+
+
+class _Medidor:
+    """Acumulados por host de peticiones, reintentos y tiempos de conexión vs servidor."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, float]] = {}
+
+    def registrar(
+        self,
+        host: str,
+        total_s: float,
+        estado: int | None,
+        conexion_s: float,
+        nuevas: int,
+        transcurrido_s: float = 0.0,
+    ) -> None:
+        """Una petición: ``estado=None`` si no hubo respuesta (red, DNS, timeout)."""
+        with self._lock:
+            s = self._stats.setdefault(
+                host,
+                {
+                    "peticiones": 0,
+                    "errores": 0,
+                    "reintentos": 0,
+                    "conexiones_nuevas": 0,
+                    "conexion_s": 0.0,
+                    "servidor_s": 0.0,
+                    "total_s": 0.0,
+                },
+            )
+            s["peticiones"] += 1
+            s["errores"] += int(estado is None or estado >= 500)
+            s["conexiones_nuevas"] += nuevas
+            s["conexion_s"] += conexion_s
+            s["servidor_s"] += max(0.0, transcurrido_s - conexion_s) if estado is not None else 0.0
+            s["total_s"] += total_s
+
+    def reintento(self, host: str) -> None:
+        with self._lock:
+            self._stats[host]["reintentos"] += 1
+
+    def estadisticas(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            salida: dict[str, dict[str, Any]] = {}
+            for host, s in self._stats.items():
+                n = int(s["peticiones"]) or 1
+                salida[host] = {
+                    "peticiones": int(s["peticiones"]),
+                    "errores": int(s["errores"]),
+                    "reintentos": int(s["reintentos"]),
+                    "conexiones_nuevas": int(s["conexiones_nuevas"]),
+                    "conexion_prom_ms": round(s["conexion_s"] * 1000 / n, 1),
+                    "servidor_prom_ms": round(s["servidor_s"] * 1000 / n, 1),
+                    "total_prom_ms": round(s["total_s"] * 1000 / n, 1),
+                }
+            return salida
+
+
+def _espera_sugerida(cabeceras: Mapping[str, str], intento: int) -> float:
+    """``Retry-After`` en segundos si el servidor lo da; si no, espera exponencial corta."""
+    try:
+        return max(0.0, float(cabeceras.get("Retry-After", "")))
+    except ValueError:
+        return 0.25 * (2 ** (intento - 1))
+
+
+def _traza_conexion() -> tuple[dict[str, Any], Callable[[str, dict[str, Any]], Awaitable[None]]]:
+    """Medida de conexión nueva (TCP + TLS) de una petición httpx y su callback ``trace``."""
+    medida: dict[str, Any] = {"conexion_s": 0.0, "nuevas": 0, "t_conexion": 0.0}
+
+    async def traza(evento: str, _info: dict[str, Any]) -> None:
+        if evento == "connection.connect_tcp.started":
+            medida["t_conexion"] = time.perf_counter()
+            medida["nuevas"] += 1
+        elif evento in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            medida["conexion_s"] = time.perf_counter() - medida["t_conexion"]
+
+    return medida, traza
+
+
+class _BaseCliente:
+    def __init__(self, reintentos: int, medidor: _Medidor | None) -> None:
+        self._reintentos = max(0, reintentos)
+        self._medidor = medidor or _Medidor()
+
+    def _espera_reintento(
+        self, host: str, estado: int, cabeceras: Mapping[str, str], idempotente: bool, intento: int
+    ) -> float | None:
+        """Segundos a esperar antes de reintentar, o ``None`` si la respuesta se entrega."""
+        if not (idempotente and estado in _ESTADOS_REINTENTABLES and intento < self._reintentos):
+            return None
+        espera = min(_espera_sugerida(cabeceras, intento + 1), _ESPERA_MAX_REINTENTO_S)
+        logger.info("HTTP %s de %s; reintento %d en %.1f s", estado, host, intento + 1, espera)
+        self._medidor.reintento(host)
+        return espera
+
+    def estadisticas(self) -> dict[str, dict[str, Any]]:
+        """Por host: peticiones, reuso de conexiones y ms promedio de conexión vs servidor."""
+        return self._medidor.estadisticas()
+
+
+class ClienteHTTP(_BaseCliente):
+    """Sesión HTTP compartida con pool por host y estadísticas de red vs servicio.
+
+    Args:
+        pool_max: Conexiones vivas por host (las peticiones extra esperan turno).
+        reintentos: Reintentos ante fallo de conexión y, si la llamada es
+            idempotente, ante 502/503/504.
+        medidor: Acumulador de estadísticas (compartido con el cliente async).
+    """
+
+    def __init__(self, pool_max: int = 10, reintentos: int = 2, medidor: _Medidor | None = None) -> None:
+        super().__init__(reintentos, medidor)
+        self._sesion = requests.Session()
+        adaptador = _AdaptadorMedido(
+            pool_connections=8,  # hosts distintos con pool propio (Snowflake + proveedores LLM)
+            pool_maxsize=max(1, pool_max),
+            pool_block=True,
+            max_retries=Retry(
+                total=self._reintentos,
+                connect=self._reintentos,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=0.2,
+                raise_on_status=False,
+            ),
+        )
+        self._sesion.mount("https://", adaptador)
+        self._sesion.mount("http://", adaptador)
+
+    def post(
+        self,
+        url: str,
+        *,
+        json: Any,
+        headers: dict[str, str],
+        timeout: float,
+        idempotente: bool = False,
+    ) -> requests.Response:
+        """POST JSON por la sesión compartida.
+
+        Raises:
+            requests.RequestException: red, DNS o timeout tras los reintentos.
+        """
+        host = urlsplit(url).netloc
+        intento = 0
+        while True:
+            _medicion.conexion_s, _medicion.nuevas = 0.0, 0
+            t0 = time.perf_counter()
+            try:
+                resp = self._sesion.post(url, json=json, headers=headers, timeout=timeout)
+            except requests.RequestException:
+                self._medidor.registrar(host, time.perf_counter() - t0, None, _medicion.conexion_s, _medicion.nuevas)
+                raise
+            self._medidor.registrar(
+                host,
+                time.perf_counter() - t0,
+                resp.status_code,
+                _medicion.conexion_s,
+                _medicion.nuevas,
+                resp.elapsed.total_seconds(),
+            )
+            espera = self._espera_reintento(host, resp.status_code, resp.headers, idempotente, intento)
+            if espera is None:
+                return resp
+            intento += 1
+            resp.close()
+            time.sleep(espera)
+
+    def cerrar(self) -> None:
+        """Cierra las conexiones del pool (shutdown ordenado)."""
+        self._sesion.close()
+
+
+class ClienteHTTPAsync(_BaseCliente):
+    """Equivalente asíncrono de `ClienteHTTP` sobre ``httpx.AsyncClient``.
+
+    Un ``AsyncClient`` queda atado al event loop donde abrió sus conexiones:
+    cada loop usa su propia instancia (ver `cliente_http_async`). Mismo tope
+    que la sesión sync: ``pool_max`` conexiones por cliente, y las peticiones
+    de más esperan turno.
+    """
+
+    def __init__(self, pool_max: int = 10, reintentos: int = 2, medidor: _Medidor | None = None) -> None:
+        super().__init__(reintentos, medidor)
+        # Con ``transport`` propio, httpx ignora los ``limits`` del cliente: van en el transporte.
+        limites = httpx.Limits(max_connections=max(1, pool_max), max_keepalive_connections=max(1, pool_max))
+        self._cliente = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=self._reintentos, limits=limites),  # reintenta solo conexión
+        )
+
+    async def post(
+        self,
+        url: str,
+        *,
+        json: Any,
+        headers: dict[str, str],
+        timeout: float,
+        idempotente: bool = False,
+    ) -> httpx.Response:
+        """POST JSON sin ocupar un hilo mientras se espera al servidor.
+
+        Raises:
+            httpx.HTTPError: red, DNS o timeout tras los reintentos.
+        """
+        host = urlsplit(url).netloc
+        intento = 0
+        while True:
+            medida, traza = _traza_conexion()
+            t0 = time.perf_counter()
+            try:
+                resp = await self._cliente.post(
+                    url, json=json, headers=headers, timeout=timeout, extensions={"trace": traza}
+                )
+            except httpx.HTTPError:
+                self._medidor.registrar(host, time.perf_counter() - t0, None, medida["conexion_s"], medida["nuevas"])
+                raise
+            self._medidor.registrar(
+                host,
+                time.perf_counter() - t0,
+                resp.status_code,
+                medida["conexion_s"],
+                medida["nuevas"],
+                resp.elapsed.total_seconds(),
+            )
+            espera = self._espera_reintento(host, resp.status_code, resp.headers, idempotente, intento)
+            if espera is None:
+                return resp
+            intento += 1
+            await asyncio.sleep(espera)
+
+    async def post_lineas(self, url: str, *, json: Any, headers: dict[str, str], timeout: float) -> AsyncIterator[str]:
+        """POST JSON cuya respuesta llega por partes (SSE): entrega cada línea al recibirla.
+
+        Sin reintentos de estado: lo ya entregado no se puede deshacer. En las
+        estadísticas, el tiempo de servidor es hasta la primera respuesta
+        (cabeceras), no hasta el final del stream. Cerrar el generador antes
+        de tiempo corta la petición.
+
+        Raises:
+            httpx.HTTPStatusError: el servidor respondió con un estado de error.
+            httpx.HTTPError: red, DNS o timeout (entre líneas incluido).
+        """
+        host = urlsplit(url).netloc
+        medida, traza = _traza_conexion()
+        t0 = time.perf_counter()
+        resp: httpx.Response | None = None
+        try:
+            async with self._cliente.stream(
+                "POST", url, json=json, headers=headers, timeout=timeout, extensions={"trace": traza}
+            ) as resp:
+                cabeceras_s = time.perf_counter() - t0
+                self._medidor.registrar(
+                    host, cabeceras_s, resp.status_code, medida["conexion_s"], medida["nuevas"], cabeceras_s
+                )
+                resp.raise_for_status()
+                async for linea in resp.aiter_lines():
+                    yield linea
+        except httpx.HTTPError:
+            if resp is None:  # sin respuesta; un estado de error ya quedó registrado
+                self._medidor.registrar(host, time.perf_counter() - t0, None, medida["conexion_s"], medida["nuevas"])
+            raise
+
+    async def cerrar(self) -> None:
+        """Cierra las conexiones del pool."""
+        await self._cliente.aclose()
+
+
+_MEDIDOR = _Medidor()
+_cliente: ClienteHTTP | None = None
+_clientes_async: dict[asyncio.AbstractEventLoop, ClienteHTTPAsync] = {}
+_lock_cliente = threading.Lock()
+
+
+def cliente_http(cfg: Config) -> ClienteHTTP:
+    """Cliente compartido del proceso (se crea con la primera configuración que llega)."""
+    global _cliente
+    with _lock_cliente:
+        if _cliente is None:
+            _cliente = ClienteHTTP(cfg.http_pool_max, cfg.http_reintentos, _MEDIDOR)
+        return _cliente
+
+
+def _olvidar_loops_cerrados() -> None:
+    """Suelta los clientes de loops ya cerrados (con ``_lock_cliente`` tomado).
+
+    Sus conexiones no pueden cerrarse con ``await`` sin su loop; al soltar el
+    cliente, el recolector cierra los sockets.
+    """
+    for loop in [lp for lp in _clientes_async if lp.is_closed()]:
+        del _clientes_async[loop]
+
+
+def cliente_http_async(cfg: Config) -> ClienteHTTPAsync:
+    """Cliente asíncrono compartido del event loop en curso."""
+    loop = asyncio.get_running_loop()
+    with _lock_cliente:
+        _olvidar_loops_cerrados()
+        if loop not in _clientes_async:
+            _clientes_async[loop] = ClienteHTTPAsync(cfg.http_pool_max, cfg.http_reintentos, _MEDIDOR)
+        return _clientes_async[loop]
+
+
+def estadisticas_http() -> dict[str, dict[str, Any]]:
+    """Estadísticas de los clientes compartidos, sync y async (``{}`` si aún no hubo peticiones)."""
+    return _MEDIDOR.estadisticas()
+
+
+def cerrar_cliente_http() -> None:
+    """Cierra y olvida el cliente compartido."""
+    global _cliente
+    with _lock_cliente:
+        if _cliente is not None:
+            _cliente.cerrar()
+            _cliente = None
+
+
+async def cerrar_cliente_http_async() -> None:
+    """Cierra y olvida el cliente asíncrono del event loop en curso (y suelta los de loops cerrados)."""
+    with _lock_cliente:
+        _olvidar_loops_cerrados()
+        cliente = _clientes_async.pop(asyncio.get_running_loop(), None)
+    if cliente is not None:
+        await cliente.cerrar()
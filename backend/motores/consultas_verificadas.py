@@ -0,0 +1,250 @@
+"""Atajo de consultas verificadas: preguntas conocidas → SQL sin pasar por Analyst.
+
+El modelo semántico trae ``verified_queries`` y la suite dorada trae
+``sql_referencia``: pares pregunta/SQL ya revisados por el equipo. El
+índice se construye una vez al arrancar y compara la pregunta del
+usuario contra esas plantillas con n-gramas de palabras (sin tildes ni
+signos), después de sustituir sus *ranuras* — años, cantidades del tipo
+"top 10", países y departamentos conocidos — por marcadores.
+
+La coincidencia es deliberadamente conservadora: exige el mismo juego
+de ranuras, similitud ≥ umbral y que TODA palabra de contenido de la
+pregunta exista en la plantilla (una palabra desconocida puede ser un
+filtro que la plantilla no tiene). Solo se reemplazan valores cuyo
+literal aparece en la SQL de la plantilla; ante cualquier duda se
+devuelve ``None`` y el flujo sigue por Cortex Analyst. La SQL resultante
+pasa SIEMPRE por ``validar_sql`` en el orquestador.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from itertools import pairwise
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from motores.cache import canonizar
+
+logger = logging.getLogger(__name__)
+
+_PALABRAS_VACIAS = frozenset(
+    ["a", "al", "como", "cual", "cuales", "cuanto", "cuanta", "cuantos", "cuantas", "de", "del", "el", "en"]
+    + ["es", "esta", "fue", "fueron", "ha", "han", "la", "las", "lo", "los", "me", "mi", "por", "para", "que"]
+    + ["se", "su", "sus", "un", "una", "y", "colombia", "dame", "dime", "muestra", "muestrame", "quiero", "ver"]
+)
+#: Palabras que invierten un filtro: deben coincidir en AMBOS sentidos.
+_NEGACIONES = frozenset(["no", "sin", "excepto", "menos"])
+#: Columna de la SQL → tipo de ranura de entidad.
+_COLUMNAS_ENTIDAD = {"DEPARTAMENTO": "departamento", "DESC_PAIS": "pais"}
+_RE_LITERAL_ENTIDAD = re.compile(r"\b(?:\w+\.)?(DEPARTAMENTO|DESC_PAIS)\s*=\s*'([^']+)'", re.IGNORECASE)
+
+
+@dataclass
+class Ranura:
+    """Valor variable de una pregunta: tipo, valor canónico y literal SQL."""
+
+    tipo: str  # anio | cantidad | departamento | pais
+    valor: str
+    literal: str
+
+
+@dataclass
+class _Plantilla:
+    pregunta: str
+    sql: str
+    origen: str
+    ranuras: list[Ranura]
+    rellenables: list[bool]
+    rasgos: frozenset[str]
+    contenido: frozenset[str]
+
+
+@dataclass
+class Coincidencia:
+    """SQL lista para validar, con la confianza y la plantilla de origen."""
+
+    sql: str
+    confianza: float
+    origen: str
+    pregunta_plantilla: str
+    ranuras: dict[str, list[str]] = field(default_factory=dict)
+
+
+def _es_anio(numero: str) -> bool:
+    return len(numero) == 4 and 1900 <= int(numero) <= 2100
+
+
+def _literal_en_sql(sql: str, ranura: Ranura) -> bool:
+    """¿Aparece el literal de la ranura en la SQL, de forma reemplazable?"""
+    if ranura.tipo == "anio":
+        return bool(re.search(rf"\b{ranura.valor}(0[1-9]|1[0-2])?\b", sql))
+    if ranura.tipo == "cantidad":
+        return bool(re.search(rf"\bLIMIT\s+{ranura.valor}\b", sql, re.IGNORECASE))
+    return f"'{ranura.literal}'" in sql
+
+
+def _sustituir(sql: str, anterior: Ranura, nueva: Ranura) -> str:
+    if anterior.tipo == "anio":
+        return re.sub(rf"\b{anterior.valor}(0[1-9]|1[0-2])?\b", lambda m: nueva.valor + (m.group(1) or ""), sql)
+    if anterior.tipo == "cantidad":
+        return re.sub(rf"\b(LIMIT\s+){anterior.valor}\b", rf"\g<1>{nueva.valor}", sql, flags=re.IGNORECASE)
+    return sql.replace(f"'{anterior.literal}'", f"'{nueva.literal}'")
+
+
+class IndiceVerificadas:
+    """Índice en memoria de pares pregunta/SQL verificados con relleno de ranuras.
+
+    Args:
+        pares: ``[(pregunta, sql, origen), ...]``.
+        entidades: ``{tipo: {valor_canonico: literal_sql}}`` para países y departamentos.
+        umbral: Similitud mínima (0–1) para aceptar una plantilla.
+    """
+
+    def __init__(
+        self, pares: list[tuple[str, str, str]], entidades: dict[str, dict[str, str]], umbral: float = 0.8
+    ) -> None:
+        self._umbral = umbral
+        # Más largas primero: "valle del cauca" antes que "valle".
+        self._entidades = sorted(
+            (
+                (tuple(canon.split()), tipo, literal)
+                for tipo, valores in entidades.items()
+                for canon, literal in valores.items()
+                if canon
+            ),
+            key=lambda e: -len(e[0]),
+        )
+        self._plantillas: list[_Plantilla] = []
+        for pregunta, sql, origen in pares:
+            sql = " ".join(sql.split())
+            esqueleto, ranuras = self._analizar(pregunta)
+            self._plantillas.append(
+                _Plantilla(
+                    pregunta=pregunta,
+                    sql=sql,
+                    origen=origen,
+                    ranuras=ranuras,
+                    rellenables=[_literal_en_sql(sql, r) for r in ranuras],
+                    rasgos=self._rasgos(esqueleto),
+                    contenido=frozenset(esqueleto),
+                )
+            )
+
+    def __len__(self) -> int:
+        return len(self._plantillas)
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def desde_yaml(cls, modelo: Path, doradas: Path | None = None, umbral: float = 0.8) -> IndiceVerificadas:
+        """Construye el índice con las ``verified_queries`` del modelo y la suite dorada."""
+        datos_modelo: dict[str, Any] = yaml.safe_load(modelo.read_text(encoding="utf-8")) or {}
+        pares = [
+            (str(q["question"]), str(q["sql"]), f"modelo:{q.get('name', '')}")
+            for q in datos_modelo.get("verified_queries") or []
+            if q.get("question") and q.get("sql")
+        ]
+        if doradas is not None and doradas.exists():
+            suite: dict[str, Any] = yaml.safe_load(doradas.read_text(encoding="utf-8")) or {}
+            pares += [
+                (str(c["pregunta"]), str(c["sql_referencia"]), f"dorada:{c.get('id', '')}")
+                for c in suite.get("preguntas") or []
+                if c.get("pregunta") and c.get("sql_referencia")
+            ]
+
+        entidades: dict[str, dict[str, str]] = {tipo: {} for tipo in _COLUMNAS_ENTIDAD.values()}
+        for tabla in datos_modelo.get("tables") or []:
+            for dim in tabla.get("dimensions") or []:
+                tipo = _COLUMNAS_ENTIDAD.get(str(dim.get("name", "")).upper())
+                for valor in (dim.get("sample_values") or []) if tipo else []:
+                    entidades[tipo][canonizar(str(valor))] = str(valor)
+        for _, sql, _ in pares:
+            for columna, literal in _RE_LITERAL_ENTIDAD.findall(sql):
+                entidades[_COLUMNAS_ENTIDAD[columna.upper()]][canonizar(literal)] = literal
+        return cls(pares, entidades, umbral)
+
+    # ------------------------------------------------------------------
+    def _analizar(self, pregunta: str) -> tuple[list[str], list[Ranura]]:
+        """Pregunta → (palabras de contenido con marcadores de ranura, ranuras en orden)."""
+        tokens = canonizar(pregunta).split()
+        palabras: list[str] = []
+        ranuras: list[Ranura] = []
+        i = 0
+        while i < len(tokens):
+            entidad = next((e for e in self._entidades if tuple(tokens[i : i + len(e[0])]) == e[0]), None)
+            if entidad is not None:
+                partes, tipo, literal = entidad
+                ranuras.append(Ranura(tipo, " ".join(partes), literal))
+                palabras.append(f"ranura_{tipo}")
+                i += len(partes)
+                continue
+            token = tokens[i]
+            if token.isdigit():
+                tipo = "anio" if _es_anio(token) else "cantidad"
+                ranuras.append(Ranura(tipo, token, token))
+                palabras.append(f"ranura_{tipo}")
+            elif token not in _PALABRAS_VACIAS:
+                palabras.append(token)
+            i += 1
+        return palabras, ranuras
+
+    @staticmethod
+    def _rasgos(palabras: list[str]) -> frozenset[str]:
+        """Unigramas y bigramas de palabras: el vector de comparación."""
+        return frozenset(palabras) | frozenset(f"{a} {b}" for a, b in pairwise(palabras))
+
+    def buscar(self, pregunta: str) -> Coincidencia | None:
+        """Mejor plantilla rellenable para la pregunta, o ``None`` si no hay una segura."""
+        palabras, ranuras = self._analizar(pregunta)
+        rasgos = self._rasgos(palabras)
+        tipos = sorted(r.tipo for r in ranuras)
+        mejor: tuple[float, _Plantilla] | None = None
+        for p in self._plantillas:
+            if sorted(r.tipo for r in p.ranuras) != tipos or not set(palabras) <= p.contenido:
+                continue
+            if p.contenido & _NEGACIONES != set(palabras) & _NEGACIONES:
+                continue
+            union = rasgos | p.rasgos
+            similitud = len(rasgos & p.rasgos) / len(union) if union else 0.0
+            if similitud >= self._umbral and (mejor is None or similitud > mejor[0]):
+                mejor = (similitud, p)
+        if mejor is None:
+            return None
+        similitud, plantilla = mejor
+        sql = self._rellenar(plantilla, ranuras)
+        if sql is None:
+            return None
+        agrupadas: dict[str, list[str]] = {}
+        for r in ranuras:
+            agrupadas.setdefault(r.tipo, []).append(r.literal)
+        return Coincidencia(
+            sql=sql,
+            confianza=round(similitud, 3),
+            origen=plantilla.origen,
+            pregunta_plantilla=plantilla.pregunta,
+            ranuras=agrupadas,
+        )
+
+    @staticmethod
+    def _rellenar(plantilla: _Plantilla, ranuras: list[Ranura]) -> str | None:
+        """Sustituye las ranuras por tipo y orden; ``None`` si alguna no puede rellenarse."""
+        pendientes = {tipo: [r for r in ranuras if r.tipo == tipo] for tipo in {r.tipo for r in ranuras}}
+        cambios: list[tuple[Ranura, Ranura]] = []
+        for anterior, rellenable in zip(plantilla.ranuras, plantilla.rellenables):
+            nueva = pendientes[anterior.tipo].pop(0)
+            if nueva.valor == anterior.valor:
+                continue
+            if not rellenable:
+                return None
+            cambios.append((anterior, nueva))
+        # Valores repetidos o cruzados (2024→2025 y 2025→2024) harían sustituciones ambiguas.
+        anteriores = [a.valor for a, _ in cambios]
+        if len(set(anteriores)) != len(anteriores) or {n.valor for _, n in cambios} & set(anteriores):
+            return None
+        sql = plantilla.sql
+        for anterior, nueva in cambios:
+            sql = _sustituir(sql, anterior, nueva)
+        return sql
@@ -69,6 +69,7 @@ def validar_sql(sql_cruda: str, esquemas_permitidos: frozenset[str], max_filas:
 # ── Verificación de cifras ──────────────────────────────────────────────
 
 _RE_NUMERO = re.compile(r"-?\d[\d.,]*")
+_RE_FIN_FRASE = re.compile(r"[.!?;:](?=\s)|\n")  # el punto decimal nunca va seguido de espacio
 _ENTERO_PEQUENO_MAX = 100  # ordinales, meses, porcentajes redondos citados
 _TOLERANCIA_REL = 1e-6
 
@@ -111,13 +112,7 @@ class VerificacionCifras:
     huerfanas: list[str] = field(default_factory=list)
 
 
-def verificar_cifras(texto: str, filas: list[list[Any]], n_filas: int, pregunta: str = "") -> VerificacionCifras:
-    """Comprueba que todo número del texto exista en el resultado (o sea trivial).
-
-    Se permiten: valores de cualquier celda (con redondeos a 0–2 decimales),
-    el conteo de filas, los años mencionados en la pregunta y enteros ≤ 100
-    (ordinales del tipo "los 10 principales"). Todo lo demás es huérfano.
-    """
+def _cifras_permitidas(filas: list[list[Any]], n_filas: int, pregunta: str) -> set[float]:
     permitidos: set[float] = {float(n_filas)}
     for fila in filas:
         for v in fila:
@@ -134,7 +129,10 @@ def verificar_cifras(texto: str, filas: list[list[Any]], n_filas: int, pregunta:
         f = _a_float(token)
         if f is not None:
             permitidos.add(f)
+    return permitidos
+
 
+def _huerfanas(texto: str, permitidos: set[float]) -> list[str]:
     huerfanas: list[str] = []
     for token in _RE_NUMERO.findall(texto):
         f = _a_float(token)
@@ -146,4 +144,47 @@ def verificar_cifras(texto: str, filas: list[list[Any]], n_filas: int, pregunta:
             continue  # años citados en prosa
         if not any(_equivalentes(f, p) for p in permitidos):
             huerfanas.append(token)
+    return huerfanas
+
+
+def verificar_cifras(texto: str, filas: list[list[Any]], n_filas: int, pregunta: str = "") -> VerificacionCifras:
+    """Comprueba que todo número del texto exista en el resultado (o sea trivial).
+
+    Se permiten: valores de cualquier celda (con redondeos a 0–2 decimales),
+    el conteo de filas, los años mencionados en la pregunta y enteros ≤ 100
+    (ordinales del tipo "los 10 principales"). Todo lo demás es huérfano.
+    """
+    huerfanas = _huerfanas(texto, _cifras_permitidas(filas, n_filas, pregunta))
     return VerificacionCifras(ok=not huerfanas, huerfanas=huerfanas)
+
+
+class VerificadorCifras:
+    """`verificar_cifras` por frases, para una redacción que llega por fragmentos.
+
+    `agregar` revisa solo las frases ya terminadas (una cifra puede llegar
+    partida entre dos fragmentos); `cerrar` revisa lo que quedó pendiente.
+    Las cifras permitidas se calculan una sola vez.
+    """
+
+    def __init__(self, filas: list[list[Any]], n_filas: int, pregunta: str = "") -> None:
+        self._permitidos = _cifras_permitidas(filas, n_filas, pregunta)
+        self._pendiente = ""
+
+    def agregar(self, delta: str) -> list[str]:
+        """Suma un fragmento; devuelve las cifras huérfanas de las frases que cerró."""
+        self._pendiente += delta
+        corte = max((m.end() for m in _RE_FIN_FRASE.finditer(self._pendiente)), default=0)
+        if not corte:
+            return []
+        listo, self._pendiente = self._pendiente[:corte], self._pendiente[corte:]
+        return _huerfanas(listo, self._permitidos)
+
+    def reiniciar(self) -> None:
+        """Descarta lo pendiente (el proveedor falló y la redacción empieza de nuevo)."""
+        self._pendiente = ""
+
+    def cerrar(self) -> VerificacionCifras:
+        """Veredicto de lo que quedaba sin revisar (las frases previas ya pasaron)."""
+        huerfanas = _huerfanas(self._pendiente, self._permitidos)
+        self._pendiente = ""
+        return VerificacionCifras(ok=not huerfanas, huerfanas=huerfanas)
@@ -10,15 +10,22 @@ plantilla determinista sin LLM.
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import os
-from collections.abc import Callable
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import AbstractContextManager, aclosing
 from dataclasses import dataclass
 from typing import Any
 
-import requests
+import anyio
+import anyio.to_thread
 
 from config import Config
+from motores.cliente_http import ClienteHTTP, ClienteHTTPAsync, cliente_http, cliente_http_async
+from motores.guardas import verificar_cifras
 from snowflake_.ejecutor import ResultadoConsulta
 
 logger = logging.getLogger(__name__)
@@ -124,34 +131,80 @@ def plantilla_resumen(pregunta: str, res: ResultadoConsulta) -> str:
 # ── Ejecución por proveedor ─────────────────────────────────────────────
 
 
-def _redactar_cortex(fabrica_conexion: Callable[[], Any], modelo: str, prompt: str) -> str:
-    conn = fabrica_conexion()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT SNOWFLAKE.CORTEX.COMPLETE(%s, %s)", (modelo, prompt))
-        fila = cur.fetchone()
-    finally:
-        cur.close()
+def _redactar_cortex(fabrica_conexion: Callable[[], AbstractContextManager[Any]], modelo: str, prompt: str) -> str:
+    with fabrica_conexion() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT SNOWFLAKE.CORTEX.COMPLETE(%s, %s)", (modelo, prompt))
+            fila = cur.fetchone()
+        finally:
+            cur.close()
     return str(fila[0]).strip() if fila and fila[0] else ""
 
 
-def _redactar_openai_compat(base_url: str, api_key: str, modelo: str, prompt: str, timeout_s: int) -> str:
-    resp = requests.post(
-        f"{base_url}/chat/completions",
-        headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-        json={
+def _peticion_openai(base_url: str, api_key: str, modelo: str, prompt: str, stream: bool = False) -> dict[str, Any]:
+    """Argumentos del POST ``/chat/completions`` (iguales en sync y async)."""
+    peticion = {
+        "url": f"{base_url}/chat/completions",
+        "headers": {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+        "json": {
             "model": modelo,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0,
             "max_tokens": _MAX_TOKENS_SALIDA,
         },
-        timeout=timeout_s,
-    )
+    }
+    if stream:
+        peticion["json"]["stream"] = True
+    return peticion
+
+
+def _redactar_openai_compat(
+    cliente: ClienteHTTP, base_url: str, api_key: str, modelo: str, prompt: str, timeout_s: int
+) -> str:
+    # No idempotente a efectos de reintento: un 5xx cae al siguiente proveedor de la cadena.
+    resp = cliente.post(**_peticion_openai(base_url, api_key, modelo, prompt), timeout=timeout_s)
+    resp.raise_for_status()
+    datos = resp.json()
+    return str(datos["choices"][0]["message"]["content"]).strip()
+
+
+async def _redactar_openai_compat_async(
+    cliente: ClienteHTTPAsync, base_url: str, api_key: str, modelo: str, prompt: str, timeout_s: int
+) -> str:
+    resp = await cliente.post(**_peticion_openai(base_url, api_key, modelo, prompt), timeout=timeout_s)
     resp.raise_for_status()
     datos = resp.json()
     return str(datos["choices"][0]["message"]["content"]).strip()
 
 
+async def _deltas_openai_compat_async(
+    cliente: ClienteHTTPAsync, base_url: str, api_key: str, modelo: str, prompt: str, timeout_s: int
+) -> AsyncIterator[str]:
+    """Trozos de texto de ``/chat/completions`` con ``stream: true`` (líneas SSE ``data:``)."""
+    peticion = _peticion_openai(base_url, api_key, modelo, prompt, stream=True)
+    async for linea in cliente.post_lineas(**peticion, timeout=timeout_s):
+        datos = linea[5:].strip() if linea.startswith("data:") else ""
+        if not datos:
+            continue
+        if datos == "[DONE]":
+            return
+        opciones = json.loads(datos).get("choices") or []
+        delta = (opciones[0].get("delta") or {}).get("content") if opciones else None
+        if delta:
+            yield str(delta)
+
+
+@dataclass
+class Fragmento:
+    """Trozo de una redacción en curso; ``reiniciar`` descarta lo entregado hasta ahora."""
+
+    delta: str
+    proveedor: str
+    modelo: str
+    reiniciar: bool = False
+
+
 @dataclass
 class Redaccion:
     """Texto final junto con el proveedor efectivamente usado."""
@@ -160,11 +213,35 @@ class Redaccion:
     proveedor: str
     modelo: str
     degradado: bool = False  # True si se cayó al fallback
+    carrera: dict[str, Any] | None = None  # detalle de la carrera de proveedores (si hubo)
+
+
+def _cadena(cfg: Config, proveedor_pedido: str) -> list[str]:
+    pedido = (proveedor_pedido or cfg.proveedor_defecto or "cortex").lower()
+    return [pedido] + (["cortex"] if pedido != "cortex" else [])
+
+
+def _destino(
+    cfg: Config, fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None, pid: str
+) -> tuple[str, str, str]:
+    """(base_url, api_key, modelo) del proveedor; base y clave vacías para ``cortex``.
+
+    Raises:
+        RuntimeError: si el proveedor no puede usarse (sin conexión o sin clave).
+    """
+    if pid == "cortex":
+        if fabrica_conexion is None:
+            raise RuntimeError("Sin conexión Snowflake para Cortex COMPLETE.")
+        return "", "", cfg.cortex_modelo
+    base_url, api_key, modelo = _config_proveedor(pid)
+    if not (base_url and api_key and modelo):
+        raise RuntimeError(f"Proveedor '{pid}' sin configurar (clave/modelo).")
+    return base_url, api_key, modelo
 
 
 def redactar(
     cfg: Config,
-    fabrica_conexion: Callable[[], Any] | None,
+    fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None,
     proveedor_pedido: str,
     pregunta: str,
     res: ResultadoConsulta,
@@ -172,26 +249,215 @@ def redactar(
     """Redacta la respuesta con cadena de fallback pedido → cortex → plantilla."""
     prompt = construir_prompt(pregunta, res)
     intentos: list[str] = []
-    pedido = (proveedor_pedido or cfg.proveedor_defecto or "cortex").lower()
-    for pid in [pedido] + (["cortex"] if pedido != "cortex" else []):
+    for pid in _cadena(cfg, proveedor_pedido):
         try:
+            base_url, api_key, modelo = _destino(cfg, fabrica_conexion, pid)
             if pid == "cortex":
-                if fabrica_conexion is None:
-                    raise RuntimeError("Sin conexión Snowflake para Cortex COMPLETE.")
-                texto = _redactar_cortex(fabrica_conexion, cfg.cortex_modelo, prompt)
-                if texto:
-                    return Redaccion(
-                        texto=texto, proveedor="cortex", modelo=cfg.cortex_modelo, degradado=bool(intentos)
-                    )
+                texto = _redactar_cortex(fabrica_conexion, modelo, prompt)
             else:
-                base_url, api_key, modelo = _config_proveedor(pid)
-                if not (base_url and api_key and modelo):
-                    raise RuntimeError(f"Proveedor '{pid}' sin configurar (clave/modelo).")
-                texto = _redactar_openai_compat(base_url, api_key, modelo, prompt, cfg.timeout_redaccion_s)
-                if texto:
-                    return Redaccion(texto=texto, proveedor=pid, modelo=modelo, degradado=bool(intentos))
+                texto = _redactar_openai_compat(
+                    cliente_http(cfg), base_url, api_key, modelo, prompt, cfg.timeout_redaccion_s
+                )
+            if texto:
+                return Redaccion(texto=texto, proveedor=pid, modelo=modelo, degradado=bool(intentos))
             raise RuntimeError("Respuesta vacía del proveedor.")
         except Exception as exc:  # noqa: BLE001 - se degrada de forma controlada
             intentos.append(f"{pid}: {str(exc)[:150]}")
             logger.warning("Redacción falló con '%s': %s", pid, str(exc)[:200])
     return Redaccion(texto=plantilla_resumen(pregunta, res), proveedor="plantilla", modelo="", degradado=True)
+
+
+async def _llamar_async(
+    cfg: Config,
+    fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None,
+    pid: str,
+    prompt: str,
+    limitador: anyio.CapacityLimiter | None,
+) -> tuple[str, str]:
+    """(texto, modelo) de un proveedor; Cortex corre en un hilo acotado por ``limitador``."""
+    base_url, api_key, modelo = _destino(cfg, fabrica_conexion, pid)
+    if pid == "cortex":
+        texto = await anyio.to_thread.run_sync(_redactar_cortex, fabrica_conexion, modelo, prompt, limiter=limitador)
+    else:
+        texto = await _redactar_openai_compat_async(
+            cliente_http_async(cfg), base_url, api_key, modelo, prompt, cfg.timeout_redaccion_s
+        )
+    return texto, modelo
+
+
+async def redactar_async(
+    cfg: Config,
+    fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None,
+    proveedor_pedido: str,
+    pregunta: str,
+    res: ResultadoConsulta,
+    limitador: anyio.CapacityLimiter | None = None,
+) -> Redaccion:
+    """Como `redactar`, para el flujo asíncrono.
+
+    Los proveedores HTTP se esperan sin hilo; Cortex COMPLETE (driver de
+    Snowflake, bloqueante) corre en un hilo acotado por ``limitador``. Con
+    ``REDACCION_CARRERA`` la cadena se corre en carrera (`_carrera`).
+    """
+    cadena = _cadena(cfg, proveedor_pedido)
+    if cfg.redaccion_carrera and len(cadena) > 1:
+        return await _carrera(cfg, fabrica_conexion, cadena, pregunta, res, limitador)
+    prompt = construir_prompt(pregunta, res)
+    intentos: list[str] = []
+    for pid in cadena:
+        try:
+            texto, modelo = await _llamar_async(cfg, fabrica_conexion, pid, prompt, limitador)
+            if texto:
+                return Redaccion(texto=texto, proveedor=pid, modelo=modelo, degradado=bool(intentos))
+            raise RuntimeError("Respuesta vacía del proveedor.")
+        except Exception as exc:  # noqa: BLE001 - se degrada de forma controlada
+            intentos.append(f"{pid}: {str(exc)[:150]}")
+            logger.warning("Redacción falló con '%s': %s", pid, str(exc)[:200])
+    return Redaccion(texto=plantilla_resumen(pregunta, res), proveedor="plantilla", modelo="", degradado=True)
+
+
+def redactar_en_vivo(
+    cfg: Config,
+    fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None,
+    proveedor_pedido: str,
+    pregunta: str,
+    res: ResultadoConsulta,
+) -> Iterator[Fragmento | Redaccion]:
+    """Protocolo de `redactar_en_vivo_async` para el flujo síncrono: un solo fragmento."""
+    red = redactar(cfg, fabrica_conexion, proveedor_pedido, pregunta, res)
+    if red.proveedor != "plantilla":
+        yield Fragmento(red.texto, red.proveedor, red.modelo)
+    yield red
+
+
+async def redactar_en_vivo_async(
+    cfg: Config,
+    fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None,
+    proveedor_pedido: str,
+    pregunta: str,
+    res: ResultadoConsulta,
+    limitador: anyio.CapacityLimiter | None = None,
+) -> AsyncIterator[Fragmento | Redaccion]:
+    """Como `redactar_async`, entregando la prosa en `Fragmento` a medida que llega.
+
+    Los proveedores compatibles con OpenAI se piden con ``stream: true``;
+    Cortex COMPLETE por SQL no transmite por partes y llega en un solo
+    fragmento. Si un proveedor falla a mitad de la respuesta se entrega un
+    fragmento con ``reiniciar`` y sigue la cadena. Lo último que se entrega
+    es la `Redaccion` completa (o la plantilla, que no se fragmenta).
+    Cerrar el generador antes de tiempo corta la petición en curso.
+    """
+    prompt = construir_prompt(pregunta, res)
+    intentos: list[str] = []
+    for pid in _cadena(cfg, proveedor_pedido):
+        partes: list[str] = []
+        try:
+            base_url, api_key, modelo = _destino(cfg, fabrica_conexion, pid)
+            if pid == "cortex":
+                texto = await anyio.to_thread.run_sync(
+                    _redactar_cortex, fabrica_conexion, modelo, prompt, limiter=limitador
+                )
+                if texto:
+                    partes.append(texto)
+                    yield Fragmento(texto, pid, modelo)
+            else:
+                deltas = _deltas_openai_compat_async(
+                    cliente_http_async(cfg), base_url, api_key, modelo, prompt, cfg.timeout_redaccion_s
+                )
+                async with aclosing(deltas):  # cerrar este generador corta también la petición HTTP
+                    async for delta in deltas:
+                        partes.append(delta)
+                        yield Fragmento(delta, pid, modelo)
+            texto = "".join(partes).strip()
+            if texto:
+                yield Redaccion(texto=texto, proveedor=pid, modelo=modelo, degradado=bool(intentos))
+                return
+            raise RuntimeError("Respuesta vacía del proveedor.")
+        except Exception as exc:  # noqa: BLE001 - se degrada de forma controlada
+            intentos.append(f"{pid}: {str(exc)[:150]}")
+            logger.warning("Redacción falló con '%s': %s", pid, str(exc)[:200])
+            if partes:
+                yield Fragmento("", pid, "", reiniciar=True)
+    yield Redaccion(texto=plantilla_resumen(pregunta, res), proveedor="plantilla", modelo="", degradado=True)
+
+
+async def _carrera(
+    cfg: Config,
+    fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None,
+    cadena: list[str],
+    pregunta: str,
+    res: ResultadoConsulta,
+    limitador: anyio.CapacityLimiter | None,
+) -> Redaccion:
+    """Redacción con cobertura: gana la primera respuesta que pasa `verificar_cifras`.
+
+    Arranca el primer proveedor; si no respondió en ``REDACCION_COBERTURA_MS``
+    (o falló antes) arranca el siguiente de la cadena. Al haber ganador los
+    demás se cancelan (Cortex, ya en su hilo, termina y se ignora).
+    ``Redaccion.carrera`` deja para telemetría quién ganó, cada candidato y
+    ``ventaja_min_ms``: cuánto más rápido fue el ganador, como mínimo, que el
+    rival más adelantado que seguía sin responder.
+    """
+    prompt = construir_prompt(pregunta, res)
+    cobertura_s = max(0, cfg.redaccion_cobertura_ms) / 1000
+    t0 = time.monotonic()
+    pendientes = list(cadena)
+    tareas: dict[asyncio.Task[tuple[str, str]], str] = {}
+    candidatos: dict[str, dict[str, Any]] = {}
+
+    def ms() -> int:
+        return int((time.monotonic() - t0) * 1000)
+
+    def lanzar() -> None:
+        pid = pendientes.pop(0)
+        candidatos[pid] = {"proveedor": pid, "inicio_ms": ms()}
+        tareas[asyncio.create_task(_llamar_async(cfg, fabrica_conexion, pid, prompt, limitador))] = pid
+
+    ganador: tuple[str, str, str] | None = None
+    lanzar()
+    try:
+        while tareas and ganador is None:
+            hechas, _ = await asyncio.wait(
+                tareas, timeout=cobertura_s if pendientes else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not hechas:
+                lanzar()  # el primero tarda: cobertura
+                continue
+            for tarea in hechas:
+                pid = tareas.pop(tarea)
+                candidatos[pid]["fin_ms"] = ms()
+                try:
+                    texto, modelo = tarea.result()
+                except Exception as exc:  # noqa: BLE001 - un candidato caído no detiene la carrera
+                    candidatos[pid]["resultado"] = f"error: {str(exc)[:120]}"
+                    logger.warning("Redacción en carrera falló con '%s': %s", pid, str(exc)[:200])
+                    continue
+                if not texto or not verificar_cifras(texto, res.filas, res.n_filas, pregunta).ok:
+                    candidatos[pid]["resultado"] = "invalida" if texto else "vacia"
+                elif ganador is None:
+                    ganador = (pid, modelo, texto)
+                    candidatos[pid]["resultado"] = "ganador"
+                else:
+                    candidatos[pid]["resultado"] = "tarde"
+            if ganador is None and not tareas and pendientes:
+                lanzar()  # todos los lanzados fallaron antes de la cobertura
+    finally:
+        for tarea, pid in tareas.items():
+            tarea.cancel()
+            candidatos[pid].update(fin_ms=ms(), resultado="cancelado")
+
+    carrera: dict[str, Any] = {
+        "ganador": ganador[0] if ganador else "",
+        "cobertura_ms": cfg.redaccion_cobertura_ms,
+        "candidatos": list(candidatos.values()),
+    }
+    if ganador is None:
+        return Redaccion(
+            texto=plantilla_resumen(pregunta, res), proveedor="plantilla", modelo="", degradado=True, carrera=carrera
+        )
+    pid, modelo, texto = ganador
+    ganado = candidatos[pid]
+    rivales = [c["fin_ms"] - c["inicio_ms"] for c in candidatos.values() if c["resultado"] == "cancelado"]
+    if rivales:
+        carrera["ventaja_min_ms"] = max(rivales) - (ganado["fin_ms"] - ganado["inicio_ms"])
+    return Redaccion(texto=texto, proveedor=pid, modelo=modelo, degradado=pid != cadena[0], carrera=carrera)
@@ -0,0 +1,378 @@
+"""Exportes Excel/PPTX como trabajos en un pool de procesos, con progreso y TTL.
+
+openpyxl y python-pptx son CPU puro en Python: generados en el hilo de la
+request compiten por el GIL con los streams SSE del chat de todos los
+usuarios. `ColaExportes` los saca del proceso del servidor:
+
+- **Pool de procesos** (``EXPORT_TRABAJADORES``, contexto *spawn*: el
+  servidor tiene hilos vivos y un *fork* podría heredar locks tomados).
+  Cada trabajador escribe el archivo directo en ``EXPORT_TRABAJOS_DIR``
+  (primero a un temporal, luego ``os.replace``): los bytes no vuelven por pickle.
+- **Cola acotada** (``EXPORT_TRABAJOS_MAX`` entre pendientes y en curso);
+  llena, `enviar` rechaza con `Rechazo` (HTTP 429).
+- **Pool roto**: si un trabajador muere (OOM, señal), el pool queda
+  inservible (`BrokenProcessPool`); se reconstruye y los trabajos que
+  estaban en él se relanzan una vez antes de darlos por fallidos.
+- **Progreso**: los trabajadores informan filas escritas por una cola de
+  multiprocessing que un hilo del servidor vuelca al estado del trabajo.
+- **TTL**: el archivo y el trabajo se olvidan ``EXPORT_TRABAJOS_TTL_S``
+  después de terminar; los de un proceso anterior se borran al arrancar.
+- **Caché**: ``al_terminar`` recibe cada trabajo listo y su archivo (la app
+  lo guarda en `CacheExportes`); un archivo ya cacheado entra con
+  `registrar_listo` como trabajo terminado, sin pasar por el pool.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from motores.admision import Rechazo
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = {"excel": "xlsx", "pptx": "pptx"}
+ESTADOS_FINALES = ("listo", "error")
+_PASO_PROGRESO = 1000  # filas entre avisos de progreso del trabajador
+_PREFIJO = "exporte-"
+
+# Cola de progreso del trabajador (la fija el initializer del pool en cada proceso).
+_avisos: Any = None
+
+
+@dataclass
+class TrabajoExport:
+    """Estado de un exporte en segundo plano (lo que devuelve la API de trabajos)."""
+
+    id: str
+    formato: str
+    nombre: str
+    total: int
+    n_columnas: int
+    chat_id: str = ""
+    session_id: str = ""
+    user_id: str = ""
+    clave: str = ""  # clave de contenido (ETag) en la caché de exportes
+    estado: str = "en_cola"  # en_cola → generando → listo | error
+    hechas: int = 0
+    error: str = ""
+    bytes: int = 0
+    creado: float = 0.0
+    terminado: float = 0.0
+
+    def publico(self) -> dict[str, Any]:
+        """Vista para el cliente (sin rutas ni identidad)."""
+        return {
+            "id": self.id,
+            "formato": self.formato,
+            "estado": self.estado,
+            "hechas": self.hechas,
+            "total": self.total,
+            "progreso": round(self.hechas / self.total, 3) if self.total else (1.0 if self.estado == "listo" else 0.0),
+            "nombre": self.nombre,
+            "bytes": self.bytes,
+            "error": self.error,
+        }
+
+
+# ── Lado del trabajador (otro proceso) ──────────────────────────────────
+
+
+def _iniciar_trabajador(avisos: Any) -> None:
+    global _avisos
+    _avisos = avisos
+
+
+def _avisar(trabajo_id: str, hechas: int) -> None:
+    try:
+        _avisos.put_nowait((trabajo_id, hechas))
+    except Exception as exc:  # noqa: BLE001 - el progreso es informativo; el exporte sigue
+        logger.debug("Aviso de progreso perdido: %s", exc)
+
+
+def _con_progreso(trabajo_id: str, filas: list[list[Any]]) -> Iterator[list[Any]]:
+    for n, fila in enumerate(filas, start=1):
+        yield fila
+        if n % _PASO_PROGRESO == 0:
+            _avisar(trabajo_id, n)
+
+
+def _generar(
+    trabajo_id: str,
+    formato: str,
+    destino: str,
+    pregunta: str,
+    texto: str,
+    sql: str,
+    columnas: list[str],
+    filas: list[list[Any]],
+) -> int:
+    """Escribe el archivo en ``destino`` (vía temporal) y devuelve su tamaño en bytes."""
+    from exportadores import excel, pptx
+
+    _avisar(trabajo_id, 0)
+    temporal = destino + ".parcial"
+    with open(temporal, "wb") as archivo:
+        if formato == "excel":
+            excel.escribir(archivo, pregunta, texto, sql, columnas, _con_progreso(trabajo_id, filas))
+        else:
+            archivo.write(pptx.construir(pregunta, texto, sql, columnas, filas))
+    os.replace(temporal, destino)
+    _avisar(trabajo_id, len(filas))
+    return os.path.getsize(destino)
+
+
+# ── Lado del servidor ───────────────────────────────────────────────────
+
+
+class ColaExportes:
+    """Trabajos de exporte en un pool de procesos, con archivos que vencen.
+
+    Args:
+        trabajadores: Procesos del pool (0 = subsistema apagado: `activa` es False).
+        max_trabajos: Pendientes + en curso como máximo; más allá, `Rechazo`.
+        ttl_s: Segundos que se conserva un trabajo terminado y su archivo.
+        directorio: Dónde se escriben los archivos.
+        al_terminar: Se llama con cada trabajo listo y la ruta de su archivo (fail-open).
+        reloj: Fuente de tiempo monótono (inyectable en pruebas).
+    """
+
+    def __init__(
+        self,
+        trabajadores: int,
+        max_trabajos: int,
+        ttl_s: int,
+        directorio: Path,
+        al_terminar: Callable[[TrabajoExport, Path], None] | None = None,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._trabajadores = max(0, trabajadores)
+        self._max_trabajos = max(1, max_trabajos)
+        self._ttl_s = ttl_s
+        self._dir = directorio
+        self._al_terminar = al_terminar
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._trabajos: dict[str, TrabajoExport] = {}
+        self._pool: ProcessPoolExecutor | None = None
+        self._contexto: Any = None
+        self._avisos: Any = None
+        self._lector: threading.Thread | None = None
+        self._cerrada = False
+        self.rechazos = 0
+        self.fallidos = 0
+        self.reinicios = 0
+        if self._trabajadores:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            for viejo in self._dir.glob(_PREFIJO + "*"):
+                viejo.unlink(missing_ok=True)
+
+    @property
+    def activa(self) -> bool:
+        return self._trabajadores > 0
+
+    def _arrancar(self) -> None:
+        """Crea el pool y el lector de progreso en el primer trabajo (arranque de la app liviano)."""
+        self._contexto = multiprocessing.get_context("spawn")
+        self._avisos = self._contexto.Queue()
+        self._pool = self._nuevo_pool()
+        self._lector = threading.Thread(target=self._leer_avisos, name="exportes-progreso", daemon=True)
+        self._lector.start()
+
+    def _nuevo_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            self._trabajadores, mp_context=self._contexto, initializer=_iniciar_trabajador, initargs=(self._avisos,)
+        )
+
+    def _someter(self, trabajo: TrabajoExport, args: tuple[Any, ...]) -> Future:
+        """Manda el trabajo al pool (con el lock); si el pool está roto, lo reconstruye primero."""
+        if self._pool is None:
+            self._arrancar()
+        try:
+            return self._pool.submit(_generar, trabajo.id, *args)
+        except BrokenProcessPool:
+            roto, self._pool = self._pool, self._nuevo_pool()
+            roto.shutdown(wait=False, cancel_futures=True)
+            self.reinicios += 1
+            logger.warning("Pool de exportes roto (murió un trabajador): se reconstruyó.")
+            return self._pool.submit(_generar, trabajo.id, *args)
+
+    def _leer_avisos(self) -> None:
+        while True:
+            aviso = self._avisos.get()
+            if aviso is None:
+                return
+            trabajo_id, hechas = aviso
+            with self._lock:
+                trabajo = self._trabajos.get(trabajo_id)
+                if trabajo is not None and trabajo.estado not in ESTADOS_FINALES:
+                    trabajo.estado, trabajo.hechas = "generando", max(trabajo.hechas, hechas)
+
+    def _ruta(self, trabajo: TrabajoExport) -> Path:
+        return self._dir / f"{_PREFIJO}{trabajo.id}.{FORMATOS[trabajo.formato]}"
+
+    def _purgar(self) -> None:
+        """Olvida los trabajos terminados hace más de ``ttl_s`` y borra sus archivos (con el lock)."""
+        ahora = self._reloj()
+        for trabajo_id, trabajo in list(self._trabajos.items()):
+            if trabajo.estado in ESTADOS_FINALES and ahora - trabajo.terminado >= self._ttl_s:
+                del self._trabajos[trabajo_id]
+                self._ruta(trabajo).unlink(missing_ok=True)
+
+    def enviar(
+        self,
+        formato: str,
+        nombre: str,
+        pregunta: str,
+        texto: str,
+        sql: str,
+        columnas: list[str],
+        filas: list[list[Any]],
+        chat_id: str = "",
+        session_id: str = "",
+        user_id: str = "",
+        clave: str = "",
+    ) -> TrabajoExport:
+        """Encola un exporte y devuelve su trabajo (estado ``en_cola``).
+
+        Raises:
+            Rechazo: cola llena.
+            ValueError: formato desconocido.
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato sin trabajos en segundo plano: {formato}")
+        trabajo = TrabajoExport(
+            uuid.uuid4().hex,
+            formato,
+            nombre,
+            total=len(filas),
+            n_columnas=len(columnas),
+            chat_id=chat_id,
+            session_id=session_id,
+            user_id=user_id,
+            clave=clave,
+            creado=self._reloj(),
+        )
+        with self._lock:
+            self._purgar()
+            abiertos = sum(1 for t in self._trabajos.values() if t.estado not in ESTADOS_FINALES)
+            if abiertos >= self._max_trabajos:
+                self.rechazos += 1
+                raise Rechazo("Hay demasiados exportes en curso; intente de nuevo en unos segundos.", 5)
+            args = (formato, str(self._ruta(trabajo)), pregunta, texto, sql, columnas, filas)
+            futuro = self._someter(trabajo, args)
+            self._trabajos[trabajo.id] = trabajo
+        futuro.add_done_callback(lambda f: self._terminar(trabajo, f, args))
+        return trabajo
+
+    def _terminar(self, trabajo: TrabajoExport, futuro: Future, args: tuple[Any, ...], relanzado: bool = False) -> None:
+        # Un futuro cancelado (el pool se apagó con él en cola) no tiene resultado ni
+        # excepción que leer: result() lanzaría CancelledError, que no es Exception.
+        cancelado = futuro.cancelled()
+        if not relanzado and (cancelado or isinstance(futuro.exception(), BrokenProcessPool)):
+            with self._lock:
+                nuevo = None if self._cerrada else self._someter(trabajo, args)
+            if nuevo is not None:
+                nuevo.add_done_callback(lambda f: self._terminar(trabajo, f, args, relanzado=True))
+                return
+        with self._lock:
+            trabajo.terminado = self._reloj()
+            if cancelado:
+                self.fallidos += 1
+                trabajo.estado, trabajo.error = "error", "El exporte se canceló antes de generarse."
+                logger.warning("Exporte %s (%s) cancelado antes de correr.", trabajo.id, trabajo.formato)
+                return
+            try:
+                trabajo.bytes = futuro.result()
+            except Exception as exc:  # noqa: BLE001 - el fallo queda en el trabajo y lo ve el cliente
+                self.fallidos += 1
+                trabajo.estado, trabajo.error = "error", "No se pudo generar el archivo."
+                logger.warning("Exporte %s (%s) falló: %s", trabajo.id, trabajo.formato, str(exc)[:200])
+                return
+            trabajo.estado, trabajo.hechas = "listo", trabajo.total
+        if self._al_terminar is not None:
+            try:
+                self._al_terminar(trabajo, self._ruta(trabajo))
+            except Exception as exc:  # noqa: BLE001 - el trabajo ya está listo; solo se pierde la caché
+                logger.warning("al_terminar del exporte %s falló: %s", trabajo.id, exc)
+
+    def registrar_listo(
+        self,
+        formato: str,
+        nombre: str,
+        contenido: bytes,
+        total: int,
+        n_columnas: int,
+        chat_id: str = "",
+        session_id: str = "",
+        user_id: str = "",
+        clave: str = "",
+    ) -> TrabajoExport:
+        """Trabajo ya terminado con un archivo existente (acierto de caché): no ocupa cupo ni pool."""
+        ahora = self._reloj()
+        trabajo = TrabajoExport(
+            uuid.uuid4().hex,
+            formato,
+            nombre,
+            total=total,
+            n_columnas=n_columnas,
+            chat_id=chat_id,
+            session_id=session_id,
+            user_id=user_id,
+            clave=clave,
+            estado="listo",
+            hechas=total,
+            bytes=len(contenido),
+            creado=ahora,
+            terminado=ahora,
+        )
+        self._ruta(trabajo).write_bytes(contenido)
+        with self._lock:
+            self._purgar()
+            self._trabajos[trabajo.id] = trabajo
+        return trabajo
+
+    def obtener(self, trabajo_id: str) -> TrabajoExport | None:
+        """El trabajo vigente con ese id, o ``None`` (desconocido o vencido)."""
+        with self._lock:
+            self._purgar()
+            return self._trabajos.get(trabajo_id)
+
+    def archivo(self, trabajo: TrabajoExport) -> Path | None:
+        """Ruta del archivo de un trabajo listo (``None`` si no lo está o ya se borró)."""
+        ruta = self._ruta(trabajo)
+        return ruta if trabajo.estado == "listo" and ruta.is_file() else None
+
+    def estadisticas(self) -> dict[str, Any]:
+        with self._lock:
+            self._purgar()
+            por_estado = {e: 0 for e in ("en_cola", "generando", "listo", "error")}
+            for t in self._trabajos.values():
+                por_estado[t.estado] += 1
+            return {
+                "trabajadores": self._trabajadores,
+                "max_trabajos": self._max_trabajos,
+                **por_estado,
+                "rechazos": self.rechazos,
+                "fallidos": self.fallidos,
+                "reinicios_pool": self.reinicios,
+            }
+
+    def cerrar(self) -> None:
+        """Apaga el pool y el lector de progreso; lo que seguía en cola queda en error."""
+        with self._lock:
+            self._cerrada = True
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._avisos.put(None)
+            self._pool = None
@@ -1,23 +1,53 @@
 """Orquestador del chat: pregunta → SQL (Analyst) → datos → prosa verificada.
 
-Emite eventos por etapa (para SSE) y termina con un evento ``final``.
+Emite eventos por etapa (para SSE), un evento ``resultado`` con la tabla
+en cuanto Snowflake responde y termina con un evento ``final`` (que
+repite la tabla: el contrato de ``final`` no cambia). El resultado
+completo queda en `AlmacenResultados` bajo el ``chat_id`` para paginarlo
+con ``GET /api/resultados/{chat_id}``.
+Las preguntas que calzan con una consulta verificada toman su SQL del
+índice local sin llamar a Analyst (``meta.proveedor_sql="verified"``).
 Si la ejecución falla, hace UN reintento informándole a Cortex Analyst
 el error exacto (lección de gestion_conocimiento). Todo queda en
-telemetría, incluida la versión de la fuente semántica usada.
+telemetría, incluida la versión de la fuente semántica usada. Las
+respuestas exitosas se guardan en una caché LRU y se reproducen tal cual
+(mismas etapas, ``meta.cache=True``) ante la misma pregunta canónica.
+
+El flujo no hace E/S por sí mismo: pide cada llamada externa como un
+`_Efecto`. `procesar` las resuelve de forma bloqueante (evaluación,
+scripts) y `procesar_async` sin ocupar hilos mientras espera (chat SSE).
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
 import uuid
-from collections.abc import Callable, Iterator
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Generator, Iterator
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
 from typing import Any
 
+import anyio
+import anyio.to_thread
+
 from config import VERSION_APP, Config
-from motores.guardas import validar_sql, verificar_cifras
-from motores.redactor import plantilla_resumen, redactar
+from motores.almacen_resultados import AlmacenResultados, ResultadoGuardado
+from motores.cache import CacheLRU, canonizar, huella
+from motores.consultas_verificadas import IndiceVerificadas
+from motores.guardas import SqlValidada, VerificacionCifras, VerificadorCifras, validar_sql, verificar_cifras
+from motores.redactor import (
+    Redaccion,
+    plantilla_resumen,
+    redactar,
+    redactar_async,
+    redactar_en_vivo,
+    redactar_en_vivo_async,
+)
 from snowflake_.analyst import ClienteAnalyst, ErrorAnalyst, RespuestaAnalyst
+from snowflake_.cache_sql import CacheResultados
+from snowflake_.conexion import SnowflakeNoDisponible
 from snowflake_.ejecutor import ResultadoConsulta, Telemetria, ejecutar_select
 
 logger = logging.getLogger(__name__)
@@ -25,20 +55,75 @@ logger = logging.getLogger(__name__)
 _MAX_TURNOS_HISTORIAL = 6  # user+analyst alternados que se reenvían al servicio
 
 
+@dataclass(frozen=True)
+class _Efecto:
+    """Llamada externa que el flujo pide a su conductor.
+
+    Tipos: analyst | ejecutar | redactar, y para la redacción en vivo
+    en_vivo (abre el stream) | fragmento (siguiente trozo) | cerrar.
+    """
+
+    tipo: str
+    args: tuple[Any, ...]
+
+
+class _Vuelo:
+    """Flujo en curso compartido por sus suscriptores (single-flight, solo en el event loop)."""
+
+    def __init__(self) -> None:
+        self.eventos: list[dict[str, Any]] = []
+        self.registro: dict[str, Any] | None = None
+        self.error: BaseException | None = None
+        self.terminado = False
+        self.suscriptores = 0
+        self.tarea: asyncio.Task[None] | None = None
+        self._aviso: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    def publicar(self, evento: dict[str, Any]) -> None:
+        self.eventos.append(evento)
+        self._avisar()
+
+    def terminar(self) -> None:
+        self.terminado = True
+        self._avisar()
+
+    def _avisar(self) -> None:
+        aviso, self._aviso = self._aviso, asyncio.get_running_loop().create_future()
+        aviso.set_result(None)
+
+    async def esperar(self) -> None:
+        await asyncio.shield(self._aviso)
+
+
+#: Generador del flujo: emite eventos o efectos y recibe el resultado de cada efecto.
+_Pasos = Generator["dict[str, Any] | _Efecto", Any, "dict[str, Any] | None"]
+
+
 class Orquestador:
     """Coordina Analyst, guardas, ejecución, redacción y auditoría."""
 
     def __init__(
         self,
         cfg: Config,
-        fabrica_conexion: Callable[[], Any] | None,
+        fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None,
         telemetria: Telemetria,
         cliente_analyst: ClienteAnalyst | None = None,
+        cache_respuestas: CacheLRU | None = None,
+        cache_sql: CacheResultados | None = None,
+        verificadas: IndiceVerificadas | None = None,
+        resultados: AlmacenResultados | None = None,
     ) -> None:
         self._cfg = cfg
         self._fabrica = fabrica_conexion
         self._telemetria = telemetria
         self._analyst = cliente_analyst
+        self._cache = cache_respuestas
+        self._cache_sql = cache_sql
+        self._verificadas = verificadas
+        self._resultados = resultados
+        self._limitador: anyio.CapacityLimiter | None = None  # hilos para Snowflake en el flujo async
+        self._en_vuelo: dict[str, _Vuelo] = {}  # clave de respuesta → flujo en curso (single-flight)
+        self.coalescidas = 0
 
     # ------------------------------------------------------------------
     def _evento(self, tipo: str, **datos: Any) -> dict[str, Any]:
@@ -75,11 +160,199 @@ class Orquestador:
         proveedor: str = "",
         session_id: str = "",
         user_id: str = "",
+        detalles: dict[str, Any] | None = None,
     ) -> Iterator[dict[str, Any]]:
-        """Genera los eventos del flujo completo para una pregunta.
+        """Genera los eventos del flujo completo para una pregunta (E/S bloqueante).
+
+        Las preguntas sin historial se sirven desde la caché de respuestas
+        cuando hay una respuesta exitosa y no degradada para la misma
+        pregunta canónica, fuente semántica, modelo y proveedor.
+        ``detalles`` se agrega al DETALLES de ``CHAT_LOG`` (p. ej. la espera
+        en la cola de admisión).
 
         Yields:
-            Diccionarios con ``tipo`` en {etapa, error, final}.
+            Diccionarios con ``tipo`` en {etapa, resultado, error, final}.
+        """
+        pasos = self._pasos(pregunta, historial, proveedor, session_id, user_id, detalles)
+        envio: Any = None
+        error: Exception | None = None
+        while True:
+            try:
+                paso = pasos.throw(error) if error is not None else pasos.send(envio)
+            except StopIteration:
+                return
+            envio, error = None, None
+            if not isinstance(paso, _Efecto):
+                yield paso
+                continue
+            try:
+                envio = self._resolver(paso)
+            except Exception as exc:  # noqa: BLE001 - vuelve al flujo, que decide
+                error = exc
+
+    async def procesar_async(
+        self,
+        pregunta: str,
+        historial: list[dict[str, Any]] | None = None,
+        proveedor: str = "",
+        session_id: str = "",
+        user_id: str = "",
+        detalles: dict[str, Any] | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Mismos eventos que `procesar`, sin ocupar un hilo mientras se espera E/S.
+
+        Analyst y los proveedores LLM van por HTTP asíncrono; Snowflake (driver
+        bloqueante) corre en hilos acotados por el tamaño del pool de conexiones,
+        así que un stream abierto solo ocupa un hilo mientras su SQL corre.
+
+        Single-flight: si la misma pregunta (sin historial, misma clave que la
+        caché de respuestas) ya está en curso, esta llamada se suscribe a ese
+        flujo en vez de lanzar otro; recibe sus mismos eventos con un
+        ``chat_id`` propio, ``meta.coalescida=True`` y su propia fila en
+        ``CHAT_LOG`` marcada como coalescida.
+        """
+        limpia = (pregunta or "").strip()
+        clave = self._clave_respuesta(limpia, proveedor) if limpia and not historial else ""
+        vuelo = self._en_vuelo.get(clave) if clave else None
+        if vuelo is not None:
+            async for evento in self._seguir(vuelo, limpia, session_id, user_id, detalles):
+                yield evento
+            return
+        vuelo = _Vuelo()
+        if clave:
+            self._en_vuelo[clave] = vuelo
+        pasos = self._pasos(pregunta, historial, proveedor, session_id, user_id, detalles)
+        vuelo.tarea = asyncio.create_task(self._volar(vuelo, clave, pasos))
+        async for evento in self._escuchar(vuelo):
+            yield evento
+
+    async def _volar(self, vuelo: _Vuelo, clave: str, pasos: _Pasos) -> None:
+        """Conduce el flujo publicando cada evento en ``vuelo`` (independiente de quién escucha).
+
+        Los streams de redacción que abre (efecto ``en_vivo``) se cierran con
+        ``aclose`` al salir: si el vuelo se cancela o falla a mitad de un
+        stream, el flujo no llega a su efecto ``cerrar`` y la petición al
+        proveedor quedaría abierta hasta que el recolector pase por el
+        generador.
+        """
+        envio: Any = None
+        error: Exception | None = None
+        streams: list[AsyncGenerator[Any, None]] = []
+        try:
+            while True:
+                try:
+                    paso = pasos.throw(error) if error is not None else pasos.send(envio)
+                except StopIteration as fin:
+                    vuelo.registro = fin.value
+                    return
+                envio, error = None, None
+                if not isinstance(paso, _Efecto):
+                    vuelo.publicar(paso)
+                    continue
+                try:
+                    envio = await self._resolver_async(paso)
+                except Exception as exc:  # noqa: BLE001 - vuelve al flujo, que decide
+                    error = exc
+                if paso.tipo == "en_vivo" and error is None:
+                    streams.append(envio)
+        except BaseException as exc:
+            vuelo.error = exc
+            raise
+        finally:
+            pasos.close()
+            for stream in streams:
+                try:
+                    await stream.aclose()
+                except Exception as exc:  # noqa: BLE001 - solo libera la conexión; el vuelo ya terminó
+                    logger.warning("No se pudo cerrar el stream de redacción: %s", exc)
+            if clave and self._en_vuelo.get(clave) is vuelo:
+                del self._en_vuelo[clave]
+            vuelo.terminar()
+
+    async def _escuchar(self, vuelo: _Vuelo) -> AsyncIterator[dict[str, Any]]:
+        """Eventos del vuelo desde el primero; cancela el flujo si nadie más lo escucha."""
+        vuelo.suscriptores += 1
+        i = 0
+        try:
+            while True:
+                while i < len(vuelo.eventos):
+                    yield vuelo.eventos[i]
+                    i += 1
+                if vuelo.terminado:
+                    if vuelo.error is not None and not isinstance(vuelo.error, asyncio.CancelledError):
+                        raise vuelo.error
+                    return
+                await vuelo.esperar()
+        finally:
+            vuelo.suscriptores -= 1
+            if vuelo.suscriptores == 0 and vuelo.tarea is not None and not vuelo.tarea.done():
+                vuelo.tarea.cancel()
+
+    async def _seguir(
+        self,
+        vuelo: _Vuelo,
+        pregunta: str,
+        session_id: str,
+        user_id: str,
+        detalles: dict[str, Any] | None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Reemite el flujo de otro como propio y deja su fila en ``CHAT_LOG`` al terminar."""
+        chat_id = uuid.uuid4().hex
+        t0 = time.monotonic()
+        self.coalescidas += 1
+        async for evento in self._escuchar(vuelo):
+            if evento["tipo"] == "resultado" and self._resultados is not None:
+                self._resultados.enlazar(chat_id, evento["chat_id"])
+            evento = {**evento, "chat_id": chat_id}
+            if evento["tipo"] == "final":
+                evento["meta"] = {**evento["meta"], "coalescida": True}
+            yield evento
+        if vuelo.registro is not None:
+            origen = vuelo.registro
+            extra = {**(detalles or {}), "coalescida": True, "chat_id_origen": origen.get("chat_id", "")}
+            self._log(self._registro_derivado(origen, chat_id, pregunta, session_id, user_id, extra), t0)
+
+    def _resolver(self, efecto: _Efecto) -> Any:
+        if efecto.tipo == "analyst":
+            return self._analyst.preguntar(*efecto.args)
+        if efecto.tipo == "ejecutar":
+            return self._ejecutar(*efecto.args)
+        if efecto.tipo == "en_vivo":
+            return redactar_en_vivo(self._cfg, self._fabrica, *efecto.args)
+        if efecto.tipo == "fragmento":
+            return next(efecto.args[0])
+        if efecto.tipo == "cerrar":
+            return efecto.args[0].close()
+        return redactar(self._cfg, self._fabrica, *efecto.args)
+
+    async def _resolver_async(self, efecto: _Efecto) -> Any:
+        if self._limitador is None:
+            self._limitador = anyio.CapacityLimiter(max(1, self._cfg.pool_max))
+        if efecto.tipo == "analyst":
+            return await self._analyst.preguntar_async(*efecto.args)
+        if efecto.tipo == "ejecutar":
+            return await self._ejecutar_async(*efecto.args)
+        if efecto.tipo == "en_vivo":
+            return redactar_en_vivo_async(self._cfg, self._fabrica, *efecto.args, limitador=self._limitador)
+        if efecto.tipo == "fragmento":
+            return await anext(efecto.args[0])
+        if efecto.tipo == "cerrar":
+            return await efecto.args[0].aclose()
+        return await redactar_async(self._cfg, self._fabrica, *efecto.args, limitador=self._limitador)
+
+    def _pasos(
+        self,
+        pregunta: str,
+        historial: list[dict[str, Any]] | None,
+        proveedor: str,
+        session_id: str,
+        user_id: str,
+        detalles: dict[str, Any] | None,
+    ) -> _Pasos:
+        """Validación de entrada, caché de respuestas y flujo completo (sin E/S).
+
+        Devuelve el registro de ``CHAT_LOG`` ya escrito, o ``None`` si la pregunta
+        no llegó a registrarse (vacía, demasiado larga o sin conexión).
         """
         cfg = self._cfg
         chat_id = uuid.uuid4().hex
@@ -96,6 +369,11 @@ class Orquestador:
                 mensaje=f"La pregunta supera el máximo de {cfg.max_caracteres_pregunta} caracteres.",
             )
             return
+        clave = self._clave_respuesta(pregunta, proveedor) if self._cache is not None and not historial else ""
+        if clave:
+            guardada = self._cache.obtener(clave)
+            if guardada is not None:
+                return (yield from self._reproducir(guardada, chat_id, t0, pregunta, session_id, user_id, detalles))
         if self._analyst is None or self._fabrica is None:
             yield self._evento(
                 "error",
@@ -113,15 +391,55 @@ class Orquestador:
             "version_semantica": cfg.semantic_model_file or cfg.semantic_view,
             "proveedor": proveedor or cfg.proveedor_defecto,
         }
+        if detalles:
+            registro["detalles"] = dict(detalles)
+        grabados: list[dict[str, Any]] = []
+        yield from self._flujo(chat_id, t0, pregunta, historial, proveedor, registro, grabados if clave else None)
+        if clave and registro.get("exito") and not registro.get("respuesta_degradada"):
+            self._cache.guardar(clave, {"eventos": grabados, "registro": registro})
+        return registro
+
+    def _flujo(
+        self,
+        chat_id: str,
+        t0: float,
+        pregunta: str,
+        historial: list[dict[str, Any]] | None,
+        proveedor: str,
+        registro: dict[str, Any],
+        grabados: list[dict[str, Any]] | None = None,
+    ) -> _Pasos:
+        """Etapas Analyst → validación → ejecución → redacción; completa ``registro``.
+
+        No hace E/S: pide cada llamada externa con un `_Efecto` y recibe su
+        resultado (o su excepción) del conductor sync o async. Los eventos
+        emitidos se copian en ``grabados`` (para la caché de respuestas).
+        """
+        cfg = self._cfg
+
+        def evento(tipo: str, **datos: Any) -> dict[str, Any]:
+            e = self._evento(tipo, **datos)
+            if grabados is not None:
+                grabados.append(e)
+            return e
 
         try:
-            # 1) Cortex Analyst → SQL -----------------------------------
-            yield self._evento(
-                "etapa", chat_id=chat_id, etapa="analyst", detalle="Interpretando la pregunta con Cortex Analyst…"
-            )
-            t_an = time.monotonic()
-            respuesta = self._analyst.preguntar(pregunta, historial)
-            registro["latencia_analyst_ms"] = int((time.monotonic() - t_an) * 1000)
+            # 1) Consulta verificada o Cortex Analyst → SQL ------------
+            respuesta, v = self._consulta_verificada(pregunta, historial, registro)
+            if v is not None:
+                yield evento(
+                    "etapa",
+                    chat_id=chat_id,
+                    etapa="verificada",
+                    detalle="Pregunta reconocida: se usa una consulta verificada.",
+                )
+            else:
+                yield evento(
+                    "etapa", chat_id=chat_id, etapa="analyst", detalle="Interpretando la pregunta con Cortex Analyst…"
+                )
+                t_an = time.monotonic()
+                respuesta = yield _Efecto("analyst", (pregunta, historial))
+                registro["latencia_analyst_ms"] = int((time.monotonic() - t_an) * 1000)
 
             if not respuesta.sql:
                 texto = respuesta.interpretacion or (
@@ -130,7 +448,7 @@ class Orquestador:
                 )
                 registro.update(exito=False, error="analyst_sin_sql", respuesta=texto)
                 self._log(registro, t0)
-                yield self._evento(
+                yield evento(
                     "final",
                     chat_id=chat_id,
                     texto=texto,
@@ -145,33 +463,44 @@ class Orquestador:
                 return
 
             # 2) Validación de solo lectura ------------------------------
-            yield self._evento("etapa", chat_id=chat_id, etapa="validacion", detalle="Validando la SQL generada…")
+            yield evento("etapa", chat_id=chat_id, etapa="validacion", detalle="Validando la SQL generada…")
             intentos = 1
-            v = validar_sql(respuesta.sql, cfg.esquemas_permitidos, cfg.max_filas_resultado)
+            if v is None:
+                v = validar_sql(respuesta.sql, cfg.esquemas_permitidos, cfg.max_filas_resultado)
             if not v.ok:
                 registro.update(sql=respuesta.sql, sql_validada=False, exito=False, error=f"validacion: {v.motivo}")
                 self._log(registro, t0)
-                yield self._evento(
+                yield evento(
                     "error", chat_id=chat_id, mensaje=f"La SQL generada fue rechazada por seguridad: {v.motivo}"
                 )
                 return
             registro.update(sql=v.sql, sql_validada=True)
-            yield self._evento("etapa", chat_id=chat_id, etapa="sql", detalle="SQL validada.", sql=v.sql)
+            yield evento("etapa", chat_id=chat_id, etapa="sql", detalle="SQL validada.", sql=v.sql)
 
             # 3) Ejecución (con un reintento informando el error) --------
-            yield self._evento("etapa", chat_id=chat_id, etapa="ejecucion", detalle="Consultando Snowflake…")
-            resultado, error_ejec = self._ejecutar(v.sql)
+            yield evento("etapa", chat_id=chat_id, etapa="ejecucion", detalle="Consultando Snowflake…")
+            resultado, error_ejec = yield _Efecto("ejecutar", (v.sql,))
             if resultado is None:
                 intentos = 2
-                yield self._evento(
+                verificada = registro.get("proveedor_sql") == "verified"
+                if not historial and not verificada:
+                    self._analyst.olvidar(pregunta)  # no memorizar una SQL que no corre
+                yield evento(
                     "etapa",
                     chat_id=chat_id,
                     etapa="reintento",
                     detalle="La consulta falló; pidiendo corrección al Analyst…",
                 )
                 try:
-                    respuesta2 = self._analyst.preguntar(
-                        pregunta, self._historial_para_retry(historial or [], respuesta, error_ejec)
+                    # La plantilla verificada no es del Analyst: se le pregunta de cero.
+                    respuesta2 = yield _Efecto(
+                        "analyst",
+                        (
+                            pregunta,
+                            historial
+                            if verificada
+                            else self._historial_para_retry(historial or [], respuesta, error_ejec),
+                        ),
                     )
                 except ErrorAnalyst as exc:
                     respuesta2 = RespuestaAnalyst()
@@ -180,32 +509,60 @@ class Orquestador:
                     v2 = validar_sql(respuesta2.sql, cfg.esquemas_permitidos, cfg.max_filas_resultado)
                     if v2.ok:
                         registro["sql"] = v2.sql
-                        yield self._evento("etapa", chat_id=chat_id, etapa="sql", detalle="SQL corregida.", sql=v2.sql)
-                        resultado, error_ejec = self._ejecutar(v2.sql)
+                        if verificada:
+                            registro.update(proveedor_sql="analyst", confianza_sql=None)
+                            respuesta = respuesta2
+                        yield evento("etapa", chat_id=chat_id, etapa="sql", detalle="SQL corregida.", sql=v2.sql)
+                        resultado, error_ejec = yield _Efecto("ejecutar", (v2.sql,))
             registro["intentos"] = intentos
             if resultado is None:
                 registro.update(exito=False, error=f"ejecucion: {error_ejec[:400]}")
                 self._log(registro, t0)
-                yield self._evento(
+                yield evento(
                     "error", chat_id=chat_id, mensaje=f"La consulta no pudo ejecutarse en Snowflake: {error_ejec[:300]}"
                 )
                 return
             registro.update(n_filas=resultado.n_filas, latencia_sql_ms=resultado.duracion_ms)
-            yield self._evento(
+            if resultado.desde_cache:
+                registro.setdefault("detalles", {})["cache_sql"] = True
+            yield evento(
                 "etapa",
                 chat_id=chat_id,
                 etapa="datos",
                 detalle=f"{resultado.n_filas} fila(s) obtenidas en {resultado.duracion_ms} ms.",
             )
+            if self._resultados is not None:  # completo, para paginar más allá de lo enviado
+                self._resultados.guardar(chat_id, ResultadoGuardado(resultado, sql=registro["sql"], pregunta=pregunta))
+            # La tabla sale antes de redactar: la interfaz la muestra mientras llega la prosa.
+            truncado = resultado.truncado or resultado.n_filas > cfg.max_filas_cliente
+            yield evento(
+                "resultado",
+                chat_id=chat_id,
+                columnas=resultado.columnas,
+                filas=resultado.filas[: cfg.max_filas_cliente],
+                n_filas=resultado.n_filas,
+                truncado=truncado,
+            )
 
             # 4) Redacción bajo contrato --------------------------------
-            yield self._evento("etapa", chat_id=chat_id, etapa="redaccion", detalle="Redactando la respuesta…")
+            yield evento("etapa", chat_id=chat_id, etapa="redaccion", detalle="Redactando la respuesta…")
             t_red = time.monotonic()
-            red = redactar(cfg, self._fabrica, proveedor, pregunta, resultado)
+            verif: VerificacionCifras | None = None
+            if cfg.redaccion_en_vivo and not cfg.redaccion_carrera:
+                red, verif = yield from self._redactar_en_vivo(chat_id, t_red, proveedor, pregunta, resultado, registro)
+                if grabados is not None:  # la caché reproduce la prosa en un solo fragmento
+                    grabados.append(
+                        self._evento("etapa", chat_id=chat_id, etapa="texto_parcial", detalle="", delta=red.texto)
+                    )
+            else:
+                red = yield _Efecto("redactar", (proveedor, pregunta, resultado))
             registro.update(proveedor=red.proveedor, modelo=red.modelo)
+            if red.carrera:
+                registro.setdefault("detalles", {})["carrera"] = red.carrera
 
-            # 5) Verificación de cifras ---------------------------------
-            verif = verificar_cifras(red.texto, resultado.filas, resultado.n_filas, pregunta)
+            # 5) Verificación de cifras (en vivo ya se hizo frase a frase) --
+            if verif is None:
+                verif = verificar_cifras(red.texto, resultado.filas, resultado.n_filas, pregunta)
             if not verif.ok:
                 logger.warning("Cifras huérfanas en la redacción (%s); se usa plantilla.", verif.huerfanas[:5])
                 red.texto = plantilla_resumen(pregunta, resultado)
@@ -218,9 +575,11 @@ class Orquestador:
                 latencia_redaccion_ms=int((time.monotonic() - t_red) * 1000),
             )
             self._log(registro, t0)
+            if self._resultados is not None:
+                self._resultados.anotar_texto(chat_id, red.texto)
 
             # 6) Final ---------------------------------------------------
-            yield self._evento(
+            yield evento(
                 "final",
                 chat_id=chat_id,
                 texto=red.texto,
@@ -228,29 +587,195 @@ class Orquestador:
                 columnas=resultado.columnas,
                 filas=resultado.filas[: cfg.max_filas_cliente],
                 n_filas=resultado.n_filas,
-                truncado=resultado.truncado or resultado.n_filas > cfg.max_filas_cliente,
+                truncado=truncado,
                 sugerencias=respuesta.sugerencias,
                 meta=self._meta(registro, cifras_ok=verif.ok, proveedor=red.proveedor, degradado=red.degradado),
             )
         except ErrorAnalyst as exc:
             registro.update(exito=False, error=f"analyst: {str(exc)[:400]}")
             self._log(registro, t0)
-            yield self._evento("error", chat_id=chat_id, mensaje=f"Cortex Analyst no respondió: {str(exc)[:300]}")
+            yield evento("error", chat_id=chat_id, mensaje=f"Cortex Analyst no respondió: {str(exc)[:300]}")
+        except SnowflakeNoDisponible as exc:
+            registro.update(exito=False, error=f"snowflake_no_disponible: {str(exc)[:400]}")
+            self._log(registro, t0)
+            yield evento(
+                "error",
+                chat_id=chat_id,
+                mensaje=f"Snowflake no está disponible en este momento; reintente en {exc.reintentar_en_s} s.",
+                reintentar_en_s=exc.reintentar_en_s,
+            )
         except Exception as exc:
             logger.exception("Fallo inesperado del orquestador")
             registro.update(exito=False, error=f"interno: {str(exc)[:400]}")
             self._log(registro, t0)
-            yield self._evento(
+            yield evento(
                 "error", chat_id=chat_id, mensaje="Error interno de ExportBot. El equipo puede auditarlo en telemetría."
             )
 
+    def _redactar_en_vivo(
+        self,
+        chat_id: str,
+        t_red: float,
+        proveedor: str,
+        pregunta: str,
+        resultado: ResultadoConsulta,
+        registro: dict[str, Any],
+    ) -> Generator[dict[str, Any] | _Efecto, Any, tuple[Redaccion, VerificacionCifras]]:
+        """Redacción por fragmentos: cada trozo sale como ``etapa="texto_parcial"``.
+
+        Las cifras se verifican por frase terminada: una huérfana corta el
+        stream en ese momento (la interfaz recibe ``reiniciar`` y el final
+        lleva la plantilla) sin esperar al resto del texto. El primer
+        fragmento fija ``latencia_primer_token_ms`` en ``DETALLES``. Los
+        fragmentos no se graban uno a uno para la caché de respuestas.
+        """
+        verificador = VerificadorCifras(resultado.filas, resultado.n_filas, pregunta)
+        flujo = yield _Efecto("en_vivo", (proveedor, pregunta, resultado))
+        partes: list[str] = []
+        while True:
+            parte = yield _Efecto("fragmento", (flujo,))
+            if isinstance(parte, Redaccion):
+                yield _Efecto("cerrar", (flujo,))
+                verif = (
+                    verificador.cerrar()
+                    if partes
+                    else verificar_cifras(parte.texto, resultado.filas, resultado.n_filas, pregunta)
+                )
+                return parte, verif
+            if parte.reiniciar:
+                partes.clear()
+                verificador.reiniciar()
+                yield self._evento("etapa", chat_id=chat_id, etapa="texto_parcial", detalle="", reiniciar=True)
+                continue
+            if not parte.delta:
+                continue
+            registro.setdefault("detalles", {}).setdefault(
+                "latencia_primer_token_ms", int((time.monotonic() - t_red) * 1000)
+            )
+            partes.append(parte.delta)
+            huerfanas = verificador.agregar(parte.delta)
+            if huerfanas:
+                yield _Efecto("cerrar", (flujo,))  # corta la petición: el resto del texto ya no sirve
+                yield self._evento("etapa", chat_id=chat_id, etapa="texto_parcial", detalle="", reiniciar=True)
+                red = Redaccion(texto="".join(partes).strip(), proveedor=parte.proveedor, modelo=parte.modelo)
+                return red, VerificacionCifras(ok=False, huerfanas=huerfanas)
+            yield self._evento("etapa", chat_id=chat_id, etapa="texto_parcial", detalle="", delta=parte.delta)
+
     # ------------------------------------------------------------------
+    def _consulta_verificada(
+        self, pregunta: str, historial: list[dict[str, Any]] | None, registro: dict[str, Any]
+    ) -> tuple[RespuestaAnalyst, SqlValidada | None]:
+        """Busca la pregunta en el índice de consultas verificadas.
+
+        Solo aplica sin historial (un seguimiento depende del contexto) y
+        solo si la SQL rellenada pasa ``validar_sql``; si no, el flujo sigue
+        por Analyst como siempre.
+        """
+        cfg = self._cfg
+        coincidencia = self._verificadas.buscar(pregunta) if self._verificadas is not None and not historial else None
+        if coincidencia is None:
+            registro["proveedor_sql"] = "analyst"
+            return RespuestaAnalyst(), None
+        v = validar_sql(coincidencia.sql, cfg.esquemas_permitidos, cfg.max_filas_resultado)
+        if not v.ok:
+            logger.warning("Consulta verificada %s rechazada por la guarda: %s", coincidencia.origen, v.motivo)
+            registro["proveedor_sql"] = "analyst"
+            return RespuestaAnalyst(), None
+        registro.update(proveedor_sql="verified", confianza_sql=coincidencia.confianza, latencia_analyst_ms=0)
+        registro.setdefault("detalles", {}).update(
+            proveedor_sql="verified", confianza_sql=coincidencia.confianza, plantilla=coincidencia.origen
+        )
+        respuesta = RespuestaAnalyst(
+            sql=coincidencia.sql, interpretacion=f"Consulta verificada: {coincidencia.pregunta_plantilla}"
+        )
+        return respuesta, v
+
+    def _clave_respuesta(self, pregunta: str, proveedor: str) -> str:
+        """Clave de la caché de respuestas: pregunta canónica + fuente + modelo + proveedor."""
+        cfg = self._cfg
+        pedido = (proveedor or cfg.proveedor_defecto or "cortex").lower()
+        return huella(canonizar(pregunta), cfg.fuente_semantica, cfg.cortex_modelo, pedido)
+
+    def _reproducir(
+        self,
+        guardada: dict[str, Any],
+        chat_id: str,
+        t0: float,
+        pregunta: str,
+        session_id: str,
+        user_id: str,
+        detalles: dict[str, Any] | None = None,
+    ) -> Generator[dict[str, Any], Any, dict[str, Any]]:
+        """Reemite la secuencia etapa/final guardada con un chat_id nuevo y ``meta.cache``."""
+        origen = guardada["registro"]
+        extra = {**(detalles or {}), "cache": "respuesta", "chat_id_origen": origen.get("chat_id", "")}
+        registro = self._registro_derivado(origen, chat_id, pregunta, session_id, user_id, extra)
+        self._log(registro, t0)
+        if self._resultados is not None:
+            self._resultados.enlazar(chat_id, origen.get("chat_id", ""))
+        for evento in guardada["eventos"]:
+            evento = {**evento, "chat_id": chat_id}
+            if evento["tipo"] == "final":
+                evento["meta"] = {**evento["meta"], "cache": True, "latencia_analyst_ms": 0, "latencia_sql_ms": 0}
+            yield evento
+        return registro
+
+    @staticmethod
+    def _registro_derivado(
+        origen: dict[str, Any],
+        chat_id: str,
+        pregunta: str,
+        session_id: str,
+        user_id: str,
+        detalles: dict[str, Any],
+    ) -> dict[str, Any]:
+        """Fila de ``CHAT_LOG`` para una respuesta servida con el trabajo de otra (caché o coalescida)."""
+        return {
+            **origen,
+            "chat_id": chat_id,
+            "session_id": session_id,
+            "user_id": user_id,
+            "pregunta": pregunta,
+            "latencia_analyst_ms": 0,
+            "latencia_sql_ms": 0,
+            "latencia_redaccion_ms": 0,
+            "detalles": detalles,
+        }
+
+    def estadisticas_cache(self) -> dict[str, Any]:
+        """Aciertos/fallos de las cachés de respuestas, resultados SQL y Analyst (``{}`` si inactivas)."""
+        return {
+            "respuestas": self._cache.estadisticas() if self._cache is not None else {},
+            "resultados_sql": self._cache_sql.estadisticas() if self._cache_sql is not None else {},
+            "analyst": self._analyst.estadisticas_memo() if self._analyst is not None else {},
+            "en_vuelo": {"activos": len(self._en_vuelo), "coalescidas": self.coalescidas},
+            "resultados_completos": self._resultados.estadisticas() if self._resultados is not None else {},
+        }
+
     def _ejecutar(self, sql: str) -> tuple[ResultadoConsulta | None, str]:
+        guardado = self._cache_sql.obtener(sql, self._cfg.max_filas_resultado) if self._cache_sql is not None else None
+        return (guardado, "") if guardado is not None else self._consultar(sql)
+
+    async def _ejecutar_async(self, sql: str) -> tuple[ResultadoConsulta | None, str]:
+        """`_ejecutar` para el flujo async: la caché se consulta sin hilo; el driver, en uno acotado."""
+        guardado = self._cache_sql.obtener(sql, self._cfg.max_filas_resultado) if self._cache_sql is not None else None
+        if guardado is not None:
+            return guardado, ""
+        return await anyio.to_thread.run_sync(self._consultar, sql, limiter=self._limitador)
+
+    def _consultar(self, sql: str) -> tuple[ResultadoConsulta | None, str]:
+        """Ejecuta en Snowflake (bloqueante) y guarda en la caché de resultados."""
+        max_filas = self._cfg.max_filas_resultado
+        if self._fabrica is None:
+            return None, "sin conexión"
         try:
-            conn = self._fabrica() if self._fabrica else None
-            if conn is None:
-                return None, "sin conexión"
-            return ejecutar_select(conn, sql, self._cfg.max_filas_resultado), ""
+            with self._fabrica() as conn:
+                resultado = ejecutar_select(conn, sql, max_filas, self._cfg.sf_lote_filas)
+            if self._cache_sql is not None:
+                self._cache_sql.guardar(sql, max_filas, resultado)
+            return resultado, ""
+        except SnowflakeNoDisponible:
+            raise  # sin conexión no hay corrección que pedir: el flujo corta con sugerencia de reintento
         except Exception as exc:  # noqa: BLE001 - el texto viaja al reintento
             return None, str(exc)
 
@@ -267,6 +792,9 @@ class Orquestador:
             "version_app": VERSION_APP,
             "fuente_semantica": registro.get("version_semantica", ""),
             "intentos": registro.get("intentos", 1),
+            "cache": False,
+            "proveedor_sql": registro.get("proveedor_sql", "analyst"),
+            "confianza_sql": registro.get("confianza_sql"),
         }
 
     def _log(self, registro: dict[str, Any], t0: float) -> None:
@@ -1,33 +1,92 @@
-"""POST /api/chat — flujo completo por SSE (eventos de etapa + final)."""
+"""POST /api/chat — flujo completo por SSE (eventos de etapa, resultado y final).
+
+El stream se alimenta de `Orquestador.procesar_async`: una conversación
+abierta no retiene un hilo del threadpool mientras espera a Analyst, a
+Snowflake o al proveedor LLM, y la prosa llega por trozos
+(``etapa="texto_parcial"``) a medida que el proveedor la genera. Delante
+va `ControlAdmision`: sin cupo la pregunta espera en la cola justa
+(eventos ``etapa="cola"`` con su puesto) y, con la cola llena o sin
+fichas para el usuario, se responde 429.
+"""
 
 from __future__ import annotations
 
 import json
-from collections.abc import Iterator
+from collections.abc import AsyncIterator
+from typing import Any
 
 from fastapi import APIRouter, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
+from motores.admision import Rechazo
 from schemas import PreguntaEntrada
 
 router = APIRouter(tags=["chat"])
 
 _SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+_AVISO_COLA_S = 2.0  # cada cuánto se repite el puesto aunque no cambie (mantiene vivo el stream)
+
+
+def _sse(evento: dict[str, Any]) -> str:
+    return "data: " + json.dumps(evento, ensure_ascii=False, default=str) + "\n\n"
 
 
 @router.post("/chat")
-def chat(entrada: PreguntaEntrada, request: Request) -> StreamingResponse:
+async def chat(entrada: PreguntaEntrada, request: Request) -> StreamingResponse:
     """Procesa la pregunta y transmite los eventos del orquestador como SSE."""
-    orq = request.app.state.orquestador
-
-    def flujo() -> Iterator[str]:
-        for evento in orq.procesar(
-            pregunta=entrada.pregunta,
-            historial=entrada.historial,
-            proveedor=entrada.proveedor,
+    estado = request.app.state
+    orq, admision = estado.orquestador, estado.admision
+    user_id = entrada.user_id or request.headers.get("x-user-id", "")
+    clave = user_id or entrada.session_id or (request.client.host if request.client else "")
+    try:
+        turno = admision.solicitar(clave)
+    except Rechazo as exc:
+        estado.telemetria.log_evento(
+            "chat_rechazado",
+            {"motivo": str(exc), "reintentar_en_s": exc.reintentar_en_s, **admision.estadisticas()},
             session_id=entrada.session_id,
-            user_id=entrada.user_id or request.headers.get("x-user-id", ""),
-        ):
-            yield "data: " + json.dumps(evento, ensure_ascii=False, default=str) + "\n\n"
+            user_id=user_id,
+        )
+        return JSONResponse(
+            {"detail": str(exc), "reintentar_en_s": exc.reintentar_en_s},
+            status_code=429,
+            headers={"Retry-After": str(exc.reintentar_en_s)},
+        )
+
+    async def flujo() -> AsyncIterator[str]:
+        try:
+            while not turno.admitido:
+                puesto = admision.posicion(turno)
+                yield _sse(
+                    {
+                        "tipo": "etapa",
+                        "chat_id": "",
+                        "etapa": "cola",
+                        "detalle": f"En espera: hay {puesto - 1} pregunta(s) antes que la suya."
+                        if puesto > 1
+                        else "En espera: la suya es la siguiente.",
+                        "posicion": puesto,
+                    }
+                )
+                await admision.esperar(turno, _AVISO_COLA_S)
+            async for evento in orq.procesar_async(
+                pregunta=entrada.pregunta,
+                historial=entrada.historial,
+                proveedor=entrada.proveedor,
+                session_id=entrada.session_id,
+                user_id=user_id,
+                detalles={"cola_ms": turno.espera_ms, "cola_posicion": turno.posicion_inicial}
+                if turno.posicion_inicial
+                else None,
+            ):
+                yield _sse(evento)
+        finally:
+            admision.liberar(turno)
+
+    async def liberar() -> None:
+        admision.liberar(turno)  # también si el cliente se fue antes de empezar el stream
 
-    return StreamingResponse(flujo(), media_type="text/event-stream", headers=_SSE_HEADERS)
+    return StreamingResponse(
+        flujo(), media_type="text/event-stream", headers=_SSE_HEADERS, background=BackgroundTask(liberar)
+    )
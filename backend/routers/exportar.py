@@ -1,49 +1,459 @@
-"""POST /api/exportar/{excel|pptx} — archivos institucionales server-side."""
+"""POST /api/exportar/{excel|pptx|csv|parquet|arrow} — archivos generados server-side.
+
+La tarjeta puede exportarse enviando sus filas o, sin ellas, solo con su
+``chat_id``: el servidor toma entonces el resultado COMPLETO (no solo las
+filas visibles), la SQL y la prosa de `AlmacenResultados`. Si las filas
+ya vencieron pero queda la referencia de la conversación, se releen con
+``RESULT_SCAN(query_id)`` dentro de las 24 h en que Snowflake las
+conserva, sin volver a escanear la tabla.
+
+El Excel se escribe en modo write-only a un archivo temporal (en memoria
+hasta ``_MAX_EXCEL_EN_MEMORIA`` y en disco más allá) y se envía por trozos.
+
+CSV, Parquet y Arrow IPC (`exportadores.tabular`) se escriben mientras se
+envían, lote a lote. Por ``chat_id`` salen del resultado guardado si está
+completo; si estaba recortado (o ya venció) y hay ``query_id``, se leen
+directo de los lotes del cursor de ``RESULT_SCAN`` — con Arrow, sin
+copiarlos a Python — hasta ``EXPORT_MAX_FILAS``. La descarga se registra al
+terminar el envío con las filas realmente escritas.
+
+Excel y PPTX también pueden pedirse como trabajo en segundo plano
+(`motores.trabajos_export`): ``POST /exportar/trabajos/{formato}`` responde
+202 con el id; el progreso se consulta en ``/exportar/trabajos/{id}`` (o
+llega por SSE en ``.../eventos``) y el archivo se baja de ``.../archivo``
+mientras no venza. La generación corre en otro proceso y no le quita GIL a
+los streams del chat.
+
+Excel y PPTX llevan un ETag débil: la clave de contenido de
+`motores.cache_exportes` (pregunta, prosa, SQL, filas, formato, versión y
+día). Con ``If-None-Match`` igual se responde 304 sin generar; si no, el
+archivo sale de `CacheExportes` cuando ya se generó ese día.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import tempfile
+from collections.abc import AsyncIterator, Iterator
 from datetime import datetime
+from typing import Any
 from zoneinfo import ZoneInfo
 
 _TZ_BOGOTA = ZoneInfo("America/Bogota")
 
-from fastapi import APIRouter, Request
-from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
-from exportadores import excel, pptx
+from exportadores import excel, pptx, tabular
+from motores.admision import Rechazo
+from motores.almacen_resultados import ResultadoGuardado
+from motores.cache_exportes import MAX_ARCHIVO_BYTES, clave_exporte
+from motores.trabajos_export import ESTADOS_FINALES, FORMATOS, TrabajoExport
 from schemas import ExportEntrada
+from snowflake_.conexion import SnowflakeNoDisponible
+from snowflake_.ejecutor import ejecutar_select_nativo_por_lotes, releer_resultado, sql_result_scan
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["exportar"])
 
 _MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 _MIME_PPTX = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+_MAX_EXCEL_EN_MEMORIA = 8 * 1024 * 1024
+_MIME = {"excel": _MIME_XLSX, "pptx": _MIME_PPTX}
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+_SONDEO_TRABAJO_S = 0.5
+_NO_DISPONIBLE = "El resultado de esta conversación ya no está disponible; repita la pregunta."
 
 
-def _respuesta(contenido: bytes, nombre: str, mime: str) -> Response:
-    return Response(
-        content=contenido,
-        media_type=mime,
-        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+def _respuesta(contenido: bytes, nombre: str, mime: str, clave: str = "") -> Response:
+    return Response(content=contenido, media_type=mime, headers=_cabeceras(nombre, clave))
+
+
+def _cabeceras(nombre: str, clave: str = "") -> dict[str, str]:
+    cabeceras = {"Content-Disposition": f'attachment; filename="{nombre}"'}
+    if clave:
+        cabeceras |= {"ETag": _etag(clave), "Cache-Control": "private, no-cache"}
+    return cabeceras
+
+
+def _etag(clave: str) -> str:
+    # Débil: mismo contenido y día, pero el sello "Generado" puede diferir en la hora.
+    return f'W/"{clave}"'
+
+
+def _no_modificado(request: Request, clave: str) -> Response | None:
+    """304 si el cliente ya tiene este archivo (``If-None-Match`` con su ETag)."""
+    previos = {e.strip().removeprefix("W/") for e in request.headers.get("if-none-match", "").split(",")}
+    if f'"{clave}"' not in previos:
+        return None
+    return Response(status_code=304, headers={"ETag": _etag(clave), "Cache-Control": "private, no-cache"})
+
+
+def _cacheado(
+    request: Request, formato: str, entrada: ExportEntrada, clave: str, n_filas: int, n_columnas: int
+) -> Response | None:
+    """El archivo ya generado con esta clave (y registra la descarga), o ``None``."""
+    cache = request.app.state.cache_exportes
+    encontrado = cache.obtener(clave) if cache is not None else None
+    if encontrado is None:
+        return None
+    nombre, contenido = encontrado
+    request.app.state.telemetria.log_descarga(
+        entrada.chat_id, formato, nombre, n_filas, n_columnas, entrada.session_id, entrada.user_id
+    )
+    return _respuesta(contenido, nombre, _MIME[formato], clave)
+
+
+def _releer(request: Request, chat_id: str) -> ResultadoGuardado | None:
+    """Filas vencidas en el almacén: ``RESULT_SCAN`` del ``query_id`` recordado (y se vuelven a guardar)."""
+    estado = request.app.state
+    referencia = estado.resultados.referencia(chat_id)
+    if referencia is None or not referencia.resultado.query_id or estado.cfg.modo_auth == "sin_credenciales":
+        return None
+    try:
+        with estado.gestor.prestamo() as conn:
+            resultado = releer_resultado(
+                conn, referencia.resultado.query_id, estado.cfg.max_filas_resultado, estado.cfg.sf_lote_filas
+            )
+    except SnowflakeNoDisponible as exc:
+        raise HTTPException(
+            status_code=503, detail=str(exc), headers={"Retry-After": str(exc.reintentar_en_s)}
+        ) from exc
+    except Exception as exc:  # noqa: BLE001 - fuera de las 24 h (u otro rol) no hay cómo releer
+        logger.warning("RESULT_SCAN de %s falló: %s", referencia.resultado.query_id, str(exc)[:200])
+        return None
+    guardado = ResultadoGuardado(resultado, sql=referencia.sql, pregunta=referencia.pregunta, texto=referencia.texto)
+    estado.resultados.guardar(chat_id, guardado)
+    return guardado
+
+
+def _contenido(request: Request, entrada: ExportEntrada) -> tuple[str, str, str, list[str], list[list[Any]]]:
+    """Pregunta, prosa, SQL, columnas y filas a exportar: las del cuerpo o las guardadas por ``chat_id``."""
+    if entrada.columnas or not entrada.chat_id:
+        return entrada.pregunta, entrada.texto, entrada.sql, entrada.columnas, entrada.filas
+    guardado = request.app.state.resultados.obtener(entrada.chat_id) or _releer(request, entrada.chat_id)
+    if guardado is None:
+        raise HTTPException(status_code=404, detail=_NO_DISPONIBLE)
+    r = guardado.resultado
+    return (
+        entrada.pregunta or guardado.pregunta,
+        entrada.texto or guardado.texto,
+        entrada.sql or guardado.sql,
+        r.columnas,
+        r.filas,
     )
 
 
 @router.post("/exportar/excel")
 def exportar_excel(entrada: ExportEntrada, request: Request) -> Response:
     """Construye el Excel institucional del resultado y registra la descarga."""
-    contenido = excel.construir(entrada.pregunta, entrada.texto, entrada.sql, entrada.columnas, entrada.filas)
+    pregunta, texto, sql, columnas, filas = _contenido(request, entrada)
+    clave = clave_exporte("excel", pregunta, texto, sql, columnas, filas, datetime.now(_TZ_BOGOTA))
+    ya = _no_modificado(request, clave) or _cacheado(request, "excel", entrada, clave, len(filas), len(columnas))
+    if ya is not None:
+        return ya
+    archivo = tempfile.SpooledTemporaryFile(max_size=_MAX_EXCEL_EN_MEMORIA)  # noqa: SIM115 - lo cierra excel.trozos
+    try:
+        n = excel.escribir(archivo, pregunta, texto, sql, columnas, filas)
+    except BaseException:
+        archivo.close()
+        raise
     nombre = f"exportbot_{datetime.now(_TZ_BOGOTA):%Y%m%d_%H%M}.xlsx"
     request.app.state.telemetria.log_descarga(
-        entrada.chat_id, "excel", nombre, len(entrada.filas), len(entrada.columnas), entrada.session_id, entrada.user_id
+        entrada.chat_id, "excel", nombre, n, len(columnas), entrada.session_id, entrada.user_id
+    )
+    cache = request.app.state.cache_exportes
+    if cache is not None and archivo.tell() <= MAX_ARCHIVO_BYTES:
+        archivo.seek(0)
+        contenido = archivo.read()
+        archivo.close()
+        cache.guardar(clave, nombre, contenido)
+        return _respuesta(contenido, nombre, _MIME_XLSX, clave)
+    return StreamingResponse(
+        excel.trozos(archivo),
+        media_type=_MIME_XLSX,
+        headers={**_cabeceras(nombre, clave), "Content-Length": str(archivo.tell())},
     )
-    return _respuesta(contenido, nombre, _MIME_XLSX)
 
 
 @router.post("/exportar/pptx")
 def exportar_pptx(entrada: ExportEntrada, request: Request) -> Response:
     """Construye la presentación institucional del resultado y registra la descarga."""
-    contenido = pptx.construir(entrada.pregunta, entrada.texto, entrada.sql, entrada.columnas, entrada.filas)
+    pregunta, texto, sql, columnas, filas = _contenido(request, entrada)
+    clave = clave_exporte("pptx", pregunta, texto, sql, columnas, filas, datetime.now(_TZ_BOGOTA))
+    ya = _no_modificado(request, clave) or _cacheado(request, "pptx", entrada, clave, len(filas), len(columnas))
+    if ya is not None:
+        return ya
+    contenido = pptx.construir(pregunta, texto, sql, columnas, filas)
     nombre = f"exportbot_{datetime.now(_TZ_BOGOTA):%Y%m%d_%H%M}.pptx"
     request.app.state.telemetria.log_descarga(
-        entrada.chat_id, "pptx", nombre, len(entrada.filas), len(entrada.columnas), entrada.session_id, entrada.user_id
+        entrada.chat_id, "pptx", nombre, len(filas), len(columnas), entrada.session_id, entrada.user_id
+    )
+    if request.app.state.cache_exportes is not None:
+        request.app.state.cache_exportes.guardar(clave, nombre, contenido)
+    return _respuesta(contenido, nombre, _MIME_PPTX, clave)
+
+
+# ── Datos: CSV, Parquet y Arrow IPC ─────────────────────────────────────
+
+
+def _por_columnas(columnas: list[str], filas: list[list[Any]], lote: int) -> Iterator[list[list[Any]]]:
+    """Filas en memoria como lotes de columnas (filas cortas se completan con nulos)."""
+    if not filas:
+        yield [[] for _ in columnas]
+        return
+    for inicio in range(0, len(filas), max(1, lote)):
+        trozo = filas[inicio : inicio + lote]
+        yield [[f[j] if j < len(f) else None for f in trozo] for j in range(len(columnas))]
+
+
+def _desde_cursor(request: Request, query_id: str) -> tuple[list[str], list[str], Iterator[Any]] | None:
+    """Lotes de ``RESULT_SCAN(query_id)`` con la conexión prestada hasta terminar el envío.
+
+    Se lee el primer lote antes de responder: si Snowflake ya no tiene el
+    resultado, el llamador cae al guardado (o a 404) en vez de cortar un
+    archivo a medias.
+
+    Un cliente lento retiene esa conexión toda la descarga, así que a lo
+    sumo ``EXPORT_CURSOR_MAX`` exportes leen del cursor a la vez (siempre
+    menos que ``SF_POOL_MAX``); sin cupo se responde 429.
+
+    Raises:
+        HTTPException: 429 si no hay cupo para otro exporte desde el cursor.
+    """
+    estado = request.app.state
+    if not query_id or estado.cfg.modo_auth == "sin_credenciales":
+        return None
+    cfg = estado.cfg
+    if not estado.exportes_cursor.acquire(blocking=False):
+        raise HTTPException(
+            status_code=429,
+            detail="Hay demasiadas descargas en curso; intente de nuevo en unos segundos.",
+            headers={"Retry-After": "5"},
+        )
+
+    def leer() -> Iterator[tuple[list[str], list[str], Any]]:
+        try:
+            with estado.gestor.prestamo() as conn:
+                yield from ejecutar_select_nativo_por_lotes(
+                    conn, sql_result_scan(query_id), cfg.export_max_filas, cfg.sf_lote_filas
+                )
+        finally:
+            estado.exportes_cursor.release()
+
+    lotes = leer()
+    try:
+        columnas, tipos, primero = next(lotes)
+    except SnowflakeNoDisponible:
+        lotes.close()
+        raise
+    except Exception as exc:  # noqa: BLE001 - fuera de las 24 h (u otro rol): se usa lo guardado
+        lotes.close()
+        logger.warning("RESULT_SCAN de %s falló: %s", query_id, str(exc)[:200])
+        return None
+
+    def resto() -> Iterator[Any]:
+        try:
+            yield primero
+            for _, _, datos in lotes:
+                yield datos
+        finally:
+            lotes.close()  # devuelve la conexión aunque el cliente corte
+
+    return columnas, tipos, resto()
+
+
+def _en_memoria(columnas: list[str], filas: list[list[Any]], lote: int) -> tuple[list[str], list[str], Iterator[Any]]:
+    """Filas ya en memoria: los tipos se deducen de todas ellas antes del primer lote."""
+    tipos = tabular.tipos_de((f[j] if j < len(f) else None for f in filas) for j in range(len(columnas)))
+    return columnas, tipos, _por_columnas(columnas, filas, lote)
+
+
+def _fuente_datos(request: Request, entrada: ExportEntrada) -> tuple[list[str], list[str], Iterator[Any]]:
+    """Columnas, tipos y lotes a exportar: del cuerpo, del resultado guardado o del cursor de Snowflake."""
+    estado = request.app.state
+    lote = estado.cfg.sf_lote_filas
+    if entrada.columnas or not entrada.chat_id:
+        return _en_memoria(entrada.columnas, entrada.filas, lote)
+    guardado = estado.resultados.obtener(entrada.chat_id)
+    if guardado is None or guardado.resultado.truncado:
+        referencia = guardado or estado.resultados.referencia(entrada.chat_id)
+        try:
+            en_vivo = _desde_cursor(request, referencia.resultado.query_id) if referencia is not None else None
+        except SnowflakeNoDisponible as exc:
+            if guardado is None:
+                raise HTTPException(
+                    status_code=503, detail=str(exc), headers={"Retry-After": str(exc.reintentar_en_s)}
+                ) from exc
+            en_vivo = None
+        if en_vivo is not None:
+            return en_vivo
+    if guardado is None:
+        raise HTTPException(status_code=404, detail=_NO_DISPONIBLE)
+    r = guardado.resultado
+    return _en_memoria(r.columnas, r.filas, lote)
+
+
+def _exportar_datos(formato: str, entrada: ExportEntrada, request: Request) -> StreamingResponse:
+    try:
+        tabular.verificar(formato)
+    except tabular.FormatoNoDisponible as exc:
+        raise HTTPException(status_code=501, detail=str(exc)) from exc
+    columnas, tipos, lotes = _fuente_datos(request, entrada)
+    nombre = f"exportbot_{datetime.now(_TZ_BOGOTA):%Y%m%d_%H%M}.{tabular.EXTENSION[formato]}"
+    filas = 0
+
+    def contar(n: int) -> None:
+        nonlocal filas
+        filas += n
+
+    def cuerpo() -> Iterator[bytes]:
+        try:
+            if formato == "csv":
+                yield from tabular.csv_por_lotes(columnas, lotes, contar)
+            else:
+                yield from tabular.arrow_por_lotes(formato, columnas, lotes, contar, tipos)
+        finally:
+            lotes.close()
+            request.app.state.telemetria.log_descarga(
+                entrada.chat_id, formato, nombre, filas, len(columnas), entrada.session_id, entrada.user_id
+            )
+
+    return StreamingResponse(
+        cuerpo(),
+        media_type=tabular.MIME[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+
+@router.post("/exportar/csv")
+def exportar_csv(entrada: ExportEntrada, request: Request) -> StreamingResponse:
+    """CSV UTF-8 del resultado, escrito y enviado lote a lote."""
+    return _exportar_datos("csv", entrada, request)
+
+
+@router.post("/exportar/parquet")
+def exportar_parquet(entrada: ExportEntrada, request: Request) -> StreamingResponse:
+    """Parquet tipado del resultado (un row group por lote; requiere pyarrow)."""
+    return _exportar_datos("parquet", entrada, request)
+
+
+@router.post("/exportar/arrow")
+def exportar_arrow(entrada: ExportEntrada, request: Request) -> StreamingResponse:
+    """Arrow IPC en stream del resultado (requiere pyarrow)."""
+    return _exportar_datos("arrow", entrada, request)
+
+
+# ── Trabajos en segundo plano (Excel y PPTX en el pool de procesos) ─────
+
+
+def _trabajo(request: Request, trabajo_id: str) -> TrabajoExport:
+    trabajo = request.app.state.exportes.obtener(trabajo_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="El exporte no existe o ya venció.")
+    return trabajo
+
+
+@router.post("/exportar/trabajos/{formato}", status_code=202)
+def crear_trabajo(formato: str, entrada: ExportEntrada, request: Request) -> dict:
+    """Encola el Excel o PPTX del resultado y devuelve el trabajo (id, estado y progreso)."""
+    cola = request.app.state.exportes
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=404, detail=f"Formato sin trabajos en segundo plano: {formato}")
+    if not cola.activa:
+        raise HTTPException(status_code=503, detail="Los exportes en segundo plano están desactivados.")
+    pregunta, texto, sql, columnas, filas = _contenido(request, entrada)
+    ahora = datetime.now(_TZ_BOGOTA)
+    clave = clave_exporte(formato, pregunta, texto, sql, columnas, filas, ahora)
+    cache = request.app.state.cache_exportes
+    encontrado = cache.obtener(clave) if cache is not None else None
+    if encontrado is not None:
+        nombre, contenido = encontrado
+        return cola.registrar_listo(
+            formato,
+            nombre,
+            contenido,
+            len(filas),
+            len(columnas),
+            chat_id=entrada.chat_id,
+            session_id=entrada.session_id,
+            user_id=entrada.user_id,
+            clave=clave,
+        ).publico()
+    nombre = f"exportbot_{ahora:%Y%m%d_%H%M}.{FORMATOS[formato]}"
+    try:
+        trabajo = cola.enviar(
+            formato,
+            nombre,
+            pregunta,
+            texto,
+            sql,
+            columnas,
+            filas,
+            chat_id=entrada.chat_id,
+            session_id=entrada.session_id,
+            user_id=entrada.user_id,
+            clave=clave,
+        )
+    except Rechazo as exc:
+        raise HTTPException(
+            status_code=429, detail=str(exc), headers={"Retry-After": str(exc.reintentar_en_s)}
+        ) from exc
+    return trabajo.publico()
+
+
+@router.get("/exportar/trabajos/{trabajo_id}")
+def estado_trabajo(trabajo_id: str, request: Request) -> dict:
+    """Estado y progreso de un exporte en segundo plano."""
+    return _trabajo(request, trabajo_id).publico()
+
+
+@router.get("/exportar/trabajos/{trabajo_id}/eventos")
+async def eventos_trabajo(trabajo_id: str, request: Request) -> StreamingResponse:
+    """Progreso por SSE: un evento por cambio, hasta ``listo`` o ``error``."""
+    _trabajo(request, trabajo_id)
+    cola = request.app.state.exportes
+
+    async def flujo() -> AsyncIterator[str]:
+        anterior = None
+        while True:
+            trabajo = cola.obtener(trabajo_id)
+            vista = trabajo.publico() if trabajo is not None else {"id": trabajo_id, "estado": "vencido"}
+            if vista != anterior:
+                yield "data: " + json.dumps(vista, ensure_ascii=False) + "\n\n"
+                anterior = vista
+            if trabajo is None or trabajo.estado in ESTADOS_FINALES or await request.is_disconnected():
+                return
+            await asyncio.sleep(_SONDEO_TRABAJO_S)
+
+    return StreamingResponse(flujo(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.get("/exportar/trabajos/{trabajo_id}/archivo")
+def archivo_trabajo(trabajo_id: str, request: Request) -> Response:
+    """Descarga el archivo de un trabajo listo y registra la descarga.
+
+    409 mientras se genera; 500 con el motivo si el trabajo falló (es
+    terminal: reintentar la descarga no sirve, hay que pedir otro exporte).
+    """
+    trabajo = _trabajo(request, trabajo_id)
+    if trabajo.clave and trabajo.estado == "listo" and (sin_cambios := _no_modificado(request, trabajo.clave)):
+        return sin_cambios
+    ruta = request.app.state.exportes.archivo(trabajo)
+    if trabajo.estado == "error":
+        raise HTTPException(status_code=500, detail=trabajo.error or "No se pudo generar el archivo.")
+    if ruta is None:
+        raise HTTPException(status_code=409, detail="El archivo aún se está generando.")
+    request.app.state.telemetria.log_descarga(
+        trabajo.chat_id,
+        trabajo.formato,
+        trabajo.nombre,
+        trabajo.total,
+        trabajo.n_columnas,
+        trabajo.session_id,
+        trabajo.user_id,
     )
-    return _respuesta(contenido, nombre, _MIME_PPTX)
+    return FileResponse(ruta, media_type=_MIME[trabajo.formato], headers=_cabeceras(trabajo.nombre, trabajo.clave))
@@ -7,6 +7,8 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Request
 
+from snowflake_.conexion import SnowflakeNoDisponible
+
 router = APIRouter(tags=["metricas"])
 
 
@@ -21,14 +23,19 @@ def _consultar(request: Request, sql: str, params: tuple = ()) -> list[dict[str,
     estado = request.app.state
     if not estado.telemetria.activa:
         raise HTTPException(status_code=503, detail="Telemetría no configurada en este despliegue.")
-    conn = estado.gestor.obtener()
-    cur = conn.cursor()
     try:
-        cur.execute(sql, params)
-        cols = [d[0] for d in cur.description or []]
-        return [dict(zip(cols, fila)) for fila in cur.fetchall()]
-    finally:
-        cur.close()
+        with estado.gestor.prestamo() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, params)
+                cols = [d[0] for d in cur.description or []]
+                return [dict(zip(cols, fila)) for fila in cur.fetchall()]
+            finally:
+                cur.close()
+    except SnowflakeNoDisponible as exc:
+        raise HTTPException(
+            status_code=503, detail=str(exc), headers={"Retry-After": str(exc.reintentar_en_s)}
+        ) from exc
 
 
 @router.get("/metricas/resumen", dependencies=[Depends(_exigir_token)])
@@ -0,0 +1,41 @@
+"""GET /api/resultados/{chat_id} — páginas del resultado completo de una conversación.
+
+El chat entrega solo las primeras ``MAX_FILAS_CLIENTE`` filas; el resto
+queda en `AlmacenResultados` (memoria con derrame a disco, con TTL).
+Esta ruta pagina, ordena y filtra esas filas sin volver a Analyst ni a
+Snowflake. Vencido o desconocido el ``chat_id``, 404: hay que preguntar
+de nuevo.
+"""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from motores.almacen_resultados import paginar
+
+router = APIRouter(tags=["resultados"])
+
+_LIMITE_MAX = 1000  # filas por página
+
+
+@router.get("/resultados/{chat_id}")
+def pagina(
+    chat_id: str,
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=_LIMITE_MAX),
+    orden: str = Query("", description="Columna por la que ordenar."),
+    desc: bool = Query(False, description="Orden descendente."),
+    filtro: str = Query("", max_length=200, description="Texto a buscar en las celdas."),
+    columna: str = Query("", description="Limita el filtro a esta columna."),
+) -> dict:
+    """Filas ``offset..offset+limit`` del resultado guardado, filtradas y ordenadas."""
+    guardado = request.app.state.resultados.obtener(chat_id)
+    if guardado is None:
+        raise HTTPException(
+            status_code=404, detail="El resultado de esta conversación ya no está disponible; repita la pregunta."
+        )
+    try:
+        return {"chat_id": chat_id, **paginar(guardado, offset, limit, orden, desc, filtro, columna)}
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -5,6 +5,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Request
 
 from config import VERSION_APP
+from motores.cliente_http import estadisticas_http
 
 router = APIRouter(tags=["salud"])
 
@@ -24,5 +25,13 @@ def salud(request: Request) -> dict:
         "entorno": e.cfg.entorno,
         "fuente_semantica": e.cfg.fuente_semantica,
         "telemetria": bool(e.telemetria.activa),
+        "telemetria_lotes": e.telemetria.estadisticas(),
+        "caches": e.orquestador.estadisticas_cache(),
+        "pool_snowflake": e.gestor.estadisticas(),
+        "circuito_snowflake": e.gestor.estado_circuito(),
+        "http": estadisticas_http(),
+        "admision_chat": e.admision.estadisticas(),
+        "exportes_segundo_plano": e.exportes.estadisticas(),
+        "cache_exportes": e.cache_exportes.estadisticas() if e.cache_exportes is not None else None,
         "problemas_configuracion": e.problemas_config,
     }
@@ -18,7 +18,11 @@ class PreguntaEntrada(BaseModel):
 
 
 class ExportEntrada(BaseModel):
-    """Cuerpo de POST /api/exportar/{excel|pptx}: la tarjeta se exporta a sí misma."""
+    """Cuerpo de POST /api/exportar/{excel|pptx}: la tarjeta se exporta a sí misma.
+
+    Sin ``columnas`` y con ``chat_id``, se exporta el resultado completo
+    guardado en el servidor para esa conversación (sin reenviar las filas).
+    """
 
     pregunta: str = ""
     texto: str = ""
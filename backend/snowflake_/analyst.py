@@ -5,19 +5,28 @@ en stage) al endpoint ``/api/v2/cortex/analyst/message`` y devuelve la
 SQL generada. Autenticación: PAT (Bearer) o JWT firmado con la llave
 privada RSA — el mismo par de llaves de la conexión del driver.
 
+Las preguntas de un solo turno se memorizan por texto canónico + huella
+de la fuente semántica (md5 del YAML en stage o versión de la vista):
+cambiar el modelo cambia la huella y deja obsoletas las entradas viejas.
+
 Referencia: https://docs.snowflake.com/en/user-guide/snowflake-cortex/cortex-analyst
 """
 
 from __future__ import annotations
 
+import dataclasses
 import logging
 import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from typing import Any
 
+import httpx
 import requests
 
 from config import Config
+from motores.cache import CacheLRU, canonizar, huella
+from motores.cliente_http import cliente_http, cliente_http_async
 
 logger = logging.getLogger(__name__)
 
@@ -127,9 +136,39 @@ class ClienteAnalyst:
 
     RUTA = "/api/v2/cortex/analyst/message"
 
-    def __init__(self, cfg: Config) -> None:
+    def __init__(
+        self,
+        cfg: Config,
+        memo: CacheLRU | None = None,
+        huella_semantica: Callable[[], str] | None = None,
+    ) -> None:
         self._cfg = cfg
         self._jwt = GeneradorJWT(cfg) if cfg.modo_auth == "keypair" else None
+        self._memo = memo
+        self._huella_semantica = huella_semantica
+
+    # -- memoria de respuestas de un turno ------------------------------
+    def _clave_memo(self, pregunta: str) -> str:
+        """Clave por pregunta canónica + fuente + huella; ``""`` si la huella no se conoce."""
+        if self._memo is None or self._huella_semantica is None:
+            return ""
+        version = self._huella_semantica()
+        return huella(canonizar(pregunta), self._cfg.fuente_semantica, version) if version else ""
+
+    def olvidar(self, pregunta: str) -> None:
+        """Descarta la respuesta memorizada (p. ej. porque su SQL falló al ejecutarse)."""
+        clave = self._clave_memo(pregunta)
+        if clave:
+            self._memo.invalidar(clave)
+
+    def invalidar_memo(self) -> None:
+        """Vacía la memoria completa (la fuente semántica cambió)."""
+        if self._memo is not None:
+            self._memo.invalidar()
+
+    def estadisticas_memo(self) -> dict[str, Any]:
+        """Aciertos/fallos de la memoria (``{}`` si está desactivada)."""
+        return self._memo.estadisticas() if self._memo is not None else {}
 
     def _cabeceras(self) -> dict[str, str]:
         cfg = self._cfg
@@ -152,6 +191,10 @@ class ClienteAnalyst:
     def preguntar(self, pregunta: str, historial: list[dict[str, Any]] | None = None) -> RespuestaAnalyst:
         """Envía la pregunta (con historial opcional) y devuelve la respuesta parseada.
 
+        Sin historial, una respuesta con SQL ya obtenida para la misma pregunta
+        canónica y la misma huella semántica se devuelve sin llamar al servicio;
+        con historial (multiturno o reintento) siempre se consulta el servicio.
+
         Args:
             pregunta: Pregunta del usuario en lenguaje natural.
             historial: Turnos previos ya en el formato del servicio
@@ -160,18 +203,71 @@ class ClienteAnalyst:
         Raises:
             ErrorAnalyst: ante HTTP ≠ 200 o cuerpo no interpretable.
         """
+        clave, guardada = self._desde_memo(pregunta, historial)
+        if guardada is not None:
+            return guardada
+        respuesta = self._llamar(pregunta, historial)
+        self._memorizar(clave, respuesta)
+        return respuesta
+
+    async def preguntar_async(self, pregunta: str, historial: list[dict[str, Any]] | None = None) -> RespuestaAnalyst:
+        """Como `preguntar`, con HTTP asíncrono (no ocupa un hilo mientras Analyst responde).
+
+        Raises:
+            ErrorAnalyst: ante HTTP ≠ 200 o cuerpo no interpretable.
+        """
+        clave, guardada = self._desde_memo(pregunta, historial)
+        if guardada is not None:
+            return guardada
+        url, cuerpo = self._peticion(pregunta, historial)
+        try:
+            resp = await cliente_http_async(self._cfg).post(
+                url, json=cuerpo, headers=self._cabeceras(), timeout=self._cfg.timeout_analyst_s, idempotente=True
+            )
+        except httpx.HTTPError as exc:  # red / DNS / timeout
+            raise ErrorAnalyst(f"No se pudo contactar a Cortex Analyst: {exc}") from exc
+        respuesta = self._interpretar(resp.status_code, resp.text, resp.json)
+        self._memorizar(clave, respuesta)
+        return respuesta
+
+    def _desde_memo(self, pregunta: str, historial: list[dict[str, Any]] | None) -> tuple[str, RespuestaAnalyst | None]:
+        """(clave de memoria, copia de la respuesta memorizada o ``None``)."""
+        clave = "" if historial else self._clave_memo(pregunta)
+        guardada = self._memo.obtener(clave) if clave else None
+        if guardada is None:
+            return clave, None
+        return clave, dataclasses.replace(
+            guardada, sugerencias=list(guardada.sugerencias), advertencias=list(guardada.advertencias)
+        )
+
+    def _memorizar(self, clave: str, respuesta: RespuestaAnalyst) -> None:
+        if clave and respuesta.sql:
+            self._memo.guardar(clave, respuesta)
+
+    def _peticion(self, pregunta: str, historial: list[dict[str, Any]] | None) -> tuple[str, dict[str, Any]]:
+        """URL y cuerpo del POST a Analyst."""
         cfg = self._cfg
         mensajes = list(historial or [])
         mensajes.append({"role": "user", "content": [{"type": "text", "text": pregunta}]})
-        cuerpo: dict[str, Any] = {"messages": mensajes, **cfg.fuente_semantica}
-        url = f"https://{cfg.host_rest}{self.RUTA}"
-        try:
-            resp = requests.post(url, json=cuerpo, headers=self._cabeceras(), timeout=cfg.timeout_analyst_s)
-        except requests.RequestException as exc:  # red / DNS / timeout
-            raise ErrorAnalyst(f"No se pudo contactar a Cortex Analyst: {exc}") from exc
-        if resp.status_code != 200:
-            raise ErrorAnalyst(f"Cortex Analyst HTTP {resp.status_code}: {resp.text[:400]}")
+        return f"https://{cfg.host_rest}{self.RUTA}", {"messages": mensajes, **cfg.fuente_semantica}
+
+    @staticmethod
+    def _interpretar(estado: int, texto: str, cargar_json: Callable[[], Any]) -> RespuestaAnalyst:
+        if estado != 200:
+            raise ErrorAnalyst(f"Cortex Analyst HTTP {estado}: {texto[:400]}")
         try:
-            return parsear_respuesta(resp.json())
+            return parsear_respuesta(cargar_json())
         except ValueError as exc:
             raise ErrorAnalyst(f"Respuesta de Analyst no es JSON válido: {exc}") from exc
+
+    def _llamar(self, pregunta: str, historial: list[dict[str, Any]] | None) -> RespuestaAnalyst:
+        """POST al endpoint de Analyst y parseo de la respuesta."""
+        url, cuerpo = self._peticion(pregunta, historial)
+        try:
+            # Analyst no tiene efectos: un 502/503/504 transitorio se reintenta.
+            resp = cliente_http(self._cfg).post(
+                url, json=cuerpo, headers=self._cabeceras(), timeout=self._cfg.timeout_analyst_s, idempotente=True
+            )
+        except requests.RequestException as exc:  # red / DNS / timeout
+            raise ErrorAnalyst(f"No se pudo contactar a Cortex Analyst: {exc}") from exc
+        return self._interpretar(resp.status_code, resp.text, resp.json)
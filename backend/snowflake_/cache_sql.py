@@ -0,0 +1,152 @@
+"""Caché de resultados SQL invalidada por marca de agua de los datos.
+
+Muchas preguntas distintas terminan en la MISMA SQL validada; reescanear
+FACT_EXPORTACIONES_SL por cada una es desperdicio. `CacheResultados`
+guarda el `ResultadoConsulta` compacto bajo el hash de la SQL validada y
+de la marca de agua vigente. `VigiaMarcas` sondea en segundo plano
+consultas baratas (p. ej. ``MAX(LAST_ALTERED)`` del esquema) y, cuando
+la marca cambia — la carga mensual aterrizó —, vacía la caché: las
+entradas no vencen por reloj sino por datos nuevos. Sin marca conocida
+no se guarda nada (fail-safe: nunca se sirve un resultado de datos viejos).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+import threading
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from typing import Any
+
+from motores.cache import CacheLRU, huella
+from snowflake_.ejecutor import ResultadoConsulta
+
+logger = logging.getLogger(__name__)
+
+MARCA_DATOS = "datos"
+MARCA_SEMANTICA = "semantica"
+
+
+class VigiaMarcas:
+    """Sondea consultas de marca de agua y notifica cuando alguna cambia.
+
+    Args:
+        fabrica_conexion: Callable que presta una conexión (``with fabrica() as conn``).
+        consultas: ``{nombre: sql}``; la marca es la primera fila devuelta,
+            con sus columnas unidas por ``|`` (un escalar o, p. ej., la
+            fila de ``LIST @stage/archivo`` con su md5 y fecha).
+        intervalo_s: Segundos entre sondeos del hilo de fondo.
+    """
+
+    def __init__(
+        self, fabrica_conexion: Callable[[], AbstractContextManager[Any]], consultas: dict[str, str], intervalo_s: int
+    ) -> None:
+        self._fabrica = fabrica_conexion
+        self._consultas = {n: s for n, s in consultas.items() if s}
+        self._intervalo_s = max(5, int(intervalo_s))
+        self._marcas: dict[str, str] = {}
+        self._oyentes: list[Callable[[str, str, str], None]] = []
+        self._alto = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+    # -- ciclo de vida ---------------------------------------------------
+    def iniciar(self) -> None:
+        """Arranca el hilo de sondeo (el primer sondeo es inmediato)."""
+        if self._hilo is not None or not self._consultas:
+            return
+        self._alto.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="vigia-marcas", daemon=True)
+        self._hilo.start()
+
+    def detener(self, espera_s: float = 2.0) -> None:
+        """Detiene el sondeo (best-effort)."""
+        if self._hilo is None:
+            return
+        self._alto.set()
+        self._hilo.join(timeout=espera_s)
+        self._hilo = None
+
+    def _bucle(self) -> None:
+        while not self._alto.is_set():
+            self.sondear()
+            self._alto.wait(self._intervalo_s)
+
+    # -- API -------------------------------------------------------------
+    def suscribir(self, oyente: Callable[[str, str, str], None]) -> None:
+        """Registra ``oyente(nombre, anterior, nueva)`` para los cambios de marca."""
+        self._oyentes.append(oyente)
+
+    def marca(self, nombre: str) -> str:
+        """Última marca observada; ``""`` si aún no se conoce o el sondeo falla."""
+        return self._marcas.get(nombre, "")
+
+    def marcas(self) -> dict[str, str]:
+        """Copia de todas las marcas conocidas (para ``/api/salud``)."""
+        return dict(self._marcas)
+
+    def sondear(self) -> None:
+        """Un pase de sondeo sobre todas las consultas; los fallos solo se registran."""
+        for nombre, sql in self._consultas.items():
+            try:
+                with self._fabrica() as conn:
+                    cur = conn.cursor()
+                    try:
+                        cur.execute(sql)
+                        fila = cur.fetchone()
+                    finally:
+                        cur.close()
+            except Exception as exc:  # noqa: BLE001 - el sondeo nunca tumba la app
+                logger.warning("Marca de agua '%s' no disponible: %s", nombre, str(exc)[:200])
+                continue
+            nueva = "|".join("" if v is None else str(v) for v in fila) if fila else ""
+            anterior = self._marcas.get(nombre, "")
+            self._marcas[nombre] = nueva
+            if anterior and nueva != anterior:
+                logger.info("Marca de agua '%s' cambió (%s → %s).", nombre, anterior, nueva)
+                for oyente in self._oyentes:
+                    try:
+                        oyente(nombre, anterior, nueva)
+                    except Exception:
+                        logger.debug("Oyente de marca falló", exc_info=True)
+
+
+def _medir_resultado(res: ResultadoConsulta) -> int:
+    """Bytes aproximados del resultado: su JSON de columnas y filas."""
+    return len(json.dumps([res.columnas, res.filas], ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class CacheResultados:
+    """Resultados de ``ejecutar_select`` por hash de SQL validada + marca de datos vigente."""
+
+    def __init__(self, max_entradas: int, max_bytes: int, vigia: VigiaMarcas) -> None:
+        self._cache = CacheLRU(max_entradas, max_bytes, ttl_s=None, medir=_medir_resultado)
+        self._vigia = vigia
+        vigia.suscribir(self._al_cambiar_marca)
+
+    def _al_cambiar_marca(self, nombre: str, anterior: str, nueva: str) -> None:
+        if nombre == MARCA_DATOS:
+            self._cache.invalidar()
+
+    def _clave(self, sql: str, max_filas: int) -> str:
+        marca = self._vigia.marca(MARCA_DATOS)
+        return huella(sql, max_filas, marca) if marca else ""
+
+    def obtener(self, sql: str, max_filas: int) -> ResultadoConsulta | None:
+        """Resultado guardado para la SQL (ya validada) o ``None``."""
+        clave = self._clave(sql, max_filas)
+        guardado = self._cache.obtener(clave) if clave else None
+        if guardado is None:
+            return None
+        return dataclasses.replace(guardado, duracion_ms=0, desde_cache=True)
+
+    def guardar(self, sql: str, max_filas: int, resultado: ResultadoConsulta) -> None:
+        """Guarda el resultado si hay marca de datos conocida."""
+        clave = self._clave(sql, max_filas)
+        if clave:
+            self._cache.guardar(clave, resultado)
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Ratio de aciertos, bytes retenidos y marca de datos vigente."""
+        return {**self._cache.estadisticas(), "marca_datos": self._vigia.marca(MARCA_DATOS)}
@@ -0,0 +1,235 @@
+"""Carga masiva de telemetría: NDJSON comprimido → ``PUT`` a stage → ``COPY INTO``.
+
+Con ``TELEMETRIA_MODO=stage`` las filas de las tablas de alto volumen
+(``EVENT_LOG`` y ``UI_EVENT``) no viajan como ``INSERT``: el worker de
+`Telemetria` las agrega a un archivo ``.ndjson.gz`` por tabla y, cada
+``TELEMETRIA_STAGE_INTERVALO_S``, `CargadorStage` sube los archivos
+cerrados al stage interno y los carga con un ``COPY INTO`` por tabla.
+Miles de sentencias pequeñas por hora pasan a ser unas pocas cargas.
+
+Los archivos quedan en disco hasta que el ``COPY`` termina, así que un
+reinicio o una caída de Snowflake no los pierde: se suben en la próxima
+ronda (el historial de carga del ``COPY`` evita duplicar un archivo que
+ya entró). ``EscritorNDJSON`` no toca Snowflake y se prueba solo.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import functools
+import gzip
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from pathlib import Path
+from typing import IO, Any, Self
+
+logger = logging.getLogger(__name__)
+
+TABLAS_MASIVAS = frozenset({"EVENT_LOG", "UI_EVENT"})
+_SUFIJO = ".ndjson.gz"
+_RE_INSERT = re.compile(
+    r"^INSERT INTO (?:[\w$]+\.)*([\w$]+) \(([^)]*)\) (?:SELECT (.+)|VALUES \((.+)\))$", re.DOTALL | re.IGNORECASE
+)
+
+
+@functools.lru_cache(maxsize=32)
+def _plantilla(sql: str) -> tuple[str, tuple[str, ...], tuple[bool, ...]] | None:
+    """``INSERT`` de telemetría → (tabla, columnas, cuáles van por ``PARSE_JSON``)."""
+    m = _RE_INSERT.match(sql)
+    if m is None:
+        return None
+    tabla, columnas, select, valores = m.groups()
+    nombres = tuple(c.strip().upper() for c in columnas.split(","))
+    # Solo las expresiones con parámetro: CURRENT_TIMESTAMP() y similares las pone el DEFAULT.
+    expresiones = [e.strip() for e in (select or valores).split(",")]
+    if len(expresiones) != len(nombres):
+        return None
+    con_param = [(n, e) for n, e in zip(nombres, expresiones) if "%s" in e]
+    return (
+        tabla.upper(),
+        tuple(n for n, _ in con_param),
+        tuple(e.upper().startswith("PARSE_JSON") for _, e in con_param),
+    )
+
+
+def _ahora_iso() -> str:
+    return dt.datetime.now(dt.UTC).isoformat()
+
+
+class FilaEvento(tuple):
+    """Parámetros de un ``INSERT`` sellados con el instante en que se encoló el evento.
+
+    Es una tupla normal para el ``INSERT`` (y para el conector); `EscritorNDJSON`
+    usa ``instante`` como ``EVENT_TS``, así el lote que se escribe segundos
+    después no corre la hora de sus eventos.
+    """
+
+    instante: str
+
+    def __new__(cls, params: tuple[Any, ...], instante: str | None = None) -> Self:
+        fila = super().__new__(cls, params)
+        fila.instante = instante or _ahora_iso()
+        return fila
+
+
+class EscritorNDJSON:
+    """Un archivo ``TABLA__<ns>.ndjson.gz`` abierto por tabla; :meth:`rotar` lo cierra.
+
+    Cada fila lleva además ``EVENT_ID``, ``EVENT_TS`` (instante real del
+    evento: el de su `FilaEvento`, no el de la escritura ni el de la carga) y
+    ``APP_NAME``: con ``MATCH_BY_COLUMN_NAME`` el ``COPY`` no aplica los
+    ``DEFAULT`` de la tabla.
+    """
+
+    def __init__(self, directorio: Path, app: str) -> None:
+        self._dir = directorio
+        self._app = app
+        self._abiertos: dict[str, tuple[Path, IO[str]]] = {}
+        self._lock = threading.Lock()
+        self.filas_escritas = 0
+
+    def acepta(self, sql: str) -> bool:
+        """¿La sentencia es de una tabla que se carga por stage?"""
+        plantilla = _plantilla(sql)
+        return plantilla is not None and plantilla[0] in TABLAS_MASIVAS
+
+    def agregar(self, sql: str, filas: list[tuple[Any, ...]]) -> None:
+        """Agrega las filas de un ``INSERT`` al archivo abierto de su tabla.
+
+        Raises:
+            ValueError: si la sentencia no es de una tabla masiva.
+            OSError: si el disco no acepta la escritura.
+        """
+        plantilla = _plantilla(sql)
+        if plantilla is None or plantilla[0] not in TABLAS_MASIVAS:
+            raise ValueError("Sentencia sin carga masiva.")
+        tabla, columnas, es_json = plantilla
+        ahora = _ahora_iso()
+        lineas = []
+        for params in filas:
+            registro: dict[str, Any] = {
+                "EVENT_ID": str(uuid.uuid4()),
+                "EVENT_TS": getattr(params, "instante", ahora),
+                "APP_NAME": self._app,
+            }
+            for columna, json_, valor in zip(columnas, es_json, params):
+                registro[columna] = json.loads(valor) if json_ and isinstance(valor, str) else valor
+            lineas.append(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        with self._lock:
+            archivo = self._archivo(tabla)
+            archivo.write("".join(lineas))
+            self.filas_escritas += len(lineas)
+
+    def _archivo(self, tabla: str) -> IO[str]:
+        if tabla not in self._abiertos:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            ruta = self._dir / f"{tabla}__{time.time_ns():020d}{_SUFIJO}"
+            archivo = gzip.open(ruta, "at", encoding="utf-8")  # noqa: SIM115 - abierto hasta rotar()
+            self._abiertos[tabla] = (ruta, archivo)
+        return self._abiertos[tabla][1]
+
+    def rotar(self) -> None:
+        """Cierra los archivos abiertos: quedan listos para subir."""
+        with self._lock:
+            for _, archivo in self._abiertos.values():
+                archivo.close()
+            self._abiertos.clear()
+
+    def listos(self) -> dict[str, list[Path]]:
+        """Archivos cerrados por tabla, del más viejo al más nuevo."""
+        with self._lock:
+            abiertos = {ruta for ruta, _ in self._abiertos.values()}
+        por_tabla: dict[str, list[Path]] = {}
+        if not self._dir.is_dir():
+            return por_tabla
+        for ruta in sorted(self._dir.glob(f"*__*{_SUFIJO}")):
+            tabla = ruta.name.split("__", 1)[0]
+            if ruta not in abiertos and tabla in TABLAS_MASIVAS:
+                por_tabla.setdefault(tabla, []).append(ruta)
+        return por_tabla
+
+
+class CargadorStage:
+    """Sube los archivos listos al stage interno y los carga con ``COPY INTO`` por tabla.
+
+    Args:
+        fabrica_conexion: Callable que presta una conexión (``with fabrica() as conn``).
+        escritor: Escritor cuyos archivos se cargan.
+        esquema: ``DB.SCHEMA`` de las tablas de telemetría.
+        stage: Stage interno (``DB.SCHEMA.STAGE``).
+    """
+
+    def __init__(
+        self,
+        fabrica_conexion: Callable[[], AbstractContextManager[Any]],
+        escritor: EscritorNDJSON,
+        esquema: str,
+        stage: str,
+    ) -> None:
+        self._fabrica = fabrica_conexion
+        self.escritor = escritor
+        self._esquema = esquema
+        self._stage = stage
+        self.cargas = 0
+        self.archivos_cargados = 0
+        self.errores = 0
+        self.ultima_carga_ms = 0
+
+    def cargar(self) -> int:
+        """Rota, sube y carga todo lo listo; devuelve cuántos archivos entraron.
+
+        Los archivos de una tabla se borran del disco solo si su ``COPY`` terminó.
+        """
+        self.escritor.rotar()
+        listos = self.escritor.listos()
+        if not listos:
+            return 0
+        t0 = time.monotonic()
+        cargados = 0
+        try:
+            with self._fabrica() as conn:
+                cur = conn.cursor()
+                try:
+                    for tabla, rutas in listos.items():
+                        destino = f"@{self._stage}/{tabla}/"
+                        for ruta in rutas:
+                            cur.execute(
+                                f"PUT 'file://{ruta.resolve().as_posix()}' {destino} "
+                                "AUTO_COMPRESS = FALSE SOURCE_COMPRESSION = GZIP OVERWRITE = TRUE"
+                            )
+                        cur.execute(
+                            f"COPY INTO {self._esquema}.{tabla} FROM {destino} "
+                            "FILE_FORMAT = (TYPE = JSON) MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE "
+                            "ON_ERROR = CONTINUE PURGE = TRUE"
+                        )
+                        for ruta in rutas:
+                            ruta.unlink(missing_ok=True)
+                        cargados += len(rutas)
+                finally:
+                    cur.close()
+        except Exception as exc:  # noqa: BLE001 - los archivos quedan para la próxima ronda
+            self.errores += 1
+            logger.warning("Telemetría: carga por stage falló (%s); se reintenta luego", str(exc)[:200])
+        if cargados:
+            self.cargas += 1
+            self.archivos_cargados += cargados
+            self.ultima_carga_ms = int((time.monotonic() - t0) * 1000)
+        return cargados
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Cargas hechas, archivos pendientes en disco y latencia de la última carga."""
+        return {
+            "stage": self._stage,
+            "filas_escritas": self.escritor.filas_escritas,
+            "archivos_pendientes": sum(len(r) for r in self.escritor.listos().values()),
+            "cargas": self.cargas,
+            "archivos_cargados": self.archivos_cargados,
+            "errores": self.errores,
+            "ultima_carga_ms": self.ultima_carga_ms,
+        }
@@ -2,9 +2,20 @@
 
 Porta a FastAPI el patrón probado en Tres Ejes / gestion_conocimiento:
 llave privada en Base64 vía entorno (apto Railway/Colab), llave de
-respaldo ante error JWT, reintentos solo en fallos transitorios y
-``query_tag`` para trazabilidad. `snowflake-connector-python` se importa
-de forma diferida para que el paquete cargue (y se pruebe) sin el driver.
+respaldo ante error JWT y ``query_tag`` para trazabilidad.
+`snowflake-connector-python` se importa de forma diferida para que el
+paquete cargue (y se pruebe) sin el driver.
+
+Las conexiones viven en un pool acotado (``SF_POOL_MIN``/``SF_POOL_MAX``):
+cada chat, la telemetría, la redacción Cortex y las métricas toman una
+con ``with gestor.prestamo() as conn`` y la devuelven al salir, en vez
+de serializarse sobre una única sesión.
+
+Los reintentos de conexión NO ocurren en el hilo de la petición: tras
+``SF_CIRCUITO_FALLOS`` fallos seguidos el circuito se abre, un hilo de
+fondo reintenta con espera exponencial (semiabierto → cerrado al primer
+éxito) y mientras tanto ``prestamo`` responde al instante con
+:class:`SnowflakeNoDisponible` y una sugerencia de reintento.
 """
 
 from __future__ import annotations
@@ -12,16 +23,32 @@ from __future__ import annotations
 import logging
 import threading
 import time
-from collections.abc import Callable
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 from typing import Any
 
 from config import Config
 
 logger = logging.getLogger(__name__)
 
-_REINTENTOS = 3
-_ESPERA_TRANSITORIA_S = 5
 _MARCAS_ERROR_LLAVE = ("JWT token is invalid", "JWT_TOKEN_INVALID", "Private key")
+_VALIDAR_TRAS_S = 60  # una conexión ociosa más tiempo que esto se prueba con SELECT 1 al prestarse
+
+
+CERRADO, ABIERTO, SEMIABIERTO = "cerrado", "abierto", "semiabierto"
+
+
+class SnowflakeNoDisponible(RuntimeError):
+    """Snowflake inaccesible: el circuito está abierto o la reconexión falló.
+
+    Attributes:
+        reintentar_en_s: Segundos sugeridos antes de reintentar (``Retry-After``).
+    """
+
+    def __init__(self, mensaje: str, reintentar_en_s: float) -> None:
+        super().__init__(mensaje)
+        self.reintentar_en_s = max(1, int(reintentar_en_s + 0.999))
 
 
 def _cargar_llave_der(b64_pem: str, passphrase: str) -> bytes:
@@ -37,18 +64,45 @@ def _cargar_llave_der(b64_pem: str, passphrase: str) -> bytes:
 
 
 class GestorConexion:
-    """Mantiene UNA conexión viva a Snowflake y la recrea cuando muere.
+    """Pool acotado de conexiones a Snowflake que recrea las que mueren.
 
-    Thread-safe: el orquestador, la telemetría y los routers piden la
-    conexión vía :meth:`obtener`; los cursores son por llamada.
+    Thread-safe: el orquestador, la telemetría y los routers toman una
+    conexión con :meth:`prestamo` (context manager) y la devuelven al
+    salir; los cursores son por llamada. Las conexiones se crean bajo
+    demanda hasta ``SF_POOL_MAX``; las ociosas por más de
+    ``SF_POOL_INACTIVIDAD_S`` se cierran en segundo plano sin bajar de
+    ``SF_POOL_MIN``.
     """
 
     def __init__(self, cfg: Config, query_tag: str = "EXPORTBOT") -> None:
         self._cfg = cfg
         self._query_tag = query_tag
-        self._conn: Any | None = None
-        self._lock = threading.Lock()
+        self._min = max(0, cfg.pool_min)
+        self._max = max(1, self._min, cfg.pool_max)
+        self._libres: deque[tuple[Any, float]] = deque()  # (conexión, devuelta_en)
+        self._en_uso = 0
+        self._creando = 0
+        self._cerrado = False
+        self._cond = threading.Condition()
+        self._alto = threading.Event()
+        self._segador: threading.Thread | None = None
         self._llave_preferida = 1  # recuerda cuál llave funcionó (rotación sin downtime)
+        # Estadísticas del pool (para /api/salud).
+        self._esperando = 0
+        self._prestamos = 0
+        self._espera_total_s = 0.0
+        self._espera_max_s = 0.0
+        self._agotados = 0
+        self._creadas = 0
+        self._descartadas = 0
+        # Circuito de reconexión.
+        self._circuito = CERRADO
+        self._fallos_seguidos = 0
+        self._proximo_intento = 0.0  # monotonic del próximo intento de fondo
+        self._espera_circuito_s = float(max(1, cfg.circuito_espera_s))
+        self._transiciones = {CERRADO: 0, ABIERTO: 0, SEMIABIERTO: 0}
+        self._ultimo_error = ""
+        self._reconector: threading.Thread | None = None
 
     # ------------------------------------------------------------------
     def _kwargs_base(self) -> dict[str, Any]:
@@ -87,10 +141,11 @@ class GestorConexion:
         return snowflake.connector.connect(**kwargs)
 
     def conectar(self) -> Any:
-        """Crea la conexión con reintentos y failover de llave 1→2.
+        """Crea UNA conexión con failover de llave 1→2 (sin esperas: los
+        reintentos los hace el circuito en segundo plano).
 
         Raises:
-            RuntimeError: si todos los intentos fallan (mensaje con la causa).
+            RuntimeError: si ninguna llave conecta (mensaje con la causa).
         """
         cfg = self._cfg
         if cfg.modo_auth == "sin_credenciales":
@@ -106,54 +161,299 @@ class GestorConexion:
                 ordenes.append(respaldo)
 
         ultimo_error: Exception | None = None
-        for intento in range(_REINTENTOS):
-            for num_llave in ordenes:
+        for num_llave in ordenes:
+            try:
+                conn = self._intentar(num_llave)
+                if num_llave is not None:
+                    self._llave_preferida = num_llave
+                logger.info("Conexión Snowflake establecida (auth=%s).", cfg.modo_auth)
+                return conn
+            except Exception as exc:  # noqa: BLE001 - se clasifica abajo
+                ultimo_error = exc
+                texto = str(exc)
+                es_llave = any(marca in texto for marca in _MARCAS_ERROR_LLAVE)
+                logger.warning(
+                    "Fallo de conexión (llave=%s, error_llave=%s): %s",
+                    num_llave,
+                    es_llave,
+                    texto[:300],
+                )
+                if not es_llave:
+                    break  # error transitorio: no rote llave; el circuito reintenta
+        raise RuntimeError(f"Snowflake inaccesible: {ultimo_error}")
+
+    # ------------------------------------------------------------------
+    @contextmanager
+    def prestamo(self, espera_s: float | None = None) -> Iterator[Any]:
+        """Presta una conexión viva del pool y la devuelve al salir del bloque.
+
+        Args:
+            espera_s: Plazo del llamador (por defecto ``SF_POOL_ESPERA_S``)
+                para esperar una conexión libre o la reconexión en curso.
+
+        Raises:
+            SnowflakeNoDisponible: circuito abierto (y la reconexión no
+                llegaría dentro del plazo) o la conexión no pudo crearse.
+            RuntimeError: si no hay conexión libre dentro del plazo.
+        """
+        conn = self._tomar(self._cfg.pool_espera_s if espera_s is None else espera_s)
+        try:
+            yield conn
+        finally:
+            self._devolver(conn)
+
+    def fabrica(self) -> Callable[[], AbstractContextManager[Any]]:
+        """Callable sin argumentos que presta una conexión (para inyectar).
+
+        Uso: ``with fabrica() as conn: ...``.
+        """
+        return self.prestamo
+
+    def _tomar(self, espera_s: float) -> Any:
+        t0 = time.monotonic()
+        limite = t0 + max(0.0, espera_s)
+        with self._cond:
+            while True:
+                if self._cerrado:
+                    raise RuntimeError("El pool de conexiones Snowflake está cerrado.")
+                if self._libres:
+                    conn, devuelta = self._libres.pop()  # LIFO: las viejas quedan para el segador
+                    self._en_uso += 1
+                    break
+                if self._circuito != CERRADO:
+                    # Esperar solo si la reconexión de fondo puede llegar dentro del plazo.
+                    ahora = time.monotonic()
+                    reintento = max(0.0, self._proximo_intento - ahora)
+                    if ahora + reintento >= limite:
+                        raise SnowflakeNoDisponible(
+                            f"Snowflake no disponible (circuito {self._circuito}): {self._ultimo_error[:200]}",
+                            reintento or self._espera_circuito_s,
+                        )
+                    self._esperando += 1
+                    try:
+                        self._cond.wait(limite - ahora)
+                    finally:
+                        self._esperando -= 1
+                    continue
+                if self._en_uso + self._creando < self._max:
+                    conn, devuelta = None, 0.0
+                    self._creando += 1
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._agotados += 1
+                    self._espera_max_s = max(self._espera_max_s, time.monotonic() - t0)
+                    raise RuntimeError(f"Pool Snowflake agotado: {self._max} conexiones en uso.")
+                self._esperando += 1
                 try:
-                    conn = self._intentar(num_llave)
-                    if num_llave is not None:
-                        self._llave_preferida = num_llave
-                    logger.info("Conexión Snowflake establecida (auth=%s).", cfg.modo_auth)
-                    return conn
-                except Exception as exc:  # noqa: BLE001 - se clasifica abajo
-                    ultimo_error = exc
-                    texto = str(exc)
-                    es_llave = any(marca in texto for marca in _MARCAS_ERROR_LLAVE)
-                    logger.warning(
-                        "Fallo de conexión (intento %s, llave=%s, error_llave=%s): %s",
-                        intento + 1,
-                        num_llave,
-                        es_llave,
-                        texto[:300],
+                    self._cond.wait(restante)
+                finally:
+                    self._esperando -= 1
+            espera = time.monotonic() - t0
+            self._prestamos += 1
+            self._espera_total_s += espera
+            self._espera_max_s = max(self._espera_max_s, espera)
+
+        if conn is not None and self._sirve(conn, time.monotonic() - devuelta):
+            return conn
+        if conn is not None:
+            _cerrar_silencioso(conn)  # la sesión del servidor no queda abierta
+        # Sin conexión libre o la prestada murió: se crea otra fuera del candado.
+        with self._cond:
+            if conn is not None:
+                self._en_uso -= 1
+                self._descartadas += 1
+                if self._circuito != CERRADO:  # la reconexión es cosa del hilo de fondo
+                    self._cond.notify()
+                    raise SnowflakeNoDisponible(
+                        f"Snowflake no disponible (circuito {self._circuito}).",
+                        max(0.0, self._proximo_intento - time.monotonic()) or self._espera_circuito_s,
                     )
-                    if not es_llave:
-                        break  # error transitorio: no rote llave, espere y reintente
-            if intento < _REINTENTOS - 1:
-                time.sleep(_ESPERA_TRANSITORIA_S)
-        raise RuntimeError(f"Snowflake inaccesible tras {_REINTENTOS} intentos: {ultimo_error}")
+                self._creando += 1
+        try:
+            nueva = self.conectar()
+        except Exception as exc:
+            with self._cond:
+                self._creando -= 1
+                self._registrar_fallo(exc)
+                reintento = max(0.0, self._proximo_intento - time.monotonic())
+                self._cond.notify()
+            raise SnowflakeNoDisponible(f"Snowflake no disponible: {str(exc)[:200]}", reintento) from exc
+        with self._cond:
+            self._creando -= 1
+            self._en_uso += 1
+            self._creadas += 1
+            self._fallos_seguidos = 0
+        self._iniciar_segador()
+        return nueva
 
-    # ------------------------------------------------------------------
-    def obtener(self) -> Any:
-        """Devuelve la conexión viva; la (re)crea si no existe o está cerrada."""
-        with self._lock:
-            if self._conn is not None:
+    def _devolver(self, conn: Any) -> None:
+        vivo = self._sirve(conn, 0)
+        with self._cond:
+            self._en_uso -= 1
+            if vivo and not self._cerrado:
+                self._libres.append((conn, time.monotonic()))
+                conn = None
+            else:
+                self._descartadas += 1
+            self._cond.notify()
+        if conn is not None:
+            _cerrar_silencioso(conn)
+
+    @staticmethod
+    def _sirve(conn: Any, ociosa_s: float) -> bool:
+        """Validación al prestar: abierta y, si estuvo ociosa un rato, responde ``SELECT 1``."""
+        try:
+            if conn.is_closed():
+                return False
+            if ociosa_s >= _VALIDAR_TRAS_S:
+                cur = conn.cursor()
                 try:
-                    if not self._conn.is_closed():
-                        return self._conn
-                except Exception:
-                    logger.debug("Conexión previa inutilizable; se recrea", exc_info=True)
-            self._conn = self.conectar()
-            return self._conn
+                    cur.execute("SELECT 1")
+                    cur.fetchone()
+                finally:
+                    cur.close()
+            return True
+        except Exception:
+            logger.debug("Conexión del pool inutilizable; se descarta", exc_info=True)
+            return False
+
+    # -- circuito de reconexión ----------------------------------------------
+    def _transicion(self, estado: str) -> None:
+        """Cambia el estado del circuito (llamar con ``_cond`` tomado)."""
+        if estado != self._circuito:
+            logger.warning("Circuito Snowflake: %s → %s", self._circuito, estado)
+            self._circuito = estado
+            self._transiciones[estado] += 1
+
+    def _registrar_fallo(self, exc: Exception) -> None:
+        """Cuenta un fallo de conexión; al llegar al umbral abre el circuito (con ``_cond``)."""
+        self._ultimo_error = str(exc)
+        self._fallos_seguidos += 1
+        if self._circuito == CERRADO and self._fallos_seguidos >= max(1, self._cfg.circuito_fallos):
+            self._espera_circuito_s = float(max(1, self._cfg.circuito_espera_s))
+            self._proximo_intento = time.monotonic() + self._espera_circuito_s
+            self._transicion(ABIERTO)
+            self._iniciar_reconexion()
+
+    def _iniciar_reconexion(self) -> None:
+        if self._reconector is None and not self._cerrado:
+            self._reconector = threading.Thread(target=self._reconectar_bucle, name="circuito-snowflake", daemon=True)
+            self._reconector.start()
+
+    def _reconectar_bucle(self) -> None:
+        while True:
+            with self._cond:
+                espera = max(0.0, self._proximo_intento - time.monotonic())
+            if self._alto.wait(espera) or self.probar_reconexion():
+                with self._cond:
+                    self._reconector = None
+                return
+
+    def probar_reconexion(self) -> bool:
+        """Un intento semiabierto: si conecta, cierra el circuito y deja la conexión en el pool.
 
-    def fabrica(self) -> Callable[[], Any]:
-        """Callable sin argumentos que entrega la conexión (para inyectar)."""
-        return self.obtener
+        Si falla, reabre el circuito duplicando la espera (tope ``SF_CIRCUITO_ESPERA_MAX_S``).
+        """
+        with self._cond:
+            if self._circuito == CERRADO:
+                return True
+            self._transicion(SEMIABIERTO)
+        try:
+            conn = self.conectar()
+        except Exception as exc:  # noqa: BLE001 - se reintenta con espera mayor
+            with self._cond:
+                self._ultimo_error = str(exc)
+                self._fallos_seguidos += 1
+                self._espera_circuito_s = min(self._espera_circuito_s * 2, float(self._cfg.circuito_espera_max_s))
+                self._proximo_intento = time.monotonic() + self._espera_circuito_s
+                self._transicion(ABIERTO)
+                self._cond.notify_all()  # quien espere con plazo corto se entera y falla rápido
+            return False
+        with self._cond:
+            sobra = self._cerrado or len(self._libres) + self._en_uso + self._creando >= self._max
+            if not sobra:
+                self._libres.append((conn, time.monotonic()))
+                self._creadas += 1
+            self._fallos_seguidos = 0
+            self._ultimo_error = ""
+            self._transicion(CERRADO)
+            self._cond.notify_all()
+        if sobra:
+            _cerrar_silencioso(conn)
+        self._iniciar_segador()
+        return True
+
+    def estado_circuito(self) -> dict[str, Any]:
+        """Estado del circuito y conteo de transiciones (para ``/api/salud``)."""
+        with self._cond:
+            return {
+                "estado": self._circuito,
+                "fallos_seguidos": self._fallos_seguidos,
+                "transiciones": dict(self._transiciones),
+                "reintentar_en_s": (
+                    round(max(0.0, self._proximo_intento - time.monotonic()), 1) if self._circuito != CERRADO else 0
+                ),
+                "ultimo_error": self._ultimo_error[:200],
+            }
+
+    # -- segador de ociosas -------------------------------------------------
+    def _iniciar_segador(self) -> None:
+        with self._cond:
+            if self._segador is not None or self._cerrado:
+                return
+            self._segador = threading.Thread(target=self._segar_bucle, name="pool-snowflake", daemon=True)
+            self._segador.start()
+
+    def _segar_bucle(self) -> None:
+        intervalo = max(5, min(60, self._cfg.pool_inactividad_s // 2))
+        while not self._alto.wait(intervalo):
+            self.segar()
+
+    def segar(self) -> int:
+        """Cierra las conexiones ociosas vencidas sin bajar del mínimo; devuelve cuántas."""
+        corte = time.monotonic() - self._cfg.pool_inactividad_s
+        vencidas: list[Any] = []
+        with self._cond:
+            # Las más antiguas están a la izquierda (se presta y devuelve por la derecha).
+            while self._libres and self._libres[0][1] < corte and len(self._libres) + self._en_uso > self._min:
+                vencidas.append(self._libres.popleft()[0])
+            self._descartadas += len(vencidas)
+        for conn in vencidas:
+            _cerrar_silencioso(conn)
+        return len(vencidas)
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Ocupación y esperas del pool (sin datos sensibles)."""
+        with self._cond:
+            return {
+                "min": self._min,
+                "max": self._max,
+                "en_uso": self._en_uso,
+                "libres": len(self._libres),
+                "esperando": self._esperando,
+                "prestamos": self._prestamos,
+                "espera_prom_ms": int(self._espera_total_s * 1000 / self._prestamos) if self._prestamos else 0,
+                "espera_max_ms": int(self._espera_max_s * 1000),
+                "agotados": self._agotados,
+                "creadas": self._creadas,
+                "descartadas": self._descartadas,
+            }
 
     def cerrar(self) -> None:
-        """Cierra la conexión si existe (shutdown ordenado)."""
-        with self._lock:
-            if self._conn is not None:
-                try:
-                    self._conn.close()
-                except Exception:
-                    logger.debug("Cierre de conexión best-effort falló", exc_info=True)
-                self._conn = None
+        """Cierra el pool: las libres ya, las prestadas al devolverse (shutdown ordenado)."""
+        self._alto.set()
+        with self._cond:
+            self._cerrado = True
+            libres = [conn for conn, _ in self._libres]
+            self._libres.clear()
+            self._cond.notify_all()
+        for conn in libres:
+            _cerrar_silencioso(conn)
+
+
+def _cerrar_silencioso(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        logger.debug("Cierre de conexión best-effort falló", exc_info=True)
@@ -1,9 +1,21 @@
 """Ejecución segura de SELECT y telemetría asíncrona en Snowflake.
 
 `ejecutar_select` corre la SQL (ya validada) con tope de filas y
-convierte los valores a tipos JSON-serializables. `Telemetria` registra
+convierte los valores a tipos JSON-serializables con un conversor por
+columna elegido del tipo en ``cursor.description``; `ejecutar_select_por_lotes`
+hace lo mismo entregando lotes acotados (Arrow si el conector lo ofrece). `Telemetria` registra
 cada consulta/evento/feedback mediante una cola en memoria y un worker
 único: fail-open — un fallo de auditoría jamás rompe una respuesta.
+
+El worker no hace un viaje por fila: agrupa lo encolado por sentencia
+(una por tabla) y lo escribe en lotes de hasta ``TELEMETRIA_LOTE_FILAS``
+filas o ``TELEMETRIA_LOTE_MS`` de antigüedad — ``executemany`` para los
+``INSERT … VALUES`` y un ``INSERT … SELECT … UNION ALL SELECT …`` para los
+que usan ``PARSE_JSON`` (que Snowflake no admite en ``VALUES``). Lo que
+no cabe en la cola, los lotes que Snowflake rechaza y lo pendiente al
+apagar van al spool en disco (`snowflake_.spool`), que se reproduce en
+segundo plano. Con ``TELEMETRIA_MODO=stage``, EVENT_LOG y UI_EVENT se
+escriben a archivos y se cargan con ``COPY INTO`` (`snowflake_.carga_masiva`).
 """
 
 from __future__ import annotations
@@ -13,19 +25,26 @@ import decimal
 import json
 import logging
 import queue
+import re
 import threading
 import time
 import uuid
-from collections.abc import Callable
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import AbstractContextManager
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any
 
 from config import VERSION_APP, Config
+from snowflake_.carga_masiva import CargadorStage, EscritorNDJSON, FilaEvento
+from snowflake_.spool import Spool
 
 logger = logging.getLogger(__name__)
 
 _TAM_COLA = 2000
 _SENTINELA = object()
+_MAX_BYTES_SENTENCIA = 512 * 1024  # parámetros por sentencia multi-fila (CHAT_LOG pesa ~20 KB/fila)
+_RE_INSERT_SELECT = re.compile(r"^(INSERT INTO .+?\)) (SELECT .+)$", re.DOTALL)
 
 
 # ── Ejecución de consultas ──────────────────────────────────────────────
@@ -40,10 +59,13 @@ class ResultadoConsulta:
     n_filas: int = 0
     truncado: bool = False
     duracion_ms: int = 0
+    desde_cache: bool = False  # True si vino de la caché de resultados SQL
+    parcial: bool = False  # lote de `ejecutar_select_por_lotes` al que le siguen más
+    query_id: str = ""  # id de Snowflake (``sfqid``): permite releer con RESULT_SCAN por 24 h
 
 
 def _celda(valor: Any) -> Any:
-    """Convierte un valor del driver a un tipo JSON-serializable."""
+    """Convierte un valor del driver a un tipo JSON-serializable (tipo de columna desconocido)."""
     if isinstance(valor, decimal.Decimal):
         return float(valor)
     if isinstance(valor, (dt.datetime, dt.date, dt.time)):
@@ -53,46 +75,372 @@ def _celda(valor: Any) -> Any:
     return valor
 
 
-def ejecutar_select(conexion: Any, sql: str, max_filas: int) -> ResultadoConsulta:
+def _a_float(valor: Any) -> Any:
+    return None if valor is None else float(valor)
+
+
+def _a_iso(valor: Any) -> Any:
+    return None if valor is None else valor.isoformat()
+
+
+def _a_texto(valor: Any) -> Any:
+    return None if valor is None else bytes(valor).decode("utf-8", errors="replace")
+
+
+# Códigos de tipo de ``cursor.description`` del conector de Snowflake.
+_TIPOS_FECHA = frozenset({3, 4, 6, 7, 8, 12})  # DATE, TIMESTAMP, TIMESTAMP_LTZ/TZ/NTZ, TIME
+_TIPOS_TAL_CUAL = frozenset({1, 2, 5, 9, 10, 13})  # REAL, TEXT, VARIANT, OBJECT, ARRAY, BOOLEAN
+_FIXED, _BINARY = 0, 11
+
+Conversor = Callable[[Any], Any]
+
+
+def conversor_columna(descripcion: Sequence[Any]) -> Conversor | None:
+    """Conversor de la columna según su tipo en ``cursor.description`` (``None`` = tal cual).
+
+    NUMBER con escala llega como ``Decimal`` (→ float) y sin escala como int;
+    fechas y horas → ISO; BINARY → texto. Sin código de tipo conocido se usa
+    `_celda`, que decide valor a valor.
+    """
+    tipo = descripcion[1] if len(descripcion) > 1 else None
+    if tipo == _FIXED:
+        escala = descripcion[5] if len(descripcion) > 5 else None
+        return None if escala == 0 else _a_float if escala else _celda
+    if tipo in _TIPOS_TAL_CUAL:
+        return None
+    if tipo in _TIPOS_FECHA:
+        return _a_iso
+    if tipo == _BINARY:
+        return _a_texto
+    return _celda
+
+
+def tipo_columna(descripcion: Sequence[Any]) -> str:
+    """Tipo de exporte (``bool``/``int``/``float``/``texto``) de lo que deja `conversor_columna`.
+
+    Fija de antemano el esquema de Parquet/Arrow: un primer lote todo nulo
+    no decide el tipo de la columna.
+    """
+    tipo = descripcion[1] if len(descripcion) > 1 else None
+    if tipo == _FIXED:
+        escala = descripcion[5] if len(descripcion) > 5 else None
+        return "int" if escala == 0 else "float"
+    if tipo == 1:  # REAL
+        return "float"
+    if tipo == 13:  # BOOLEAN
+        return "bool"
+    return "texto"
+
+
+def _convertir(valores: Sequence[Any], conversor: Conversor | None) -> list[Any]:
+    """Una columna entera con su conversor (``map`` sobre la columna, sin ramas por celda)."""
+    if conversor is None:
+        return list(valores)
+    try:
+        return list(map(conversor, valores))
+    except (AttributeError, TypeError, ValueError):
+        return list(map(_celda, valores))  # el driver entregó otro tipo: valor a valor
+
+
+class ResultadoColumnar:
+    """Resultado por columnas: una lista por columna y ``filas`` como vista por filas.
+
+    Es la forma en que se lee del driver; `a_resultado` da el `ResultadoConsulta`
+    de siempre para quienes trabajan por filas.
+    """
+
+    __slots__ = ("columnas", "datos", "duracion_ms", "n_filas", "parcial", "query_id", "truncado")
+
+    def __init__(
+        self,
+        columnas: list[str],
+        datos: list[list[Any]],
+        n_filas: int = 0,
+        truncado: bool = False,
+        duracion_ms: int = 0,
+        parcial: bool = False,
+        query_id: str = "",
+    ) -> None:
+        self.columnas = columnas
+        self.datos = datos
+        self.n_filas = n_filas
+        self.truncado = truncado
+        self.duracion_ms = duracion_ms
+        self.parcial = parcial
+        self.query_id = query_id
+
+    def __len__(self) -> int:
+        return len(self.datos[0]) if self.datos else 0
+
+    @property
+    def filas(self) -> list[list[Any]]:
+        """Vista por filas (una transposición con ``zip``, sin convertir de nuevo)."""
+        return list(map(list, zip(*self.datos, strict=True)))
+
+    def columna(self, nombre: str) -> list[Any]:
+        return self.datos[self.columnas.index(nombre)]
+
+    def a_resultado(self) -> ResultadoConsulta:
+        return ResultadoConsulta(
+            columnas=self.columnas,
+            filas=self.filas,
+            n_filas=self.n_filas,
+            truncado=self.truncado,
+            duracion_ms=self.duracion_ms,
+            parcial=self.parcial,
+            query_id=self.query_id,
+        )
+
+
+def _tablas_arrow(cursor: Any) -> Iterator[Any] | None:
+    """Tablas pyarrow del conector, o ``None`` si no las ofrece (sin pyarrow o resultado en JSON)."""
+    if not callable(getattr(cursor, "fetch_arrow_batches", None)):
+        return None
+    try:
+        return cursor.fetch_arrow_batches()
+    except Exception:  # noqa: BLE001 - sin pyarrow o resultado en JSON: se lee por filas
+        return None
+
+
+def _lotes_driver(cursor: Any, lote: int, conversores: list[Conversor | None]) -> Iterator[list[list[Any]]]:
+    """Columnas ya convertidas, de a ``lote`` filas como máximo (nunca un lote vacío).
+
+    Con resultado en formato Arrow y ``pyarrow`` instalado, el conector entrega
+    tablas (``fetch_arrow_batches``) que ya vienen por columnas; si no (o si el
+    conector lo rechaza), se lee con ``fetchmany`` y se transpone.
+    """
+    tablas = _tablas_arrow(cursor)
+    if tablas is not None:
+        for tabla in tablas:
+            for inicio in range(0, tabla.num_rows, lote):
+                trozo = tabla.slice(inicio, lote)
+                yield [_convertir(c.to_pylist(), f) for c, f in zip(trozo.columns, conversores, strict=True)]
+        return
+    while crudas := cursor.fetchmany(lote):
+        yield [_convertir(c, f) for c, f in zip(zip(*crudas, strict=True), conversores, strict=True)]
+
+
+def ejecutar_select_columnar_por_lotes(
+    conexion: Any, sql: str, max_filas: int, lote: int = 1000
+) -> Iterator[ResultadoColumnar]:
+    """Ejecuta un SELECT y entrega el resultado en lotes columnares de hasta ``lote`` filas.
+
+    ``n_filas`` es el acumulado hasta cada lote, ``parcial`` indica que vienen
+    más y ``truncado`` solo puede ser ``True`` en el último. Siempre hay al
+    menos un lote (vacío si la consulta no devolvió filas), así que las
+    columnas siempre llegan. La memoria queda acotada por dos lotes (el
+    entregado y el siguiente, que se lee para saber si aquel era el último),
+    no por ``max_filas``. El cursor se cierra al agotar o cerrar el generador.
+    """
+    inicio = time.monotonic()
+    cursor = conexion.cursor()
+    try:
+        cursor.execute(sql)
+        query_id = str(getattr(cursor, "sfqid", "") or "")
+        descripcion = list(cursor.description or [])
+        columnas = [str(d[0]) for d in descripcion]
+        fuente = _lotes_driver(cursor, max(1, lote), [conversor_columna(d) for d in descripcion])
+        n = 0
+        actual = next(fuente, None)
+        if actual is None:
+            vacias: list[list[Any]] = [[] for _ in columnas]
+            yield ResultadoColumnar(
+                columnas, vacias, duracion_ms=int((time.monotonic() - inicio) * 1000), query_id=query_id
+            )
+            return
+        while actual is not None:
+            largo = len(actual[0]) if actual else 0
+            restantes = max_filas - n
+            datos = [c[:restantes] for c in actual] if largo > restantes else actual
+            n += min(largo, restantes)
+            if n >= max_filas:
+                truncado = largo > restantes or next(fuente, None) is not None
+                siguiente = None
+            else:
+                truncado = False
+                siguiente = next(fuente, None)
+            yield ResultadoColumnar(
+                columnas,
+                datos,
+                n_filas=n,
+                truncado=truncado,
+                duracion_ms=int((time.monotonic() - inicio) * 1000),
+                parcial=siguiente is not None,
+                query_id=query_id,
+            )
+            actual = siguiente
+    finally:
+        cursor.close()
+
+
+def ejecutar_select_por_lotes(conexion: Any, sql: str, max_filas: int, lote: int = 1000) -> Iterator[ResultadoConsulta]:
+    """`ejecutar_select_columnar_por_lotes` con cada lote como `ResultadoConsulta` (por filas)."""
+    for parte in ejecutar_select_columnar_por_lotes(conexion, sql, max_filas, lote):
+        yield parte.a_resultado()
+
+
+def ejecutar_select_columnar(conexion: Any, sql: str, max_filas: int, lote: int = 1000) -> ResultadoColumnar:
+    """Ejecuta un SELECT y devuelve como máximo ``max_filas`` filas, por columnas."""
+    inicio = time.monotonic()
+    partes = ejecutar_select_columnar_por_lotes(conexion, sql, max_filas, lote)
+    total = next(partes)  # siempre hay al menos un lote
+    for parte in partes:
+        for acumulada, nueva in zip(total.datos, parte.datos, strict=True):
+            acumulada.extend(nueva)
+        total.n_filas, total.truncado = parte.n_filas, parte.truncado
+    total.parcial = False
+    total.duracion_ms = int((time.monotonic() - inicio) * 1000)
+    return total
+
+
+def ejecutar_select(conexion: Any, sql: str, max_filas: int, lote: int = 1000) -> ResultadoConsulta:
     """Ejecuta un SELECT y devuelve como máximo ``max_filas`` filas.
 
+    Lee por lotes y por columnas (`ejecutar_select_columnar`): cada columna se
+    convierte con un conversor elegido una vez por su tipo, y las filas crudas
+    del driver nunca están todas en memoria junto a su versión convertida.
+
     Args:
         conexion: Conexión viva del conector de Snowflake.
         sql: Sentencia YA validada por el validador de solo lectura.
         max_filas: Tope duro de filas a traer (protege memoria y red).
+        lote: Filas por lectura al driver.
+    """
+    return ejecutar_select_columnar(conexion, sql, max_filas, lote).a_resultado()
+
+
+def _largo_lote(datos: Any) -> int:
+    """Filas de un lote nativo: tabla pyarrow o lista de columnas."""
+    if hasattr(datos, "num_rows"):
+        return datos.num_rows
+    return len(datos[0]) if datos else 0
+
+
+def ejecutar_select_nativo_por_lotes(
+    conexion: Any, sql: str, max_filas: int, lote: int = 1000
+) -> Iterator[tuple[list[str], list[str], Any]]:
+    """Lotes ``(columnas, tipos, datos)`` para exportes de datos, sin pasar por filas.
+
+    Con Arrow en el conector, ``datos`` es la tabla pyarrow tal como llega
+    (sin copiarla a objetos Python); si no, la lista de columnas ya
+    convertidas de `_lotes_driver`. Corta en ``max_filas``, siempre entrega
+    al menos un lote (las columnas llegan aunque no haya filas) y cierra el
+    cursor al agotar o cerrar el generador. ``tipos`` sale de `tipo_columna`.
     """
-    inicio = time.monotonic()
     cursor = conexion.cursor()
     try:
         cursor.execute(sql)
-        columnas = [str(d[0]) for d in (cursor.description or [])]
-        crudas = cursor.fetchmany(max_filas + 1)
-        truncado = len(crudas) > max_filas
-        filas = [[_celda(v) for v in fila] for fila in crudas[:max_filas]]
+        descripcion = list(cursor.description or [])
+        columnas = [str(d[0]) for d in descripcion]
+        tipos = [tipo_columna(d) for d in descripcion]
+        restantes = max(0, max_filas)
+        tablas = _tablas_arrow(cursor)
+        fuente: Iterator[Any] = (
+            tablas
+            if tablas is not None
+            else _lotes_driver(cursor, max(1, lote), [conversor_columna(d) for d in descripcion])
+        )
+        entregados = 0
+        for datos in fuente:
+            if restantes <= 0:
+                break
+            n = _largo_lote(datos)
+            if n > restantes:
+                datos = datos.slice(0, restantes) if hasattr(datos, "num_rows") else [c[:restantes] for c in datos]
+                n = restantes
+            restantes -= n
+            entregados += 1
+            yield columnas, tipos, datos
+        if not entregados:
+            yield columnas, tipos, [[] for _ in columnas]
     finally:
         cursor.close()
-    return ResultadoConsulta(
-        columnas=columnas,
-        filas=filas,
-        n_filas=len(filas),
-        truncado=truncado,
-        duracion_ms=int((time.monotonic() - inicio) * 1000),
-    )
+
+
+_RE_QUERY_ID = re.compile(r"^[0-9A-Fa-f][0-9A-Fa-f-]{15,63}$")
+
+
+def sql_result_scan(query_id: str) -> str:
+    """``SELECT * FROM TABLE(RESULT_SCAN('<id>'))`` con el id validado (va como literal en la SQL).
+
+    Raises:
+        ValueError: si ``query_id`` no tiene forma de id de consulta.
+    """
+    if not _RE_QUERY_ID.match(query_id or ""):
+        raise ValueError(f"query_id inválido: {query_id!r}")
+    return f"SELECT * FROM TABLE(RESULT_SCAN('{query_id}'))"
+
+
+def releer_resultado(conexion: Any, query_id: str, max_filas: int, lote: int = 1000) -> ResultadoConsulta:
+    """Relee el resultado de una consulta ya ejecutada con ``RESULT_SCAN`` (sin reescanear la tabla).
+
+    Snowflake conserva el resultado de cada consulta 24 h para el mismo
+    usuario; pasado ese plazo (o con otro rol) la lectura falla y el
+    llamador decide.
+
+    Raises:
+        ValueError: si ``query_id`` no tiene forma de id de consulta.
+    """
+    resultado = ejecutar_select(conexion, sql_result_scan(query_id), max_filas, lote)
+    resultado.query_id = query_id
+    return resultado
 
 
 # ── Telemetría (cola + worker, fail-open) ───────────────────────────────
 
 
+def _trocear(filas: list[tuple[Any, ...]]) -> Iterator[list[tuple[Any, ...]]]:
+    """Parte las filas en trozos cuyo tamaño de parámetros no pase ``_MAX_BYTES_SENTENCIA``."""
+    trozo: list[tuple[Any, ...]] = []
+    peso = 0
+    for params in filas:
+        tam = sum(len(v) if isinstance(v, str) else 8 for v in params)
+        if trozo and peso + tam > _MAX_BYTES_SENTENCIA:
+            yield trozo
+            trozo, peso = [], 0
+        trozo.append(params)
+        peso += tam
+    if trozo:
+        yield trozo
+
+
 class Telemetria:
     """Auditoría de uso en Snowflake sin bloquear ni romper el flujo principal."""
 
-    def __init__(self, cfg: Config, fabrica_conexion: Callable[[], Any] | None) -> None:
+    def __init__(self, cfg: Config, fabrica_conexion: Callable[[], AbstractContextManager[Any]] | None) -> None:
         self._cfg = cfg
         self._fabrica = fabrica_conexion
         self._cola: queue.Queue[Any] = queue.Queue(maxsize=_TAM_COLA)
         self._worker: threading.Thread | None = None
         self.descartes = 0
+        self._lote_filas = max(1, cfg.telemetria_lote_filas)
+        self._lote_s = max(0.0, cfg.telemetria_lote_ms / 1000)
+        # Estadísticas de los lotes (para /api/salud).
+        self._lotes = 0
+        self._filas_escritas = 0
+        self._filas_fallidas = 0
+        self._lote_max = 0
+        self._flush_total_s = 0.0
+        self._flush_max_s = 0.0
         self.activa = bool(cfg.telemetria_activa and cfg.esquema_telemetria and fabrica_conexion)
+        self._spool = (
+            Spool(Path(cfg.telemetria_spool_dir), cfg.telemetria_spool_max_mb * 1024 * 1024)
+            if self.activa and cfg.telemetria_spool_dir and cfg.telemetria_spool_max_mb > 0
+            else None
+        )
+        self._alto = threading.Event()
+        self._reproductor: threading.Thread | None = None
+        self._masiva = (
+            CargadorStage(
+                fabrica_conexion,
+                EscritorNDJSON(Path(cfg.telemetria_stage_dir), cfg.app_nombre[:50]),
+                cfg.esquema_telemetria,
+                cfg.stage_telemetria,
+            )
+            if self.activa and cfg.telemetria_modo == "stage"
+            else None
+        )
+        self._cargador: threading.Thread | None = None
         # Identidad estándar (GIC 2026-05-13): viaja en TODAS las tablas v2.
         self._app = cfg.app_nombre[:50]
         self._version = VERSION_APP[:16]
@@ -103,46 +451,192 @@ class Telemetria:
         """Arranca el worker si la telemetría está configurada."""
         if not self.activa or self._worker is not None:
             return
+        self._alto.clear()
         self._worker = threading.Thread(target=self._consumir, name="telemetria", daemon=True)
         self._worker.start()
+        if self._spool is not None:
+            self._reproductor = threading.Thread(target=self._reproducir, name="telemetria-spool", daemon=True)
+            self._reproductor.start()
+        if self._masiva is not None:
+            self._cargador = threading.Thread(target=self._cargar_bucle, name="telemetria-stage", daemon=True)
+            self._cargador.start()
         logger.info("Telemetría activa hacia %s", self._cfg.esquema_telemetria)
 
     def detener(self, espera_s: float = 3.0) -> None:
-        """Detiene el worker drenando lo pendiente (best-effort)."""
+        """Detiene el worker drenando lo pendiente; lo que no alcance a salir va al spool."""
         if self._worker is None:
             return
+        self._alto.set()
         try:
             self._cola.put_nowait(_SENTINELA)
         except queue.Full:
             pass
         self._worker.join(timeout=espera_s)
         self._worker = None
+        if self._reproductor is not None:
+            self._reproductor.join(timeout=1.0)
+            self._reproductor = None
+        if self._cargador is not None:
+            self._cargador.join(timeout=1.0)
+            self._cargador = None
+        if self._masiva is not None:
+            self._masiva.escritor.rotar()  # archivos completos: se cargan en el próximo arranque
+        restantes: list[tuple[str, tuple[Any, ...]]] = []
+        while True:
+            try:
+                item = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _SENTINELA:
+                restantes.append(item)
+        if restantes and self._spool is not None:
+            self._spool.escribir(restantes)
+        elif restantes:
+            self.descartes += len(restantes)
 
     def _consumir(self) -> None:
+        pendientes: dict[str, list[tuple[Any, ...]]] = {}
+        n, desde = 0, 0.0
         while True:
-            item = self._cola.get()
+            espera = None if n == 0 else max(0.0, desde + self._lote_s - time.monotonic())
+            try:
+                item = self._cola.get(timeout=espera)
+            except queue.Empty:
+                item = None
             if item is _SENTINELA:
+                self._vaciar(pendientes)
                 return
-            sql, params = item
-            try:
-                conn = self._fabrica() if self._fabrica else None
-                if conn is None:
-                    continue
-                cur = conn.cursor()
+            if item is not None:
+                sql, params = item
+                pendientes.setdefault(sql, []).append(params)
+                n, desde = n + 1, desde or time.monotonic()
+            if n and (n >= self._lote_filas or time.monotonic() - desde >= self._lote_s):
+                self._vaciar(pendientes)
+                pendientes, n, desde = {}, 0, 0.0
+
+    def _vaciar(self, pendientes: dict[str, list[tuple[Any, ...]]], al_spool: bool = True) -> bool:
+        """Escribe el lote: una sentencia multi-fila (o ``executemany``) por tabla.
+
+        Si no hay conexión el lote va al spool (``al_spool``); devuelve si se escribió.
+        Cada tabla escrita sale de ``pendientes``: si la conexión cae a mitad del
+        lote, solo las tablas que faltan van al spool y reproducirlo no duplica filas.
+        """
+        if self._masiva is not None:
+            for sql in [s for s in pendientes if self._masiva.escritor.acepta(s)]:
                 try:
-                    cur.execute(sql, params)
-                finally:
-                    cur.close()
-            except Exception as exc:  # noqa: BLE001 - fail-open por diseño
-                logger.warning("Telemetría: INSERT falló (%s)", str(exc)[:200])
+                    self._masiva.escritor.agregar(sql, pendientes[sql])
+                    del pendientes[sql]
+                except OSError as exc:  # sin disco: esas filas siguen por INSERT
+                    logger.warning("Telemetría: archivo de carga masiva no escribible (%s)", exc)
+        if not pendientes or self._fabrica is None:
+            return not pendientes
+        t0 = time.monotonic()
+        total = sum(len(filas) for filas in pendientes.values())
+        escritas = 0
+        try:
+            with self._fabrica() as conn:
+                for sql in list(pendientes):
+                    self._escribir(conn, sql, pendientes[sql])
+                    escritas += len(pendientes.pop(sql))
+        except Exception as exc:  # noqa: BLE001 - fail-open por diseño
+            faltan = total - escritas
+            logger.warning(
+                "Telemetría: %d de %d fila(s) del lote no se pudieron escribir (%s)", faltan, total, str(exc)[:200]
+            )
+            self._filas_escritas += escritas
+            if al_spool and self._spool is not None:
+                self._spool.escribir((sql, params) for sql, filas in pendientes.items() for params in filas)
+            elif al_spool:
+                self._filas_fallidas += faltan
+            return False
+        duracion = time.monotonic() - t0
+        self._lotes += 1
+        self._filas_escritas += total
+        self._lote_max = max(self._lote_max, total)
+        self._flush_total_s += duracion
+        self._flush_max_s = max(self._flush_max_s, duracion)
+        return True
+
+    def _cargar_bucle(self) -> None:
+        """Hilo de fondo: ``PUT`` + ``COPY INTO`` de los archivos listos cada intervalo."""
+        while not self._alto.wait(max(5, self._cfg.telemetria_stage_intervalo_s)):
+            self._masiva.cargar()
+
+    def _reproducir(self) -> None:
+        """Hilo de fondo: escribe los segmentos del spool, del más viejo al más nuevo."""
+        espera = 1.0  # deja arrancar la app antes de reproducir lo del despliegue anterior
+        while not self._alto.wait(espera):
+            siguiente = self._spool.siguiente()
+            if siguiente is None:
+                espera = 30.0
+                continue
+            segmento, items = siguiente
+            pendientes: dict[str, list[tuple[Any, ...]]] = {}
+            for sql, params in items:
+                pendientes.setdefault(sql, []).append(params)
+            if self._vaciar(pendientes, al_spool=False):
+                self._spool.confirmar(segmento, len(items))
+                espera = 0.1
+                continue
+            espera = 60.0  # Snowflake sigue sin responder: lo que falta queda para después
+            faltan = [(sql, params) for sql, filas in pendientes.items() for params in filas]
+            if len(faltan) < len(items) and self._spool.escribir(faltan) == len(faltan):
+                # Parte del segmento ya se escribió: se reemplaza por lo que falta, no se repite.
+                self._spool.confirmar(segmento, len(items) - len(faltan))
+
+    def _escribir(self, conn: Any, sql: str, filas: list[tuple[Any, ...]]) -> None:
+        """Inserta las filas de una tabla; si la sentencia múltiple falla, fila a fila."""
+        cur = conn.cursor()
+        try:
+            try:
+                m = _RE_INSERT_SELECT.match(sql)
+                if m is None:
+                    cur.executemany(sql, filas)  # INSERT … VALUES: el conector lo vuelve multi-fila
+                    return
+                cabecera, select = m.groups()
+                for trozo in _trocear(filas):
+                    cur.execute(
+                        f"{cabecera} " + " UNION ALL ".join([select] * len(trozo)),
+                        tuple(v for params in trozo for v in params),
+                    )
+                    filas = filas[len(trozo) :]
+            except Exception as exc:  # noqa: BLE001 - una fila mala no tumba el lote
+                logger.warning("Telemetría: INSERT múltiple falló (%s); se reintenta fila a fila", str(exc)[:200])
+                for params in filas:
+                    try:
+                        cur.execute(sql, params)
+                    except Exception as exc_fila:  # noqa: BLE001 - fail-open por diseño
+                        self._filas_fallidas += 1
+                        logger.warning("Telemetría: INSERT falló (%s)", str(exc_fila)[:200])
+        finally:
+            cur.close()
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Tamaño de lote, latencia de escritura y backlog del worker."""
+        return {
+            "pendientes": self._cola.qsize(),
+            "descartes": self.descartes,
+            "lotes": self._lotes,
+            "filas_escritas": self._filas_escritas,
+            "filas_fallidas": self._filas_fallidas,
+            "lote_prom": round(self._filas_escritas / self._lotes, 1) if self._lotes else 0,
+            "lote_max": self._lote_max,
+            "escritura_prom_ms": int(self._flush_total_s * 1000 / self._lotes) if self._lotes else 0,
+            "escritura_max_ms": int(self._flush_max_s * 1000),
+            "spool": self._spool.estadisticas() if self._spool is not None else {},
+            "carga_masiva": self._masiva.estadisticas() if self._masiva is not None else {},
+        }
 
     def _encolar(self, sql: str, params: tuple[Any, ...]) -> None:
         if not self.activa:
             return
+        if self._masiva is not None and self._masiva.escritor.acepta(sql):
+            params = FilaEvento(params)  # EVENT_TS: cuando ocurrió, no cuando sale el lote
         try:
             self._cola.put_nowait((sql, params))
         except queue.Full:
-            self.descartes += 1
+            if self._spool is None or not self._spool.escribir([(sql, params)]):
+                self.descartes += 1
 
     # -- registros (esquema v2: DB_EXPORTBOT.TELEMETRY) ------------------
     def log_chat(self, **campos: Any) -> None:
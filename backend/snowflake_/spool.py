@@ -0,0 +1,148 @@
+"""Spool en disco para la telemetría que no cabe o no alcanza a salir.
+
+La cola en memoria de `Telemetria` es acotada: cuando se llena, cuando
+un lote no puede escribirse (Snowflake caído o lento) o cuando el
+apagado vence su espera, las filas pendientes se agregan aquí en vez de
+perderse. El spool es un directorio de segmentos JSONL de solo-agregar
+(una fila ``[sql, params]`` por línea, más el instante del evento si
+trae uno, ver `FilaEvento`) que rota por tamaño; al pasar el tope total
+se borran los segmentos más viejos primero. En el siguiente arranque (o
+cuando Snowflake vuelve) un hilo de `Telemetria` reproduce los segmentos
+del más viejo al más nuevo y borra cada uno al escribirlo.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from snowflake_.carga_masiva import FilaEvento
+
+logger = logging.getLogger(__name__)
+
+_PREFIJO = "telemetria-"
+_SUFIJO = ".jsonl"
+
+
+class Spool:
+    """Segmentos JSONL rotados con tope de bytes y desalojo del más viejo.
+
+    Args:
+        directorio: Carpeta del spool (se crea al primer uso).
+        max_bytes: Tope total en disco; al superarlo se borran segmentos viejos.
+        max_segmento_bytes: Tamaño a partir del cual se abre un segmento nuevo.
+    """
+
+    def __init__(self, directorio: Path, max_bytes: int, max_segmento_bytes: int = 4 * 1024 * 1024) -> None:
+        self._dir = directorio
+        self._max_bytes = max(1, max_bytes)
+        self._max_segmento = max(1, min(max_segmento_bytes, self._max_bytes))
+        self._activo: Path | None = None
+        self._secuencia = 0
+        self._lock = threading.Lock()
+        self.filas_escritas = 0
+        self.filas_reproducidas = 0
+        self.segmentos_desalojados = 0
+
+    # -- escritura -------------------------------------------------------
+    def escribir(self, items: Iterable[tuple[str, tuple[Any, ...]]]) -> int:
+        """Agrega filas ``(sql, params)`` al segmento activo; devuelve cuántas guardó."""
+        lineas = [
+            json.dumps([sql, list(params), *_instante(params)], ensure_ascii=False, default=str) + "\n"
+            for sql, params in items
+        ]
+        if not lineas:
+            return 0
+        datos = "".join(lineas).encode("utf-8")
+        with self._lock:
+            try:
+                self._dir.mkdir(parents=True, exist_ok=True)
+                activo = self._segmento_activo()
+                with activo.open("ab") as f:
+                    f.write(datos)
+                if activo.stat().st_size >= self._max_segmento:
+                    self._activo = None  # rota en la próxima escritura
+                self._desalojar()
+            except OSError as exc:
+                logger.warning("Spool de telemetría no escribible (%s)", exc)
+                return 0
+            self.filas_escritas += len(lineas)
+        return len(lineas)
+
+    def _segmento_activo(self) -> Path:
+        if self._activo is None:
+            self._secuencia += 1
+            self._activo = self._dir / f"{_PREFIJO}{time.time_ns():020d}-{self._secuencia:06d}{_SUFIJO}"
+        return self._activo
+
+    def _segmentos(self) -> list[Path]:
+        """Segmentos en disco, del más viejo al más nuevo (el nombre ordena por tiempo)."""
+        if not self._dir.is_dir():
+            return []
+        return sorted(self._dir.glob(f"{_PREFIJO}*{_SUFIJO}"))
+
+    def _desalojar(self) -> None:
+        segmentos = self._segmentos()
+        tamanos = {s: s.stat().st_size for s in segmentos}
+        total = sum(tamanos.values())
+        for seg in segmentos:
+            if total <= self._max_bytes:
+                break
+            total -= tamanos[seg]
+            seg.unlink(missing_ok=True)
+            self.segmentos_desalojados += 1
+            if seg == self._activo:
+                self._activo = None
+            logger.warning("Spool de telemetría lleno: se descarta el segmento %s", seg.name)
+
+    # -- reproducción ----------------------------------------------------
+    def siguiente(self) -> tuple[Path, list[tuple[str, tuple[Any, ...]]]] | None:
+        """Segmento más viejo y sus filas (cierra el activo para no leerlo a medias)."""
+        with self._lock:
+            segmentos = self._segmentos()
+            if not segmentos:
+                return None
+            seg = segmentos[0]
+            if seg == self._activo:
+                self._activo = None
+            try:
+                texto = seg.read_text(encoding="utf-8")
+            except OSError as exc:
+                logger.warning("Spool de telemetría ilegible (%s)", exc)
+                return None
+        filas: list[tuple[str, tuple[Any, ...]]] = []
+        for linea in texto.splitlines():
+            try:
+                sql, params, *instante = json.loads(linea)
+            except (ValueError, TypeError):
+                continue  # línea truncada por un apagado brusco
+            filas.append((sql, FilaEvento(params, instante[0]) if instante else tuple(params)))
+        return seg, filas
+
+    def confirmar(self, segmento: Path, n_filas: int) -> None:
+        """Borra un segmento ya reproducido."""
+        with self._lock:
+            segmento.unlink(missing_ok=True)
+            self.filas_reproducidas += n_filas
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Segmentos y bytes pendientes, filas escritas/reproducidas y desalojos."""
+        with self._lock:
+            segmentos = self._segmentos()
+            return {
+                "segmentos": len(segmentos),
+                "bytes": sum(s.stat().st_size for s in segmentos),
+                "filas_escritas": self.filas_escritas,
+                "filas_reproducidas": self.filas_reproducidas,
+                "segmentos_desalojados": self.segmentos_desalojados,
+            }
+
+
+def _instante(params: tuple[Any, ...]) -> list[str]:
+    instante = getattr(params, "instante", None)
+    return [instante] if instante else []
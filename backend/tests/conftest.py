@@ -29,10 +29,37 @@ _VARS_APP = [
     "CORS_ORIGENES",
 ]
 
+# Directorios que por defecto caen en ``var/`` del proyecto: en las pruebas, bajo tmp_path.
+_DIRS_APP = {
+    "TELEMETRIA_SPOOL_DIR": "spool_telemetria",
+    "TELEMETRIA_STAGE_DIR": "stage_telemetria",
+    "RESULTADOS_DIR": "resultados",
+    "EXPORT_TRABAJOS_DIR": "exportes",
+    "EXPORT_CACHE_DIR": "cache_exportes",
+}
+
 
 @pytest.fixture()
-def entorno_limpio(monkeypatch: pytest.MonkeyPatch):
+def entorno_limpio(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
     """Deja el entorno sin variables de la app para pruebas deterministas."""
     for var in _VARS_APP:
         monkeypatch.delenv(var, raising=False)
+    for var, nombre in _DIRS_APP.items():
+        monkeypatch.setenv(var, str(tmp_path / "var" / nombre))
     return monkeypatch
+
+
+class RelojFalso:
+    """Reloj monótono de prueba: devuelve ``t``, que la prueba avanza a mano."""
+
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+@pytest.fixture()
+def reloj() -> RelojFalso:
+    """Fuente de tiempo inyectable (``reloj=``) que solo avanza al asignar ``reloj.t``."""
+    return RelojFalso()
@@ -0,0 +1,83 @@
+"""ControlAdmision: tope global, cola justa por usuario, cubetas de fichas y 429."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as main_mod
+from motores.admision import ControlAdmision, Rechazo
+
+
+def test_cola_reparte_por_turnos_entre_usuarios(reloj) -> None:
+    control = ControlAdmision(max_activos=1, max_cola=10, reloj=reloj)
+    activo = control.solicitar("ana")
+    a1, a2, a3 = (control.solicitar("ana") for _ in range(3))
+    b1 = control.solicitar("beto")
+    assert activo.admitido and not a1.admitido
+    # Beto llegó último pero pasa segundo: una ronda por usuario.
+    assert [control.posicion(t) for t in (a1, b1, a2, a3)] == [1, 2, 3, 4]
+
+    orden = []
+    for _ in range(4):
+        actual = next(t for t in (activo, a1, a2, a3, b1) if t.admitido and not t.liberado)
+        control.liberar(actual)
+        orden.append(
+            next(n for n, t in {"a1": a1, "a2": a2, "a3": a3, "b1": b1}.items() if t.admitido and not t.liberado)
+        )
+    assert orden == ["a1", "b1", "a2", "a3"]
+    assert control.estadisticas()["en_cola"] == 0
+
+
+def test_cola_llena_y_salida_de_la_cola(reloj) -> None:
+    control = ControlAdmision(max_activos=1, max_cola=1, reloj=reloj)
+    activo = control.solicitar("ana")
+    esperando = control.solicitar("beto")
+    with pytest.raises(Rechazo) as exc:
+        control.solicitar("carla")
+    assert exc.value.reintentar_en_s >= 1
+    control.liberar(esperando)  # el cliente se desconectó estando en cola
+    control.liberar(esperando)  # idempotente
+    assert control.en_cola == 0 and control.activos == 1
+    control.liberar(activo)
+    assert control.activos == 0
+    stats = control.estadisticas()
+    assert stats["rechazos_cola"] == 1 and stats["encolados"] == 1
+
+
+def test_cubeta_por_usuario_limita_la_rafaga(reloj) -> None:
+    control = ControlAdmision(max_activos=0, max_cola=0, tasa_por_min=6, rafaga=2, reloj=reloj)
+    control.solicitar("ana")
+    control.solicitar("ana")
+    with pytest.raises(Rechazo) as exc:
+        control.solicitar("ana")
+    assert exc.value.reintentar_en_s == 11  # una ficha cada 10 s
+    control.solicitar("beto")  # otra persona no se ve afectada
+    reloj.t = 10.0
+    control.solicitar("ana")
+    assert control.rechazos_tasa == 1
+
+
+def test_esperar_despierta_al_admitir() -> None:
+    async def escenario() -> int:
+        control = ControlAdmision(max_activos=1, max_cola=5)
+        activo = control.solicitar("ana")
+        turno = control.solicitar("beto")
+        asyncio.get_running_loop().call_later(0.05, control.liberar, activo)
+        await control.esperar(turno, 5)
+        return turno.espera_ms if turno.admitido else -1
+
+    assert 0 <= asyncio.run(escenario()) < 2000
+
+
+def test_chat_responde_429_con_retry_after(entorno_limpio) -> None:
+    entorno_limpio.setenv("CHAT_TASA_POR_MIN", "1")
+    entorno_limpio.setenv("CHAT_RAFAGA", "1")
+    with TestClient(main_mod.crear_app()) as cliente:
+        cuerpo = {"pregunta": "total 2024", "user_id": "ana"}
+        assert cliente.post("/api/chat", json=cuerpo).status_code == 200
+        r = cliente.post("/api/chat", json=cuerpo)
+        assert r.status_code == 429 and int(r.headers["Retry-After"]) >= 1
+        assert cliente.get("/api/salud").json()["admision_chat"]["rechazos_tasa"] == 1
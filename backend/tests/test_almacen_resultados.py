@@ -0,0 +1,105 @@
+"""AlmacenResultados: derrame a disco, TTL, enlaces, paginación y exportes por ``chat_id``."""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+import main as main_mod
+from motores.almacen_resultados import AlmacenResultados, ResultadoGuardado, paginar
+from snowflake_.ejecutor import ResultadoConsulta
+
+
+def _guardado(n: int = 3, sql: str = "SELECT 1") -> ResultadoGuardado:
+    filas = [[f"PAIS_{i}", float(i * 10)] for i in range(n)]
+    return ResultadoGuardado(ResultadoConsulta(["PAIS", "TOTAL"], filas, n_filas=n), sql=sql, pregunta="top")
+
+
+def test_desalojo_derrama_a_disco_y_vuelve_a_memoria(tmp_path) -> None:
+    almacen = AlmacenResultados(1, 1024 * 1024, 60, tmp_path)
+    almacen.guardar("a", _guardado(3, "SELECT A"))
+    almacen.guardar("b", _guardado(5, "SELECT B"))
+    assert almacen.estadisticas()["entradas_disco"] == 1 and len(list(tmp_path.iterdir())) == 1
+    recuperado = almacen.obtener("a")  # vuelve a memoria y derrama a "b"
+    assert recuperado is not None and recuperado.sql == "SELECT A" and recuperado.resultado.n_filas == 3
+    assert almacen.obtener("b").resultado.filas[4] == ["PAIS_4", 40.0]
+    stats = almacen.estadisticas()
+    assert stats["aciertos_disco"] == 2 and stats["derrames"] == 3 and len(almacen) == 2
+    # Un proceso nuevo no conoce los chat_id derramados: borra los archivos.
+    AlmacenResultados(1, 1024 * 1024, 60, tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ttl_vence_en_memoria_y_en_disco(tmp_path, reloj) -> None:
+    almacen = AlmacenResultados(1, 1024 * 1024, 10, tmp_path, reloj=reloj)
+    almacen.guardar("a", _guardado())
+    almacen.guardar("b", _guardado())
+    reloj.t = 11
+    assert almacen.obtener("a") is None and almacen.obtener("b") is None
+    assert len(almacen) == 0 and list(tmp_path.iterdir()) == []
+
+
+def test_tope_de_disco_y_enlace_de_respuestas_reproducidas(tmp_path) -> None:
+    almacen = AlmacenResultados(1, 1024 * 1024, 60, tmp_path, max_bytes_disco=300)
+    almacen.guardar("a", _guardado())
+    almacen.guardar("b", _guardado())
+    almacen.guardar("c", _guardado())  # "b" al disco desplaza a "a" (tope de 300 bytes)
+    assert almacen.obtener("a") is None and almacen.estadisticas()["descartes"] == 1
+    almacen = AlmacenResultados(4, 1024 * 1024, 60, tmp_path)
+    almacen.guardar("c", _guardado())
+    assert almacen.enlazar("c2", "c") and not almacen.enlazar("x", "nadie")
+    almacen.anotar_texto("c", "Prosa final.")  # el enlace comparte la entrada
+    assert almacen.obtener("c2").texto == "Prosa final."
+
+
+def test_paginar_ordena_filtra_y_deja_los_nulos_al_final() -> None:
+    filas = [["China", 5.0], ["Chile", None], ["Perú", 20.0], ["Chad", 1.0]]
+    guardado = ResultadoGuardado(ResultadoConsulta(["PAIS", "TOTAL"], filas, n_filas=4, truncado=True))
+    pagina = paginar(guardado, 0, 2, orden="TOTAL", descendente=True)
+    assert pagina["filas"] == [["Perú", 20.0], ["China", 5.0]] and pagina["total"] == 4 and pagina["truncado"]
+    assert paginar(guardado, 2, 2, orden="TOTAL", descendente=True)["filas"] == [["Chad", 1.0], ["Chile", None]]
+    filtrada = paginar(guardado, filtro="CH", columna="PAIS", orden="PAIS")
+    assert [f[0] for f in filtrada["filas"]] == ["Chad", "Chile", "China"] and filtrada["total"] == 3
+    with pytest.raises(ValueError):
+        paginar(guardado, orden="NO_EXISTE")
+
+
+def test_api_resultados_responde_404_y_400(entorno_limpio, tmp_path) -> None:
+    entorno_limpio.setenv("RESULTADOS_DIR", str(tmp_path))
+    with TestClient(main_mod.crear_app()) as cliente:
+        assert cliente.get("/api/resultados/desconocido").status_code == 404
+        cliente.app.state.resultados.guardar("abc", _guardado(300))
+        r = cliente.get("/api/resultados/abc", params={"offset": 250, "limit": 100, "orden": "TOTAL", "desc": True})
+        assert r.status_code == 200
+        cuerpo = r.json()
+        assert cuerpo["total"] == 300 and len(cuerpo["filas"]) == 50 and cuerpo["filas"][0] == ["PAIS_49", 490.0]
+        assert cliente.get("/api/resultados/abc", params={"orden": "X"}).status_code == 400
+
+
+def test_referencia_sobrevive_a_las_filas_para_releer_con_result_scan(tmp_path, reloj) -> None:
+    almacen = AlmacenResultados(4, 1024 * 1024, 10, None, reloj=reloj)
+    guardado = _guardado()
+    guardado.resultado.query_id = "01b2c3d4-0000-5a6b-0000-00012f3e4d5c"
+    almacen.guardar("a", guardado)
+    almacen.anotar_texto("a", "Prosa final.")
+    reloj.t = 11
+    assert almacen.obtener("a") is None
+    ref = almacen.referencia("a")
+    assert ref is not None and ref.resultado.filas == [] and ref.resultado.n_filas == 3
+    assert (ref.sql, ref.texto, ref.resultado.query_id) == ("SELECT 1", "Prosa final.", guardado.resultado.query_id)
+    reloj.t = 24 * 3600
+    assert almacen.referencia("a") is None
+
+
+def test_exportar_por_chat_id_usa_el_resultado_completo(entorno_limpio, tmp_path) -> None:
+    entorno_limpio.setenv("RESULTADOS_DIR", str(tmp_path))
+    with TestClient(main_mod.crear_app()) as cliente:
+        cliente.app.state.resultados.guardar("abc", _guardado(300))
+        r = cliente.post("/api/exportar/excel", json={"chat_id": "abc"})
+        assert r.status_code == 200 and r.content[:2] == b"PK"
+        hoja = load_workbook(io.BytesIO(r.content)).worksheets[-1]
+        assert hoja.max_row >= 300
+        assert cliente.post("/api/exportar/pptx", json={"chat_id": "otro"}).status_code == 404
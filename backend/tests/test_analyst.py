@@ -31,3 +31,29 @@ def test_parseo_tolera_cuerpos_incompletos() -> None:
 def test_cuenta_para_jwt() -> None:
     assert _cuenta_para_jwt("miorg-cuenta.snowflakecomputing.com") == "MIORG-CUENTA"
     assert _cuenta_para_jwt("ab12345.us-east-1") == "AB12345"
+
+
+def test_memo_por_pregunta_canonica_y_huella_semantica(entorno_limpio, monkeypatch) -> None:
+    from config import Config
+    from motores.cache import CacheLRU
+    from snowflake_.analyst import ClienteAnalyst, RespuestaAnalyst
+
+    llamadas: list[str] = []
+
+    def _llamar(self, pregunta, historial):
+        llamadas.append(pregunta)
+        return RespuestaAnalyst(sql=f"SELECT {len(llamadas)}", sugerencias=["s"])
+
+    monkeypatch.setattr(ClienteAnalyst, "_llamar", _llamar)
+    version = {"actual": "modelo.yaml|2048|md5-a"}
+    cliente = ClienteAnalyst(Config(), CacheLRU(10, 1024 * 1024), lambda: version["actual"])
+
+    assert cliente.preguntar("¿Cuánto exportó Antioquia?").sql == "SELECT 1"
+    assert cliente.preguntar("cuanto exporto antioquia").sql == "SELECT 1"
+    cliente.preguntar("cuanto exporto antioquia", historial=[{"role": "user", "content": []}])
+    assert len(llamadas) == 2  # el multiturno no usa la memoria
+
+    version["actual"] = "modelo.yaml|2050|md5-b"  # se subió un YAML nuevo al stage
+    assert cliente.preguntar("¿Cuánto exportó Antioquia?").sql == "SELECT 3"
+    cliente.olvidar("¿Cuánto exportó Antioquia?")
+    assert cliente.preguntar("¿Cuánto exportó Antioquia?").sql == "SELECT 4"
@@ -0,0 +1,92 @@
+"""Caché LRU compartida: forma canónica, TTL, desalojo por entradas y por bytes."""
+
+from __future__ import annotations
+
+import time
+from contextlib import nullcontext
+
+from motores.cache import CacheLRU, canonizar, huella
+
+
+def test_canonizar_ignora_mayusculas_tildes_signos_y_espacios() -> None:
+    assert canonizar("¿Cuánto exportó  ANTIOQUIA en 2024?") == "cuanto exporto antioquia en 2024"
+    assert canonizar("cuanto exporto antioquia en 2024") == canonizar("¿Cuánto exportó Antioquia en 2024?")
+
+
+def test_huella_es_estable_y_sensible_a_las_partes() -> None:
+    assert huella("a", {"x": 1, "y": 2}) == huella("a", {"y": 2, "x": 1})
+    assert huella("a", "cortex") != huella("a", "groq")
+
+
+def test_lru_desaloja_la_menos_reciente() -> None:
+    cache = CacheLRU(max_entradas=2, max_bytes=10_000)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    assert cache.obtener("a") == 1
+    cache.guardar("c", 3)
+    assert cache.obtener("b") is None and cache.obtener("a") == 1 and cache.obtener("c") == 3
+    assert cache.desalojos == 1
+
+
+def test_tope_de_bytes_y_valores_demasiado_grandes() -> None:
+    cache = CacheLRU(max_entradas=100, max_bytes=30)
+    assert cache.guardar("a", "x" * 10) and cache.guardar("b", "y" * 10)
+    cache.guardar("c", "z" * 10)
+    assert cache.bytes <= 30 and cache.obtener("a") is None
+    assert not cache.guardar("grande", "w" * 100)
+
+
+def test_ttl_vence_entradas(monkeypatch) -> None:
+    cache = CacheLRU(max_entradas=10, max_bytes=10_000, ttl_s=5)
+    cache.guardar("a", 1)
+    ahora = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: ahora + 6)
+    assert cache.obtener("a") is None
+    stats = cache.estadisticas()
+    assert stats["fallos"] == 1 and stats["entradas"] == 0
+
+
+class _ConexionMarca:
+    """Conexión falsa cuya única consulta devuelve la marca de agua actual."""
+
+    def __init__(self, marca: str) -> None:
+        self.marca = marca
+
+    def cursor(self):
+        conn = self
+
+        class _Cursor:
+            def execute(self, sql: str) -> None:
+                pass
+
+            def fetchone(self):
+                return (conn.marca,)
+
+            def close(self) -> None:
+                pass
+
+        return _Cursor()
+
+
+def test_cache_sql_se_invalida_cuando_cambia_la_marca_de_datos() -> None:
+    from snowflake_.cache_sql import MARCA_DATOS, CacheResultados, VigiaMarcas
+    from snowflake_.ejecutor import ResultadoConsulta
+
+    conn = _ConexionMarca("2026-09-01")
+    vigia = VigiaMarcas(lambda: nullcontext(conn), {MARCA_DATOS: "SELECT 1"}, intervalo_s=300)
+    cache = CacheResultados(10, 1024 * 1024, vigia)
+    res = ResultadoConsulta(columnas=["A"], filas=[[1]], n_filas=1, duracion_ms=900)
+
+    cache.guardar("SELECT 1", 5000, res)
+    assert cache.obtener("SELECT 1", 5000) is None  # sin marca conocida no se cachea
+
+    vigia.sondear()
+    cache.guardar("SELECT 1", 5000, res)
+    hit = cache.obtener("SELECT 1", 5000)
+    assert hit is not None and hit.desde_cache and hit.duracion_ms == 0 and hit.filas == [[1]]
+
+    conn.marca = "2026-10-01"  # aterrizó la carga mensual
+    vigia.sondear()
+    assert cache.obtener("SELECT 1", 5000) is None
+    stats = cache.estadisticas()
+    assert stats["marca_datos"] == "2026-10-01" and stats["aciertos"] == 1
@@ -0,0 +1,55 @@
+"""Caché por contenido de Excel/PPTX: niveles memoria/disco, clave con el día y ETag/304."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import main as main_mod
+from motores.cache_exportes import CacheExportes, clave_exporte
+
+
+def test_memoria_desaloja_a_disco_con_tope_y_vencimiento(tmp_path, reloj) -> None:
+    cache = CacheExportes(1, 1024 * 1024, 60, tmp_path, max_bytes_disco=250, reloj=reloj)
+    cache.guardar("a", "a.xlsx", b"A" * 100)
+    cache.guardar("b", "b.xlsx", b"B" * 100)  # "a" sale de memoria pero sigue en disco
+    assert cache.obtener("a") == ("a.xlsx", b"A" * 100)
+    assert cache.estadisticas()["aciertos_disco"] == 1
+    cache.guardar("c", "c.xlsx", b"C" * 100)  # tope de disco: se borra el más viejo ("a")
+    assert cache.estadisticas()["archivos_disco"] == 2 and not (tmp_path / "archivo-a").exists()
+    reloj.t = 61
+    assert cache.obtener("b") is None  # vencido en disco (en memoria ya no estaba)
+
+
+def test_clave_cambia_con_el_contenido_el_formato_y_el_dia() -> None:
+    base = ("p", "t", "SELECT 1", ["A"], [[1]])
+    hoy = clave_exporte("excel", *base, datetime(2026, 5, 4, 9, 0))
+    assert hoy == clave_exporte("excel", *base, datetime(2026, 5, 4, 23, 59))
+    assert hoy != clave_exporte("excel", *base, datetime(2026, 5, 5, 0, 1))
+    assert hoy != clave_exporte("pptx", *base, datetime(2026, 5, 4, 9, 0))
+    assert hoy != clave_exporte("excel", "p", "t", "SELECT 1", ["A"], [[2]], datetime(2026, 5, 4, 9, 0))
+
+
+def test_exportes_repetidos_salen_de_la_cache_y_responden_304(entorno_limpio, tmp_path) -> None:
+    entorno_limpio.setenv("EXPORT_CACHE_DIR", str(tmp_path / "cache"))
+    entorno_limpio.setenv("EXPORT_TRABAJOS_DIR", str(tmp_path / "trabajos"))
+    cuerpo = {"pregunta": "p", "texto": "t", "sql": "SELECT 1", "columnas": ["A"], "filas": [[1], [2]]}
+    with TestClient(main_mod.crear_app()) as cliente:
+        primero = cliente.post("/api/exportar/excel", json=cuerpo)
+        etag = primero.headers["etag"]
+        assert primero.status_code == 200 and etag.startswith('W/"')
+        segundo = cliente.post("/api/exportar/excel", json=cuerpo)
+        assert segundo.content == primero.content and segundo.headers["etag"] == etag
+        r = cliente.post("/api/exportar/excel", json=cuerpo, headers={"If-None-Match": etag})
+        assert r.status_code == 304 and r.content == b""
+        assert cliente.post("/api/exportar/pptx", json=cuerpo).headers["etag"] != etag
+
+        # Un trabajo con el mismo contenido sale listo de la caché, sin pasar por el pool.
+        trabajo = cliente.post("/api/exportar/trabajos/excel", json=cuerpo).json()
+        assert trabajo["estado"] == "listo" and trabajo["bytes"] == len(primero.content)
+        archivo = cliente.get(f"/api/exportar/trabajos/{trabajo['id']}/archivo")
+        assert archivo.content == primero.content and archivo.headers["etag"] == etag
+        r = cliente.get(f"/api/exportar/trabajos/{trabajo['id']}/archivo", headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert cliente.get("/api/salud").json()["cache_exportes"]["aciertos"] >= 2
@@ -0,0 +1,97 @@
+"""Carga masiva de telemetría: archivos NDJSON por tabla sin Snowflake, y PUT + COPY por tabla."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any
+
+from config import Config
+from snowflake_.carga_masiva import CargadorStage, EscritorNDJSON
+from snowflake_.ejecutor import Telemetria
+from snowflake_.spool import Spool
+
+
+def _telemetria(entorno_limpio, tmp_path, fabrica=None) -> Telemetria:
+    entorno_limpio.setenv("SF_ESQUEMA_TELEMETRIA", "DB_EXPORTBOT.TELEMETRY")
+    entorno_limpio.setenv("TELEMETRIA_MODO", "stage")
+    entorno_limpio.setenv("TELEMETRIA_STAGE_DIR", str(tmp_path))
+    return Telemetria(Config(), fabrica_conexion=fabrica or (lambda: nullcontext(None)))
+
+
+def _vaciar_cola(t: Telemetria) -> None:
+    pendientes: dict[str, list[tuple[Any, ...]]] = {}
+    while not t._cola.empty():
+        sql, params = t._cola.get_nowait()
+        pendientes.setdefault(sql, []).append(params)
+    t._vaciar(pendientes)
+
+
+def test_escritor_genera_ndjson_por_tabla_con_columnas_reales(entorno_limpio, tmp_path) -> None:
+    t = _telemetria(entorno_limpio, tmp_path)
+    t.log_evento("clic", {"boton": "excel"}, session_id="s1")
+    t.log_http("GET", "/api/salud", 200, 3.21, session_id="s1")
+    escritor: EscritorNDJSON = t._masiva.escritor
+    _vaciar_cola(t)
+    escritor.rotar()
+
+    listos = escritor.listos()
+    assert set(listos) == {"UI_EVENT", "EVENT_LOG"}
+    with gzip.open(listos["UI_EVENT"][0], "rt", encoding="utf-8") as f:
+        ui = json.loads(f.readline())
+    assert ui["EVENT_TYPE"] == "clic" and ui["PAYLOAD"] == {"boton": "excel"}  # VARIANT como objeto
+    assert ui["SESSION_ID"] == "s1" and ui["APP_NAME"] == "exportbot" and ui["EVENT_ID"] and ui["EVENT_TS"]
+    with gzip.open(listos["EVENT_LOG"][0], "rt", encoding="utf-8") as f:
+        http = json.loads(f.readline())
+    assert http["ENDPOINT"] == "/api/salud" and http["RESPONSE_STATUS"] == 200
+
+
+def test_event_ts_es_el_instante_del_evento_no_el_del_lote(entorno_limpio, tmp_path) -> None:
+    t = _telemetria(entorno_limpio, tmp_path)
+    t.log_http("GET", "/api/salud", 200, 1.0)
+    ((_, fila),) = list(t._cola.queue)
+    encolado = datetime.fromisoformat(fila.instante)
+    spool = Spool(tmp_path / "spool", 1024 * 1024)
+    spool.escribir([(t._cola.get_nowait()[0], fila)])
+    _, ((sql, releida),) = spool.siguiente()  # el instante sobrevive al spool
+    time.sleep(0.05)  # el lote sale después
+    t._vaciar({sql: [releida]})
+    t._masiva.escritor.rotar()
+    with gzip.open(t._masiva.escritor.listos()["EVENT_LOG"][0], "rt", encoding="utf-8") as f:
+        assert datetime.fromisoformat(json.loads(f.readline())["EVENT_TS"]) == encolado
+
+
+def test_chat_log_sigue_por_insert(entorno_limpio, tmp_path) -> None:
+    t = _telemetria(entorno_limpio, tmp_path)
+    assert not t._masiva.escritor.acepta("INSERT INTO DB.T.CHAT_LOG (ID, TS) SELECT %s, CURRENT_TIMESTAMP()")
+    assert not t._masiva.escritor.acepta("INSERT INTO DB.T.FEEDBACK (A) VALUES (%s)")
+
+
+def test_cargador_sube_y_copia_una_vez_por_tabla(tmp_path) -> None:
+    sentencias: list[str] = []
+
+    class _Cursor:
+        def execute(self, sql: str) -> None:
+            sentencias.append(sql)
+
+        def close(self) -> None:
+            pass
+
+    class _Conexion:
+        def cursor(self) -> _Cursor:
+            return _Cursor()
+
+    escritor = EscritorNDJSON(tmp_path, "exportbot")
+    sql = "INSERT INTO DB.T.EVENT_LOG (METHOD, ENDPOINT) VALUES (%s, %s)"
+    escritor.agregar(sql, [("GET", "/api/a"), ("POST", "/api/b")])
+    escritor.rotar()
+    escritor.agregar(sql, [("GET", "/api/c")])
+    cargador = CargadorStage(lambda: nullcontext(_Conexion()), escritor, "DB.T", "DB.T.STG_TELEMETRIA")
+
+    assert cargador.cargar() == 2
+    assert [s.split()[0] for s in sentencias] == ["PUT", "PUT", "COPY"]
+    assert "@DB.T.STG_TELEMETRIA/EVENT_LOG/" in sentencias[-1] and "MATCH_BY_COLUMN_NAME" in sentencias[-1]
+    assert not list(tmp_path.iterdir())  # cargados: fuera del disco
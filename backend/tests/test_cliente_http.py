@@ -0,0 +1,140 @@
+"""ClienteHTTP: reuso de conexiones keep-alive, reintentos idempotentes y medición."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+
+import pytest
+import requests
+
+from config import cargar_config
+from motores import cliente_http as modulo_http
+from motores.cliente_http import ClienteHTTP, ClienteHTTPAsync, cerrar_cliente_http_async, cliente_http_async
+from motores.redactor import _deltas_openai_compat_async
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    respuestas: ClassVar[list[int]] = []
+    puertos_cliente: ClassVar[list[int]] = []
+
+    def do_POST(self) -> None:
+        largo = int(self.headers.get("Content-Length", "0"))
+        self.rfile.read(largo)
+        self.puertos_cliente.append(self.client_address[1])
+        estado = self.respuestas.pop(0) if self.respuestas else 200
+        cuerpo = json.dumps({"ok": estado == 200}).encode()
+        if self.path == "/chat/completions":  # streaming estilo OpenAI
+            trozos = [{"choices": [{"delta": {"content": t}}]} for t in ("Hola", " mundo.")]
+            cuerpo = "".join(f"data: {json.dumps(t)}\n\n" for t in trozos).encode() + b"data: [DONE]\n\n"
+        self.send_response(estado)
+        if estado == 503:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def servidor() -> Iterator[str]:
+    _Manejador.respuestas = []
+    _Manejador.puertos_cliente = []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f"http://127.0.0.1:{srv.server_address[1]}"
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_reusa_la_conexion_entre_peticiones(servidor: str) -> None:
+    cliente = ClienteHTTP(pool_max=2)
+    for _ in range(5):
+        resp = cliente.post(f"{servidor}/x", json={"q": 1}, headers={}, timeout=5)
+        assert resp.json() == {"ok": True}
+    host = servidor.removeprefix("http://")
+    stats = cliente.estadisticas()[host]
+    assert stats["peticiones"] == 5
+    assert stats["conexiones_nuevas"] == 1
+    assert len(set(_Manejador.puertos_cliente)) == 1  # un solo socket del lado servidor
+    assert stats["conexion_prom_ms"] >= 0 and stats["servidor_prom_ms"] >= 0
+    cliente.cerrar()
+
+
+def test_reintenta_5xx_solo_si_es_idempotente(servidor: str) -> None:
+    cliente = ClienteHTTP(reintentos=2)
+    host = servidor.removeprefix("http://")
+
+    _Manejador.respuestas = [503, 503]
+    resp = cliente.post(f"{servidor}/x", json={}, headers={}, timeout=5, idempotente=True)
+    assert resp.status_code == 200
+    assert cliente.estadisticas()[host]["reintentos"] == 2
+
+    _Manejador.respuestas = [503]
+    resp = cliente.post(f"{servidor}/x", json={}, headers={}, timeout=5)
+    assert resp.status_code == 503
+    assert cliente.estadisticas()[host]["errores"] == 3
+    cliente.cerrar()
+
+
+def test_fallo_de_conexion_se_registra_y_propaga() -> None:
+    cliente = ClienteHTTP(reintentos=0)
+    with pytest.raises(requests.RequestException):
+        cliente.post("http://127.0.0.1:9/x", json={}, headers={}, timeout=1)
+    assert cliente.estadisticas()["127.0.0.1:9"]["errores"] == 1
+
+
+def test_cliente_async_reusa_conexion_y_reintenta(servidor: str) -> None:
+    async def escenario() -> dict[str, object]:
+        cliente = ClienteHTTPAsync(pool_max=2, reintentos=1)
+        _Manejador.respuestas = [503]
+        for _ in range(3):
+            resp = await cliente.post(f"{servidor}/x", json={}, headers={}, timeout=5, idempotente=True)
+            assert resp.status_code == 200
+        await cliente.cerrar()
+        return cliente.estadisticas()[servidor.removeprefix("http://")]
+
+    stats = asyncio.run(escenario())
+    assert stats["peticiones"] == 4 and stats["reintentos"] == 1
+    assert stats["conexiones_nuevas"] == 1
+
+
+def test_streaming_openai_entrega_los_trozos(servidor: str) -> None:
+    async def escenario() -> list[str]:
+        cliente = ClienteHTTPAsync()
+        deltas = [d async for d in _deltas_openai_compat_async(cliente, servidor, "k", "m", "p", 5)]
+        await cliente.cerrar()
+        return deltas
+
+    assert asyncio.run(escenario()) == ["Hola", " mundo."]
+
+
+def test_cliente_async_acota_conexiones_y_suelta_los_de_loops_cerrados() -> None:
+    cfg = cargar_config()
+
+    async def crear() -> ClienteHTTPAsync:
+        return cliente_http_async(cfg)
+
+    primero = asyncio.run(crear())  # su loop queda cerrado al volver
+    pool = primero._cliente._transport._pool
+    assert pool._max_connections == pool._max_keepalive_connections == max(1, cfg.http_pool_max)
+
+    async def otro_y_cerrar() -> bool:
+        cliente_http_async(cfg)
+        sigue = primero in modulo_http._clientes_async.values()
+        await cerrar_cliente_http_async()
+        return sigue
+
+    assert asyncio.run(otro_y_cerrar()) is False
+    assert modulo_http._clientes_async == {}
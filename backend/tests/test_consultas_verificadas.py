@@ -0,0 +1,59 @@
+"""Consultas verificadas: coincidencia conservadora y relleno de ranuras sobre el YAML real."""
+
+from __future__ import annotations
+
+import pytest
+
+from config import RAIZ_PROYECTO
+from motores.consultas_verificadas import IndiceVerificadas
+
+SEMANTICO = RAIZ_PROYECTO / "semantic"
+
+
+@pytest.fixture(scope="module")
+def indice() -> IndiceVerificadas:
+    return IndiceVerificadas.desde_yaml(
+        SEMANTICO / "modelo_exportaciones_analyst.yaml", SEMANTICO / "preguntas_doradas.yaml"
+    )
+
+
+def _pares() -> list[tuple[str, str, str]]:
+    return [
+        (
+            "¿Cuáles son los 10 principales países destino en 2025?",
+            "SELECT DESC_PAIS, SUM(USD_FOB) FROM DB.SILVER.FACT WHERE ANIO = 2025 GROUP BY 1 ORDER BY 2 DESC LIMIT 10",
+            "prueba:top",
+        ),
+        (
+            "Exportaciones de Antioquia en 2024",
+            "SELECT SUM(USD_FOB) FROM DB.SILVER.FACT WHERE DEPARTAMENTO = 'ANTIOQUIA' AND ANIO = 2024",
+            "prueba:depto",
+        ),
+    ]
+
+
+def test_relleno_de_anio_cantidad_y_departamento() -> None:
+    idx = IndiceVerificadas(
+        _pares(), {"departamento": {"antioquia": "ANTIOQUIA", "valle del cauca": "VALLE DEL CAUCA"}}
+    )
+    top = idx.buscar("cuales son los 5 principales paises destino en 2023")
+    assert top is not None and top.origen == "prueba:top"
+    assert "ANIO = 2023" in top.sql and top.sql.endswith("LIMIT 5") and top.confianza == 1.0
+    depto = idx.buscar("¿Exportaciones de Valle del Cauca en 2024?")
+    assert depto is not None and "DEPARTAMENTO = 'VALLE DEL CAUCA'" in depto.sql
+    assert depto.ranuras == {"departamento": ["VALLE DEL CAUCA"], "anio": ["2024"]}
+
+
+def test_palabras_desconocidas_o_ranuras_distintas_van_a_analyst() -> None:
+    idx = IndiceVerificadas(_pares(), {"departamento": {"antioquia": "ANTIOQUIA"}})
+    assert idx.buscar("Exportaciones mineras de Antioquia en 2024") is None  # filtro que la plantilla no tiene
+    assert idx.buscar("Exportaciones de Antioquia") is None  # falta el año
+    assert idx.buscar("Exportaciones no de Antioquia en 2024") is None  # negación
+    assert idx.buscar("¿Qué es un arancel?") is None
+
+
+def test_indice_real_carga_modelo_y_suite_dorada(indice: IndiceVerificadas) -> None:
+    assert len(indice) > 0
+    for plantilla in indice._plantillas:  # toda plantilla se reconoce a sí misma
+        hallada = indice.buscar(plantilla.pregunta)
+        assert hallada is not None and hallada.confianza == 1.0
@@ -0,0 +1,153 @@
+"""ejecutar_select por lotes: tope de filas, truncado y lectura Arrow cuando el conector la ofrece."""
+
+from __future__ import annotations
+
+import datetime as dt
+import decimal
+from typing import Any
+
+import pytest
+
+from snowflake_.ejecutor import (
+    ejecutar_select,
+    ejecutar_select_columnar,
+    ejecutar_select_nativo_por_lotes,
+    ejecutar_select_por_lotes,
+    releer_resultado,
+    tipo_columna,
+)
+
+
+class Cursor:
+    def __init__(self, filas: list[tuple[Any, ...]]) -> None:
+        self.description = [("PAIS",), ("TOTAL",)]
+        self._filas = list(filas)
+        self.lecturas: list[int] = []
+        self.cerrado = False
+        self.sentencias: list[str] = []
+        self.sfqid = "01b2c3d4-0000-5a6b-0000-00012f3e4d5c"
+
+    def execute(self, sql: str) -> None:
+        self.sentencias.append(sql)
+
+    def fetchmany(self, n: int) -> list[tuple[Any, ...]]:
+        self.lecturas.append(n)
+        lote, self._filas = self._filas[:n], self._filas[n:]
+        return lote
+
+    def close(self) -> None:
+        self.cerrado = True
+
+
+class Columna:
+    def __init__(self, valores: list[Any]) -> None:
+        self._valores = valores
+
+    def to_pylist(self) -> list[Any]:
+        return list(self._valores)
+
+
+class TablaArrow:
+    def __init__(self, columnas: list[list[Any]]) -> None:
+        self._columnas = columnas
+        self.num_rows = len(columnas[0])
+
+    def slice(self, inicio: int, largo: int) -> TablaArrow:
+        return TablaArrow([c[inicio : inicio + largo] for c in self._columnas])
+
+    @property
+    def columns(self) -> list[Columna]:
+        return [Columna(c) for c in self._columnas]
+
+
+class CursorArrow(Cursor):
+    def __init__(self, tablas: list[TablaArrow]) -> None:
+        super().__init__([])
+        self._tablas = tablas
+
+    def fetch_arrow_batches(self) -> Any:
+        return iter(self._tablas)
+
+
+class Conexion:
+    def __init__(self, cursor: Cursor) -> None:
+        self._cursor = cursor
+
+    def cursor(self) -> Cursor:
+        return self._cursor
+
+
+def test_lotes_acotados_con_truncado_en_el_ultimo() -> None:
+    cursor = Cursor([(f"P{i}", decimal.Decimal(i)) for i in range(25)])
+    lotes = list(ejecutar_select_por_lotes(Conexion(cursor), "SELECT 1", max_filas=22, lote=10))
+    assert [len(lote.filas) for lote in lotes] == [10, 10, 2]
+    assert [lote.n_filas for lote in lotes] == [10, 20, 22]
+    assert [lote.parcial for lote in lotes] == [True, True, False]
+    assert [lote.truncado for lote in lotes] == [False, False, True]
+    assert lotes[0].filas[3] == ["P3", 3.0] and max(cursor.lecturas) == 10
+    assert cursor.cerrado
+
+
+def test_ejecutar_select_une_los_lotes_y_detecta_el_borde_exacto() -> None:
+    filas = [(f"P{i}", i) for i in range(20)]
+    res = ejecutar_select(Conexion(Cursor(filas)), "SELECT 1", max_filas=20, lote=10)
+    assert res.n_filas == 20 and not res.truncado and not res.parcial
+    vacio = list(ejecutar_select_por_lotes(Conexion(Cursor([])), "SELECT 1", max_filas=5))
+    assert len(vacio) == 1 and vacio[0].columnas == ["PAIS", "TOTAL"] and vacio[0].filas == []
+
+
+def test_lectura_arrow_por_columnas_y_recortada_al_lote() -> None:
+    tablas = [TablaArrow([["Chile", "Perú", "México"], [1, 2, 3]]), TablaArrow([["Brasil"], [decimal.Decimal("4.5")]])]
+    cursor = CursorArrow(tablas)
+    lotes = list(ejecutar_select_por_lotes(Conexion(cursor), "SELECT 1", max_filas=100, lote=2))
+    assert [lote.filas for lote in lotes] == [[["Chile", 1], ["Perú", 2]], [["México", 3]], [["Brasil", 4.5]]]
+    assert cursor.lecturas == []  # no se usó fetchmany
+
+
+def test_conversion_por_columna_segun_el_tipo_del_driver() -> None:
+    cursor = Cursor(
+        [
+            (decimal.Decimal("1.50"), 7, dt.date(2025, 1, 31), b"ok", "x"),
+            (None, None, None, None, None),
+        ]
+    )
+    # (nombre, type_code, display_size, internal_size, precision, scale, null_ok)
+    cursor.description = [
+        ("FOB", 0, None, None, 38, 2, True),
+        ("N", 0, None, None, 38, 0, True),
+        ("FECHA", 3, None, None, None, None, True),
+        ("BIN", 11, None, None, None, None, True),
+        ("TXT", 2, None, None, None, None, True),
+    ]
+    res = ejecutar_select_columnar(Conexion(cursor), "SELECT 1", max_filas=10)
+    assert res.columna("FOB") == [1.5, None] and res.columna("FECHA") == ["2025-01-31", None]
+    assert res.filas == [[1.5, 7, "2025-01-31", "ok", "x"], [None, None, None, None, None]]
+    assert res.a_resultado().n_filas == 2 and len(res) == 2
+    assert [tipo_columna(d) for d in cursor.description] == ["float", "int", "texto", "texto", "texto"]
+
+
+def test_releer_resultado_usa_result_scan_con_el_query_id() -> None:
+    cursor = Cursor([("Chile", 1)])
+    original = ejecutar_select(Conexion(cursor), "SELECT 1", max_filas=10)
+    assert original.query_id == cursor.sfqid
+    cursor = Cursor([("Chile", 1)])
+    releido = releer_resultado(Conexion(cursor), original.query_id, max_filas=10)
+    assert cursor.sentencias == [f"SELECT * FROM TABLE(RESULT_SCAN('{original.query_id}'))"]
+    assert releido.filas == [["Chile", 1]] and releido.query_id == original.query_id
+    with pytest.raises(ValueError):
+        releer_resultado(Conexion(Cursor([])), "x'); DROP TABLE T; --", max_filas=10)
+
+
+def test_lotes_nativos_para_exportar_sin_pasar_por_filas() -> None:
+    tablas = [TablaArrow([["Chile", "Perú", "México"], [1, 2, 3]]), TablaArrow([["Brasil"], [4]])]
+    cursor = CursorArrow(tablas)
+    lotes = list(ejecutar_select_nativo_por_lotes(Conexion(cursor), "SELECT 1", max_filas=2))
+    assert len(lotes) == 1 and lotes[0][0] == ["PAIS", "TOTAL"]
+    assert isinstance(lotes[0][2], TablaArrow) and lotes[0][2].num_rows == 2  # la tabla tal cual, recortada
+    assert cursor.cerrado and cursor.lecturas == []
+
+    cursor = Cursor([("Chile", decimal.Decimal("1.5")), ("Perú", decimal.Decimal(2))])
+    lotes = list(ejecutar_select_nativo_por_lotes(Conexion(cursor), "SELECT 1", max_filas=10, lote=1))
+    assert [datos for _, _, datos in lotes] == [[["Chile"], [1.5]], [["Perú"], [2.0]]]
+    vacio = list(ejecutar_select_nativo_por_lotes(Conexion(Cursor([])), "SELECT 1", max_filas=10))
+    assert vacio == [(["PAIS", "TOTAL"], ["texto", "texto"], [[], []])]
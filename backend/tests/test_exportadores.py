@@ -23,3 +23,31 @@ def test_pptx_se_abre_con_laminas() -> None:
     contenido = pptx.construir("¿Top países?", "EE. UU. lidera.", "SELECT …", COLS, FILAS)
     prs = Presentation(io.BytesIO(contenido))
     assert len(prs.slides) >= 3
+
+
+def test_excel_write_only_consume_un_generador_y_conserva_el_diseno() -> None:
+    buf = io.BytesIO()
+    n = excel.escribir(buf, "¿Top?", "Texto.", "SELECT 1", COLS, ([f"P{i}", i * 1.5] for i in range(500)))
+    ws = load_workbook(buf).active
+    assert n == 500 and ws.cell(row=6, column=1).value == "PAIS"
+    assert ws.cell(row=6, column=1).fill.fgColor.rgb.endswith("0B2E6B")
+    assert ws.cell(row=506, column=2).value == 748.5 and ws.cell(row=506, column=2).number_format == "#,##0.00"
+    assert (
+        ws.cell(row=508, column=1).value == "SQL ejecutada (auditoría):"
+        and ws.cell(row=509, column=1).value == "SELECT 1"
+    )
+    assert ws.cell(row=511, column=1).value.startswith("Advertencia")
+
+
+def test_pptx_tabla_en_bloque_pagina_cientos_de_filas_con_su_estilo() -> None:
+    filas = [[f"P{i} & <Cía>", i * 1.5, None] for i in range(250)]
+    prs = Presentation(io.BytesIO(pptx.construir("¿Top?", "Texto.", "SELECT 1", ["PAIS", "TOTAL", "NOTA"], filas)))
+    assert len(prs.slides) == 2 + 25
+    tabla = prs.slides[1].shapes[0].table
+    assert len(tabla.rows) == 11 and len(tabla.columns) == 3
+    cabecera = tabla.cell(0, 0)
+    assert cabecera.text == "PAIS" and str(cabecera.fill.fore_color.rgb) == "0B2E6B"
+    assert cabecera.text_frame.paragraphs[0].font.size.pt == 11 and cabecera.text_frame.paragraphs[0].font.bold
+    ultima = prs.slides[25].shapes[0].table
+    assert ultima.cell(10, 0).text == "P249 & <Cía>" and ultima.cell(10, 1).text == "373.50"
+    assert ultima.cell(10, 2).text == "" and ultima.cell(10, 1).text_frame.paragraphs[0].font.size.pt == 10
@@ -0,0 +1,114 @@
+"""Exportes de datos por chat_id o con filas: CSV, Parquet y Arrow IPC en streaming."""
+
+from __future__ import annotations
+
+import csv
+import io
+import threading
+from contextlib import nullcontext
+from types import SimpleNamespace
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main as main_mod
+from exportadores import tabular
+from motores.almacen_resultados import ResultadoGuardado
+from routers import exportar
+from snowflake_.ejecutor import ResultadoConsulta
+
+
+def _guardado(n: int) -> ResultadoGuardado:
+    filas = [[f"PAIS_{i}", float(i * 10)] for i in range(n)]
+    return ResultadoGuardado(ResultadoConsulta(["PAIS", "TOTAL"], filas, n_filas=n), sql="SELECT 1", pregunta="top")
+
+
+def _cliente(entorno_limpio, tmp_path) -> TestClient:
+    entorno_limpio.setenv("RESULTADOS_DIR", str(tmp_path))
+    return TestClient(main_mod.crear_app())
+
+
+def test_csv_por_chat_id_y_con_filas_del_cuerpo(entorno_limpio, tmp_path) -> None:
+    with _cliente(entorno_limpio, tmp_path) as cliente:
+        cliente.app.state.resultados.guardar("abc", _guardado(300))
+        r = cliente.post("/api/exportar/csv", json={"chat_id": "abc"})
+        assert r.status_code == 200 and r.headers["content-type"].startswith("text/csv")
+        filas = list(csv.reader(io.StringIO(r.text)))
+        assert filas[0] == ["PAIS", "TOTAL"] and len(filas) == 301 and filas[1] == ["PAIS_0", "0.0"]
+        r = cliente.post("/api/exportar/csv", json={"columnas": ["A", "B"], "filas": [[1], [2, "x"]]})
+        assert r.text == "A,B\n1,\n2,x\n"
+        assert cliente.post("/api/exportar/csv", json={"chat_id": "otro"}).status_code == 404
+
+
+def test_parquet_y_arrow_conservan_tipos_y_filas(entorno_limpio, tmp_path) -> None:
+    with _cliente(entorno_limpio, tmp_path) as cliente:
+        cliente.app.state.resultados.guardar("abc", _guardado(300))
+        r = cliente.post("/api/exportar/parquet", json={"chat_id": "abc"})
+        assert r.status_code == 200 and r.headers["content-type"] == "application/vnd.apache.parquet"
+        tabla = pq.read_table(io.BytesIO(r.content))
+        assert tabla.num_rows == 300 and tabla.column("TOTAL").type == pa.float64()
+        r = cliente.post("/api/exportar/arrow", json={"columnas": ["A"], "filas": []})
+        vacia = pa.ipc.open_stream(r.content).read_all()
+        assert vacia.column_names == ["A"] and vacia.num_rows == 0
+        r = cliente.post("/api/exportar/arrow", json={"chat_id": "abc"})
+        assert pa.ipc.open_stream(r.content).read_all().column_names == ["PAIS", "TOTAL"]
+
+
+def test_esquema_se_fija_antes_del_primer_lote_aunque_venga_ralo(entorno_limpio, tmp_path) -> None:
+    entorno_limpio.setenv("SF_LOTE_FILAS", "1")  # un lote por fila: el primero no muestra los tipos
+    cuerpo = {"columnas": ["NULO", "MIXTA", "NUM"], "filas": [[None, 1, 1], [1.5, "x", 1.5]]}
+    with _cliente(entorno_limpio, tmp_path) as cliente:
+        r = cliente.post("/api/exportar/parquet", json=cuerpo)
+    tabla = pq.read_table(io.BytesIO(r.content))
+    assert [f.type for f in tabla.schema] == [pa.float64(), pa.string(), pa.float64()]
+    assert tabla.to_pylist() == [
+        {"NULO": None, "MIXTA": "1", "NUM": 1.0},
+        {"NULO": 1.5, "MIXTA": "x", "NUM": 1.5},
+    ]
+
+
+def test_lotes_arrow_se_ensanchan_al_esquema_del_primero() -> None:
+    lotes = [
+        pa.table({"N": pa.array([1], pa.int8()), "V": pa.nulls(1)}),
+        pa.table({"N": pa.array([300_000], pa.int32()), "V": pa.array([2.5])}),
+    ]
+    datos = b"".join(tabular.arrow_por_lotes("arrow", ["N", "V"], lotes, lambda _: None, ["int", "float"]))
+    tabla = pa.ipc.open_stream(datos).read_all()
+    assert tabla.column("N").to_pylist() == [1, 300_000] and tabla.column("V").to_pylist() == [None, 2.5]
+
+
+def test_exportes_desde_el_cursor_tienen_cupo_propio() -> None:
+    class _Cursor:
+        def __init__(self) -> None:
+            self.description = [("PAIS", 2), ("TOTAL", 1)]
+
+        def execute(self, sql: str) -> None:
+            self.filas = [("Chile", 1.0)]
+
+        def fetchmany(self, n: int) -> list[tuple[Any, ...]]:
+            lote, self.filas = self.filas[:n], self.filas[n:]
+            return lote
+
+        def close(self) -> None:
+            pass
+
+    class _Conexion:
+        def cursor(self) -> _Cursor:
+            return _Cursor()
+
+    cfg = SimpleNamespace(modo_auth="pat", export_max_filas=10, sf_lote_filas=10)
+    gestor = SimpleNamespace(prestamo=lambda: nullcontext(_Conexion()))
+    estado = SimpleNamespace(cfg=cfg, gestor=gestor, exportes_cursor=threading.BoundedSemaphore(1))
+    request = SimpleNamespace(app=SimpleNamespace(state=estado))
+    query_id = "01b2c3d4-0000-1111-2222-333344445555"
+    columnas, tipos, lotes = exportar._desde_cursor(request, query_id)
+    assert columnas == ["PAIS", "TOTAL"] and tipos == ["texto", "float"]
+    with pytest.raises(HTTPException) as exc:  # la única conexión para exportes está tomada
+        exportar._desde_cursor(request, query_id)
+    assert exc.value.status_code == 429 and exc.value.headers["Retry-After"] == "5"
+    assert list(lotes) == [[["Chile"], [1.0]]]
+    assert exportar._desde_cursor(request, query_id) is not None  # terminó la descarga: hay cupo
@@ -40,7 +40,27 @@ def _dist_entrypoints() -> tuple[str, str]:
 
 
 def _mock_api_and_assets(page: Page) -> dict[str, int]:
-    calls = {"chat": 0, "excel": 0, "pptx": 0, "feedback": 0}
+    calls = {"chat": 0, "trabajos": 0, "sondeos": 0, "excel": 0, "pptx": 0, "feedback": 0}
+    archivos = {
+        "excel": ("exportbot.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+        "pptx": ("exportbot.pptx", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+    }
+
+    def trabajo(tipo: str, estado: str) -> str:
+        listo = estado == "listo"
+        return json.dumps(
+            {
+                "id": f"trabajo-{tipo}",
+                "formato": tipo,
+                "estado": estado,
+                "hechas": 2 if listo else 0,
+                "total": 2,
+                "progreso": 1.0 if listo else 0.0,
+                "nombre": archivos[tipo][0],
+                "bytes": 12 if listo else 0,
+                "error": "",
+            }
+        )
 
     def handler(route: Route) -> None:
         url = route.request.url
@@ -108,26 +128,25 @@ def _mock_api_and_assets(page: Page) -> dict[str, int]:
             body = "".join(f"data: {json.dumps(event, ensure_ascii=False)}\n\n" for event in events)
             route.fulfill(status=200, content_type="text/event-stream", body=body)
             return
-        if path == "/api/exportar/excel":
-            calls["excel"] += 1
-            route.fulfill(
-                status=200,
-                headers={
-                    "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    "Content-Disposition": 'attachment; filename="resultado.xlsx"',
-                },
-                body=b"PK-test-excel",
-            )
+        # Excel y PPTX van como trabajo en segundo plano: 202, sondeo del estado y archivo.
+        trabajos = re.fullmatch(r"/api/exportar/trabajos/(excel|pptx)", path)
+        if trabajos and route.request.method == "POST":
+            calls["trabajos"] += 1
+            route.fulfill(status=202, content_type="application/json", body=trabajo(trabajos.group(1), "en_cola"))
             return
-        if path == "/api/exportar/pptx":
-            calls["pptx"] += 1
+        sondeo = re.fullmatch(r"/api/exportar/trabajos/trabajo-(excel|pptx)(/archivo)?", path)
+        if sondeo and not sondeo.group(2):
+            calls["sondeos"] += 1
+            route.fulfill(status=200, content_type="application/json", body=trabajo(sondeo.group(1), "listo"))
+            return
+        if sondeo:
+            tipo = sondeo.group(1)
+            calls[tipo] += 1
+            nombre, mime = archivos[tipo]
             route.fulfill(
                 status=200,
-                headers={
-                    "Content-Type": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-                    "Content-Disposition": 'attachment; filename="resultado.pptx"',
-                },
-                body=b"PK-test-pptx",
+                headers={"Content-Type": mime, "Content-Disposition": f'attachment; filename="{nombre}"'},
+                body=f"PK-test-{tipo}".encode(),
             )
             return
         if path == "/api/track/feedback":
@@ -310,7 +329,7 @@ def test_frontend_contract_and_visual_regression(tmp_path: Path) -> None:
         for protected_text in ("Token de administración", "Entrar al panel", "Métricas de uso", "Cerrar sesión"):
             assert protected_text in metrics_source
 
-        assert calls == {"chat": 2, "excel": 1, "pptx": 1, "feedback": 1}
+        assert calls == {"chat": 2, "trabajos": 2, "sondeos": 2, "excel": 1, "pptx": 1, "feedback": 1}
 
         # Control negativo: el comparador debe bloquear un cambio visual amplio.
         altered = tmp_path / "exportbot_inicio_alterado.png"
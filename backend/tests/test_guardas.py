@@ -1,6 +1,6 @@
 """Guardas anti-alucinación: validador de SQL y verificador de cifras."""
 
-from motores.guardas import validar_sql, verificar_cifras
+from motores.guardas import VerificadorCifras, validar_sql, verificar_cifras
 
 PERMITIDOS = frozenset({"DWH_PROCOLOMBIA_SNOWFLAKE.SILVER"})
 
@@ -42,3 +42,15 @@ def test_verificador_tolera_redondeos_y_ordinales() -> None:
     filas = [["Antioquia", 1234567.891]]
     texto = "Los 10 principales: Antioquia registró 1.234.567,89 dólares."
     assert verificar_cifras(texto, filas, 1).ok
+
+
+def test_verificador_incremental_revisa_frases_terminadas() -> None:
+    filas = [["Estados Unidos", 4211591218.59]]
+    v = VerificadorCifras(filas, 1)
+    # La cifra llega partida: no se juzga hasta que la frase termina.
+    assert v.agregar("Estados Unidos lideró con 4.211.") == []
+    assert v.agregar("591.218,59 USD FOB. Le sigue") == []
+    assert v.agregar(" China con 777.777") == []
+    assert v.agregar(" USD. ") == ["777.777"]
+    v.agregar("Sin más cifras")
+    assert v.cerrar().ok
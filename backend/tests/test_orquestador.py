@@ -0,0 +1,327 @@
+"""Orquestador con dobles de Analyst y Snowflake: flujo completo y caché de respuestas."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import Any
+
+from config import Config
+from motores.almacen_resultados import AlmacenResultados
+from motores.cache import CacheLRU
+from motores.consultas_verificadas import IndiceVerificadas
+from orquestador import Orquestador
+from snowflake_.analyst import RespuestaAnalyst
+from snowflake_.ejecutor import Telemetria
+
+SQL = "SELECT DESC_PAIS, TOTAL FROM DWH_PROCOLOMBIA_SNOWFLAKE.SILVER.FACT_EXPORTACIONES_SL LIMIT 10"
+
+
+class CursorFalso:
+    def __init__(self, conn: ConexionFalsa) -> None:
+        self._conn = conn
+        self.description: list[tuple[str]] = []
+        self._filas: list[tuple[Any, ...]] = []
+
+    def execute(self, sql: str, params: tuple[Any, ...] | None = None) -> None:
+        self._conn.sentencias.append(sql)
+        if "CORTEX.COMPLETE" in sql:
+            self._filas = [("Estados Unidos lideró con 4211591218.59 USD FOB.",)]
+            return
+        self.description = [("PAIS",), ("TOTAL_USD_FOB",)]
+        self._filas = [("Estados Unidos", 4211591218.59), ("China", 987654321.0)]
+
+    def fetchmany(self, n: int) -> list[tuple[Any, ...]]:
+        lote, self._filas = self._filas[:n], self._filas[n:]
+        return lote
+
+    def fetchone(self) -> tuple[Any, ...] | None:
+        return self._filas[0] if self._filas else None
+
+    def close(self) -> None:
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self) -> None:
+        self.sentencias: list[str] = []
+
+    def cursor(self) -> CursorFalso:
+        return CursorFalso(self)
+
+
+class AnalystFalso:
+    def __init__(self) -> None:
+        self.llamadas = 0
+        self.demora_s = 0.0
+
+    def preguntar(self, pregunta: str, historial: list[dict[str, Any]] | None = None) -> RespuestaAnalyst:
+        self.llamadas += 1
+        return RespuestaAnalyst(sql=SQL, interpretacion="Top países.", sugerencias=["¿Y en 2024?"])
+
+    async def preguntar_async(self, pregunta: str, historial: list[dict[str, Any]] | None = None) -> RespuestaAnalyst:
+        await asyncio.sleep(self.demora_s)
+        return self.preguntar(pregunta, historial)
+
+    def olvidar(self, pregunta: str) -> None:
+        pass
+
+    def estadisticas_memo(self) -> dict[str, Any]:
+        return {}
+
+
+def _orquestador(
+    entorno_limpio, cache: CacheLRU | None = None, verificadas: IndiceVerificadas | None = None
+) -> tuple[Orquestador, AnalystFalso, ConexionFalsa]:
+    cfg = Config()
+    conn = ConexionFalsa()
+    analyst = AnalystFalso()
+    orq = Orquestador(cfg, lambda: nullcontext(conn), Telemetria(cfg, None), analyst, cache, verificadas=verificadas)
+    return orq, analyst, conn
+
+
+def test_flujo_completo_termina_en_final_verificado(entorno_limpio) -> None:
+    orq, _, _ = _orquestador(entorno_limpio)
+    eventos = list(orq.procesar("Top países destino en 2025"))
+    final = eventos[-1]
+    assert final["tipo"] == "final"
+    assert final["columnas"] == ["PAIS", "TOTAL_USD_FOB"] and final["n_filas"] == 2
+    assert final["meta"]["cifras_verificadas"] and final["meta"]["cache"] is False
+    assert [e["etapa"] for e in eventos if e["tipo"] == "etapa"][:2] == ["analyst", "validacion"]
+
+
+def test_resultado_llega_antes_de_la_redaccion(entorno_limpio) -> None:
+    orq, _, _ = _orquestador(entorno_limpio)
+    eventos = list(orq.procesar("Top países destino en 2025"))
+    orden = [e.get("etapa", e["tipo"]) for e in eventos]
+    assert orden.index("resultado") < orden.index("redaccion")
+    resultado, final = next(e for e in eventos if e["tipo"] == "resultado"), eventos[-1]
+    for campo in ("columnas", "filas", "n_filas", "truncado"):
+        assert resultado[campo] == final[campo]  # el final conserva su contrato completo
+
+
+def test_resultado_completo_queda_en_el_almacen(entorno_limpio, tmp_path) -> None:
+    cfg = Config()
+    almacen = AlmacenResultados(4, 1024 * 1024, 60, tmp_path)
+    conn = ConexionFalsa()
+    orq = Orquestador(cfg, lambda: nullcontext(conn), Telemetria(cfg, None), AnalystFalso(), resultados=almacen)
+    final = list(orq.procesar("Top países destino en 2025"))[-1]
+    guardado = almacen.obtener(final["chat_id"])
+    assert guardado is not None and guardado.resultado.n_filas == 2
+    assert guardado.sql == final["sql"] and guardado.texto == final["texto"]
+
+
+def test_cache_reproduce_la_respuesta_sin_llamar_servicios(entorno_limpio) -> None:
+    cache = CacheLRU(10, 1024 * 1024, 60)
+    orq, analyst, conn = _orquestador(entorno_limpio, cache)
+    primera = list(orq.procesar("¿Top países destino en 2025?"))
+    sentencias = len(conn.sentencias)
+    segunda = list(orq.procesar("  top PAISES destino en 2025 "))
+    assert analyst.llamadas == 1 and len(conn.sentencias) == sentencias
+    assert [e["tipo"] for e in segunda] == [e["tipo"] for e in primera]
+    assert segunda[-1]["texto"] == primera[-1]["texto"]
+    assert segunda[-1]["meta"]["cache"] is True
+    assert segunda[-1]["chat_id"] != primera[-1]["chat_id"]
+    assert {e["chat_id"] for e in segunda} == {segunda[-1]["chat_id"]}
+    assert cache.aciertos == 1 and cache.fallos == 1
+
+
+def test_cache_se_omite_con_historial_y_por_proveedor(entorno_limpio) -> None:
+    cache = CacheLRU(10, 1024 * 1024, 60)
+    orq, analyst, _ = _orquestador(entorno_limpio, cache)
+    list(orq.procesar("Top países"))
+    list(orq.procesar("Top países", historial=[{"role": "user", "content": []}]))
+    list(orq.procesar("Top países", proveedor="groq"))
+    assert analyst.llamadas == 3
+
+
+def _indice(sql: str) -> IndiceVerificadas:
+    return IndiceVerificadas([("Top países destino en 2024", sql, "prueba:top")], {})
+
+
+def test_consulta_verificada_evita_analyst(entorno_limpio) -> None:
+    orq, analyst, conn = _orquestador(entorno_limpio, verificadas=_indice(SQL.replace("LIMIT 10", "WHERE ANIO = 2024")))
+    eventos = list(orq.procesar("¿Top países destino en 2025?"))
+    final = eventos[-1]
+    assert analyst.llamadas == 0 and final["tipo"] == "final"
+    assert "ANIO = 2025" in final["sql"] and "ANIO = 2025" in conn.sentencias[0]
+    assert final["meta"]["proveedor_sql"] == "verified" and final["meta"]["confianza_sql"] == 1.0
+    assert next(e["etapa"] for e in eventos if e["tipo"] == "etapa") == "verificada"
+
+
+def test_consulta_verificada_rechazada_por_la_guarda_sigue_por_analyst(entorno_limpio) -> None:
+    orq, analyst, _ = _orquestador(entorno_limpio, verificadas=_indice("DELETE FROM X WHERE ANIO = 2024"))
+    final = list(orq.procesar("Top países destino en 2024"))[-1]
+    assert analyst.llamadas == 1 and final["meta"]["proveedor_sql"] == "analyst"
+    assert final["sql"] == SQL
+
+
+async def _recolectar(orq: Orquestador, pregunta: str) -> list[dict[str, Any]]:
+    return [e async for e in orq.procesar_async(pregunta)]
+
+
+def test_flujo_async_emite_los_mismos_eventos_que_el_sync(entorno_limpio) -> None:
+    orq, _, _ = _orquestador(entorno_limpio)
+    sync = list(orq.procesar("Top países destino en 2025"))
+    asincrono = asyncio.run(_recolectar(orq, "Top países destino en 2025"))
+    assert [(e["tipo"], e.get("etapa")) for e in asincrono] == [(e["tipo"], e.get("etapa")) for e in sync]
+    assert asincrono[-1]["texto"] == sync[-1]["texto"] and asincrono[-1]["meta"]["proveedor"] == "cortex"
+
+
+def test_flujo_async_atiende_streams_concurrentes_sin_un_hilo_cada_uno(entorno_limpio) -> None:
+    orq, analyst, _ = _orquestador(entorno_limpio)
+    analyst.demora_s = 0.3  # Analyst lento: se espera en el event loop, no en un hilo
+
+    async def muchos() -> list[list[dict[str, Any]]]:
+        return await asyncio.gather(*(_recolectar(orq, f"Top países {i}") for i in range(200)))
+
+    t0 = time.monotonic()
+    resultados = asyncio.run(muchos())
+    assert all(r[-1]["tipo"] == "final" for r in resultados)
+    assert time.monotonic() - t0 < 3  # en serie serían 60 s; con 40 hilos, 1.5 s solo de Analyst
+
+
+def test_preguntas_identicas_en_curso_se_coalescen(entorno_limpio) -> None:
+    orq, analyst, conn = _orquestador(entorno_limpio)
+    analyst.demora_s = 0.1
+    filas: list[dict[str, Any]] = []
+    orq._telemetria.log_chat = lambda **campos: filas.append(campos)
+
+    async def muchos() -> list[list[dict[str, Any]]]:
+        preguntas = ["Top países destino en 2025"] * 9 + ["  top PAISES destino en 2025?"]
+        return await asyncio.gather(*(_recolectar(orq, p) for p in preguntas))
+
+    resultados = asyncio.run(muchos())
+    finales = [r[-1] for r in resultados]
+    assert analyst.llamadas == 1 and sum("CORTEX.COMPLETE" not in s for s in conn.sentencias) == 1
+    assert len({f["chat_id"] for f in finales}) == 10 and len({f["texto"] for f in finales}) == 1
+    assert sum(bool(f["meta"].get("coalescida")) for f in finales) == 9
+    assert len(filas) == 10 and sum(bool(f.get("detalles", {}).get("coalescida")) for f in filas) == 9
+    assert orq.estadisticas_cache()["en_vuelo"] == {"activos": 0, "coalescidas": 9}
+
+
+def test_seguidor_termina_aunque_el_lider_se_desconecte(entorno_limpio) -> None:
+    orq, analyst, _ = _orquestador(entorno_limpio)
+    analyst.demora_s = 0.1
+
+    async def escenario() -> list[dict[str, Any]]:
+        lider = orq.procesar_async("Top países destino en 2025")
+        await anext(lider)  # primer evento; luego el cliente se va
+        seguidor = asyncio.create_task(_recolectar(orq, "Top países destino en 2025"))
+        await asyncio.sleep(0)
+        await lider.aclose()
+        return await seguidor
+
+    eventos = asyncio.run(escenario())
+    assert eventos[-1]["tipo"] == "final" and eventos[-1]["meta"]["coalescida"] is True
+
+
+def _carrera(entorno_limpio, respuestas: dict[str, tuple[float, str]], cobertura_ms: str) -> Any:
+    """Redacción en carrera con proveedores simulados: pid → (demora_s, texto)."""
+    from motores import redactor
+    from snowflake_.ejecutor import ResultadoConsulta
+
+    entorno_limpio.setenv("REDACCION_CARRERA", "1")
+    entorno_limpio.setenv("REDACCION_COBERTURA_MS", cobertura_ms)
+
+    async def llamar(cfg: Config, fabrica: Any, pid: str, prompt: str, limitador: Any) -> tuple[str, str]:
+        demora, texto = respuestas[pid]
+        await asyncio.sleep(demora)
+        return texto, f"modelo-{pid}"
+
+    entorno_limpio.setattr(redactor, "_llamar_async", llamar)
+    res = ResultadoConsulta(columnas=["PAIS", "TOTAL"], filas=[["China", 987654321.0]], n_filas=1)
+    return asyncio.run(redactor.redactar_async(Config(), None, "groq", "Top países", res))
+
+
+def test_carrera_de_redaccion_gana_la_cobertura_si_el_primario_tarda(entorno_limpio) -> None:
+    red = _carrera(entorno_limpio, {"groq": (5.0, "China: 987654321.0"), "cortex": (0.01, "China: 987654321.0")}, "50")
+    assert red.proveedor == "cortex" and red.degradado
+    assert red.carrera["ganador"] == "cortex"
+    assert {c["proveedor"]: c["resultado"] for c in red.carrera["candidatos"]} == {
+        "groq": "cancelado",
+        "cortex": "ganador",
+    }
+    assert red.carrera["ventaja_min_ms"] >= 0
+
+
+def test_carrera_descarta_cifras_huerfanas_del_mas_rapido(entorno_limpio) -> None:
+    red = _carrera(entorno_limpio, {"groq": (0.01, "China: 123456.0"), "cortex": (0.05, "China: 987654321.0")}, "0")
+    assert red.proveedor == "cortex" and red.texto == "China: 987654321.0"
+    assert red.carrera["candidatos"][0]["resultado"] == "invalida"
+
+
+def _en_vivo(entorno_limpio, trozos: list[str]) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[str]]:
+    """Flujo async con un proveedor OpenAI simulado que transmite ``trozos``."""
+    from motores import redactor
+
+    entorno_limpio.setenv("PROVEEDOR_REDACCION", "groq")
+    entorno_limpio.setenv("GROQ_API_KEY", "clave")
+    enviados: list[str] = []
+
+    async def deltas(*_args: Any) -> Any:
+        for trozo in trozos:
+            await asyncio.sleep(0)
+            enviados.append(trozo)
+            yield trozo
+
+    entorno_limpio.setattr(redactor, "_deltas_openai_compat_async", deltas)
+    orq, _, _ = _orquestador(entorno_limpio)
+    registros: list[dict[str, Any]] = []
+    orq._telemetria.log_chat = lambda **campos: registros.append(campos)
+    return asyncio.run(_recolectar(orq, "Top países destino")), registros, enviados
+
+
+def test_redaccion_en_vivo_transmite_fragmentos_y_mide_el_primero(entorno_limpio) -> None:
+    trozos = ["Estados Unidos lideró con ", "4211591218.59 USD FOB. ", "Le sigue China."]
+    eventos, registros, _ = _en_vivo(entorno_limpio, trozos)
+    parciales = [e["delta"] for e in eventos if e.get("etapa") == "texto_parcial"]
+    assert parciales == trozos
+    final = eventos[-1]
+    assert final["texto"] == "".join(trozos).strip() and final["meta"]["proveedor"] == "groq"
+    assert final["meta"]["cifras_verificadas"]
+    detalles = registros[-1]["detalles"]
+    assert 0 <= detalles["latencia_primer_token_ms"] <= registros[-1]["latencia_redaccion_ms"]
+
+
+def test_redaccion_en_vivo_corta_ante_una_cifra_huerfana(entorno_limpio) -> None:
+    trozos = ["China sumó 123456.7 USD. ", "Esto ya no ", "debería pedirse."]
+    eventos, registros, enviados = _en_vivo(entorno_limpio, trozos)
+    parciales = [e for e in eventos if e.get("etapa") == "texto_parcial"]
+    assert parciales[-1].get("reiniciar") is True
+    assert eventos[-1]["meta"]["proveedor"] == "plantilla" and not eventos[-1]["meta"]["cifras_verificadas"]
+    assert enviados == trozos[:1]  # el stream se cortó en la primera frase
+    assert registros[-1]["proveedor"] == "groq" and registros[-1]["respuesta_degradada"]
+
+
+def test_vuelo_que_termina_a_mitad_de_stream_lo_cierra(entorno_limpio) -> None:
+    from motores import guardas, redactor
+
+    entorno_limpio.setenv("PROVEEDOR_REDACCION", "groq")
+    entorno_limpio.setenv("GROQ_API_KEY", "clave")
+    cerrados: list[str] = []
+
+    async def deltas(*_args: Any) -> Any:
+        try:
+            yield "Estados Unidos lideró. "
+            await asyncio.Event().wait()  # el proveedor se queda sin responder
+        finally:
+            cerrados.append("stream")
+
+    def agregar(self: Any, delta: str) -> list[str]:
+        raise RuntimeError("falla del flujo entre fragmentos")
+
+    entorno_limpio.setattr(redactor, "_deltas_openai_compat_async", deltas)
+    entorno_limpio.setattr(guardas.VerificadorCifras, "agregar", agregar)
+    orq, _, _ = _orquestador(entorno_limpio)
+
+    async def fallar() -> list[str]:
+        try:
+            await _recolectar(orq, "Top países destino")
+        except RuntimeError:
+            pass
+        return list(cerrados)  # antes de que el cierre del loop finalice los generadores
+
+    assert asyncio.run(fallar()) == ["stream"]
+    assert orq.estadisticas_cache()["en_vuelo"]["activos"] == 0
@@ -0,0 +1,136 @@
+"""Pool de GestorConexion: préstamo/devolución, tope, validación al prestar, segador y circuito."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from config import Config
+from snowflake_.conexion import GestorConexion, SnowflakeNoDisponible
+
+
+class ConexionFalsa:
+    def __init__(self) -> None:
+        self.cerrada = False
+
+    def is_closed(self) -> bool:
+        return self.cerrada
+
+    def close(self) -> None:
+        self.cerrada = True
+
+    def cursor(self) -> None:
+        raise RuntimeError("la sesión ya no responde a SELECT 1")
+
+
+def _gestor(monkeypatch, **env: str) -> tuple[GestorConexion, list[ConexionFalsa]]:
+    for nombre, valor in env.items():
+        monkeypatch.setenv(nombre, valor)
+    gestor = GestorConexion(Config())
+    creadas: list[ConexionFalsa] = []
+
+    def conectar() -> ConexionFalsa:
+        creadas.append(ConexionFalsa())
+        return creadas[-1]
+
+    monkeypatch.setattr(gestor, "conectar", conectar)
+    monkeypatch.setattr(gestor, "_iniciar_segador", lambda: None)
+    monkeypatch.setattr(gestor, "_iniciar_reconexion", lambda: None)
+    return gestor, creadas
+
+
+def test_reutiliza_la_conexion_devuelta(entorno_limpio) -> None:
+    gestor, creadas = _gestor(entorno_limpio)
+    with gestor.prestamo() as a:
+        pass
+    with gestor.fabrica()() as b:
+        assert gestor.estadisticas()["en_uso"] == 1
+    assert a is b and len(creadas) == 1
+    stats = gestor.estadisticas()
+    assert stats["libres"] == 1 and stats["en_uso"] == 0 and stats["prestamos"] == 2
+
+
+def test_descarta_la_conexion_muerta_y_crea_otra(entorno_limpio) -> None:
+    gestor, creadas = _gestor(entorno_limpio)
+    with gestor.prestamo() as a:
+        pass
+    a.cerrada = True
+    with gestor.prestamo() as b:
+        assert b is not a
+    assert len(creadas) == 2 and gestor.estadisticas()["descartadas"] == 1
+
+
+def test_cierra_la_conexion_que_no_responde_al_validarla(entorno_limpio) -> None:
+    gestor, creadas = _gestor(entorno_limpio)
+    with gestor.prestamo() as a:
+        pass
+    gestor._libres[0] = (a, time.monotonic() - 3600)  # ociosa: se valida con SELECT 1
+    with gestor.prestamo() as b:
+        assert b is not a
+    assert a.cerrada and len(creadas) == 2 and gestor.estadisticas()["descartadas"] == 1
+
+
+def test_tope_bloquea_y_agota_con_espera(entorno_limpio) -> None:
+    gestor, _ = _gestor(entorno_limpio, SF_POOL_MAX="1", SF_POOL_ESPERA_S="1")
+    liberado = threading.Event()
+
+    def retener() -> None:
+        with gestor.prestamo():
+            liberado.wait(2)
+
+    hilo = threading.Thread(target=retener)
+    hilo.start()
+    time.sleep(0.05)
+    with pytest.raises(RuntimeError, match="agotado"), gestor.prestamo():
+        pass
+    liberado.set()
+    hilo.join()
+    with gestor.prestamo():
+        pass
+    stats = gestor.estadisticas()
+    assert stats["agotados"] == 1 and stats["creadas"] == 1 and stats["espera_max_ms"] >= 900
+
+
+def test_segador_cierra_ociosas_sin_bajar_del_minimo(entorno_limpio, monkeypatch) -> None:
+    gestor, creadas = _gestor(entorno_limpio, SF_POOL_MIN="1", SF_POOL_INACTIVIDAD_S="10")
+    with gestor.prestamo(), gestor.prestamo(), gestor.prestamo():
+        pass
+    ahora = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: ahora + 11)
+    assert gestor.segar() == 2
+    assert [c.cerrada for c in creadas].count(True) == 2 and gestor.estadisticas()["libres"] == 1
+    gestor.cerrar()
+    assert all(c.cerrada for c in creadas)
+
+
+def test_circuito_abre_falla_rapido_y_se_cierra_al_reconectar(entorno_limpio, monkeypatch) -> None:
+    gestor, creadas = _gestor(entorno_limpio, SF_CIRCUITO_FALLOS="2", SF_CIRCUITO_ESPERA_S="30")
+    intentos: list[int] = []
+
+    def caido() -> ConexionFalsa:
+        intentos.append(1)
+        raise RuntimeError("Snowflake inaccesible: 503")
+
+    monkeypatch.setattr(gestor, "conectar", caido)
+    for _ in range(2):
+        with pytest.raises(SnowflakeNoDisponible), gestor.prestamo():
+            pass
+    assert gestor.estado_circuito()["estado"] == "abierto"
+
+    t0 = time.monotonic()
+    # El reintento de fondo no llega dentro del plazo del llamador: falla al instante.
+    with pytest.raises(SnowflakeNoDisponible) as info, gestor.prestamo(espera_s=1):
+        pass
+    assert len(intentos) == 2 and time.monotonic() - t0 < 0.5 and info.value.reintentar_en_s >= 29
+
+    assert not gestor.probar_reconexion()  # sigue caído: reabre con espera doble
+    assert gestor.estado_circuito()["reintentar_en_s"] > 30
+
+    monkeypatch.setattr(gestor, "conectar", lambda: ConexionFalsa())
+    assert gestor.probar_reconexion()
+    estado = gestor.estado_circuito()
+    assert estado["estado"] == "cerrado" and estado["transiciones"] == {"cerrado": 1, "abierto": 2, "semiabierto": 2}
+    with gestor.prestamo() as conn:
+        assert isinstance(conn, ConexionFalsa) and not creadas
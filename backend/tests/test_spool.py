@@ -0,0 +1,102 @@
+"""Spool de telemetría: rotación, tope con desalojo del más viejo y reproducción al volver Snowflake."""
+
+from __future__ import annotations
+
+import time
+from contextlib import nullcontext
+from typing import Any
+
+from config import Config
+from snowflake_.ejecutor import Telemetria
+from snowflake_.spool import Spool
+
+SQL = "INSERT INTO T.FEEDBACK (A, B) VALUES (%s, %s)"
+
+
+def test_rota_segmentos_y_desaloja_los_mas_viejos(tmp_path) -> None:
+    spool = Spool(tmp_path, max_bytes=2000, max_segmento_bytes=500)
+    for i in range(40):
+        assert spool.escribir([(SQL, (f"chat-{i:03d}", True))]) == 1
+    stats = spool.estadisticas()
+    assert stats["bytes"] <= 2000 and stats["segmentos"] > 1 and stats["segmentos_desalojados"] > 0
+    segmento, filas = spool.siguiente()
+    assert filas[0][0] == SQL and filas[0][1][0] > "chat-000"  # lo más viejo se perdió primero
+    assert isinstance(filas[0][1], tuple)
+    spool.confirmar(segmento, len(filas))
+    assert spool.estadisticas()["filas_reproducidas"] == len(filas)
+
+
+def test_lote_fallido_va_al_spool_y_se_reproduce(entorno_limpio, tmp_path) -> None:
+    escritas: list[tuple[str, Any]] = []
+    caido = {"si": True}
+
+    class _Cursor:
+        def executemany(self, sql: str, filas: Any) -> None:
+            escritas.extend((sql, f) for f in filas)
+
+        def close(self) -> None:
+            pass
+
+    class _Conexion:
+        def cursor(self) -> _Cursor:
+            return _Cursor()
+
+    def fabrica():
+        if caido["si"]:
+            raise RuntimeError("Snowflake no disponible")
+        return nullcontext(_Conexion())
+
+    entorno_limpio.setenv("SF_ESQUEMA_TELEMETRIA", "DB_EXPORTBOT.TELEMETRY")
+    entorno_limpio.setenv("TELEMETRIA_SPOOL_DIR", str(tmp_path))
+    t = Telemetria(Config(), fabrica_conexion=fabrica)
+    t.log_feedback("c1", True)
+    t.log_feedback("c2", False)
+    t.iniciar()
+    t.detener()  # el lote falla al apagar: termina en disco, no en descartes
+    assert t.estadisticas()["spool"]["filas_escritas"] == 2 and t.descartes == 0
+
+    caido["si"] = False  # siguiente arranque: Snowflake responde
+    t.iniciar()
+    limite = time.monotonic() + 5
+    while not escritas and time.monotonic() < limite:
+        time.sleep(0.05)
+    t.detener()
+    assert [p[0] for _, p in escritas] == ["c1", "c2"]
+    assert t.estadisticas()["spool"]["segmentos"] == 0
+
+
+def test_lote_a_medias_solo_manda_al_spool_las_tablas_que_faltan(entorno_limpio, tmp_path) -> None:
+    escritas: list[str] = []
+    cursores = {"quedan": 1}  # la conexión cae después de la primera tabla
+
+    class _Cursor:
+        def executemany(self, sql: str, filas: Any) -> None:
+            escritas.extend(sql for _ in filas)
+
+        def close(self) -> None:
+            pass
+
+    class _Conexion:
+        def cursor(self) -> _Cursor:
+            if cursores["quedan"] == 0:
+                raise RuntimeError("conexión perdida")
+            cursores["quedan"] -= 1
+            return _Cursor()
+
+    entorno_limpio.setenv("SF_ESQUEMA_TELEMETRIA", "DB_EXPORTBOT.TELEMETRY")
+    entorno_limpio.setenv("TELEMETRIA_SPOOL_DIR", str(tmp_path))
+    t = Telemetria(Config(), fabrica_conexion=lambda: nullcontext(_Conexion()))
+    otra = SQL.replace("FEEDBACK", "OTRA")
+    assert not t._vaciar({SQL: [("c1", True)], otra: [("c2", False), ("c3", True)]})
+    assert escritas == [SQL] and t._spool.filas_escritas == 2  # solo las dos filas de OTRA
+
+    t._spool.escribir([(SQL, ("c4", True))])  # mismo segmento: la reproducción toca dos tablas
+    escritas.clear()
+    cursores["quedan"] = 1
+    t.iniciar()
+    limite = time.monotonic() + 5
+    while not t._spool.filas_reproducidas and time.monotonic() < limite:
+        time.sleep(0.05)
+    t.detener()
+    _, filas = t._spool.siguiente()  # el segmento se reemplazó por lo que faltaba
+    assert escritas == [otra, otra] and filas == [(SQL, ("c4", True))]
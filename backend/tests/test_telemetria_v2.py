@@ -7,6 +7,9 @@ real — la regresión clave es que UI_EVENT ya no inserta '' como versión.
 
 from __future__ import annotations
 
+from contextlib import nullcontext
+from typing import Any
+
 from config import VERSION_APP, Config
 from snowflake_.ejecutor import Telemetria
 
@@ -76,3 +79,42 @@ def test_middleware_audita_solo_api(entorno_limpio):
         sql, params = telemetria._cola.get_nowait()
         assert "EVENT_LOG" in sql and "RESPONSE_STATUS" in sql
         assert "/api/salud" in params and "s-mw" in params and "u-mw" in params
+
+
+class _CursorLote:
+    def __init__(self, sentencias: list[tuple[str, str, Any]]) -> None:
+        self._sentencias = sentencias
+
+    def execute(self, sql: str, params: Any = None) -> None:
+        self._sentencias.append(("execute", sql, params))
+
+    def executemany(self, sql: str, filas: Any) -> None:
+        self._sentencias.append(("executemany", sql, filas))
+
+    def close(self) -> None:
+        pass
+
+
+def test_worker_escribe_un_lote_por_tabla(entorno_limpio):
+    """Lo encolado se agrupa por tabla: UNION ALL para INSERT…SELECT, executemany para VALUES."""
+    sentencias: list[tuple[str, str, Any]] = []
+
+    class _Conexion:
+        def cursor(self) -> _CursorLote:
+            return _CursorLote(sentencias)
+
+    entorno_limpio.setenv("SF_ESQUEMA_TELEMETRIA", "DB_EXPORTBOT.TELEMETRY")
+    t = Telemetria(Config(), fabrica_conexion=lambda: nullcontext(_Conexion()))
+    for i in range(3):
+        t.log_evento("clic", {"i": i})
+        t.log_http("GET", "/api/salud", 200, 1.5)
+    t.iniciar()
+    t.detener()  # el apagado vacía el lote pendiente
+
+    assert len(sentencias) == 2
+    ui = next(s for s in sentencias if "UI_EVENT" in s[1])
+    http = next(s for s in sentencias if "EVENT_LOG" in s[1])
+    assert ui[0] == "execute" and ui[1].count("UNION ALL") == 2 and len(ui[2]) == 3 * 9
+    assert http[0] == "executemany" and len(http[2]) == 3
+    stats = t.estadisticas()
+    assert stats["lotes"] == 1 and stats["filas_escritas"] == 6 and stats["pendientes"] == 0
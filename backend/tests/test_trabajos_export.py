@@ -0,0 +1,95 @@
+"""Exportes en segundo plano: pool de procesos, progreso, cupo y vencimiento."""
+
+from __future__ import annotations
+
+import io
+import time
+from concurrent.futures import Future
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+import main as main_mod
+from motores.admision import Rechazo
+from motores.trabajos_export import ESTADOS_FINALES, ColaExportes, TrabajoExport
+
+
+def _esperar(condicion, limite_s: float = 60.0) -> None:
+    fin = time.monotonic() + limite_s
+    while not condicion():
+        assert time.monotonic() < fin, "el trabajo no terminó a tiempo"
+        time.sleep(0.05)
+
+
+def test_trabajo_en_otro_proceso_cupo_y_vencimiento(tmp_path, reloj) -> None:
+    (tmp_path / "exporte-viejo.xlsx").write_bytes(b"x")
+    cola = ColaExportes(1, 1, 60, tmp_path, reloj=reloj)
+    assert not (tmp_path / "exporte-viejo.xlsx").exists()  # restos de un proceso anterior
+    filas = [[f"PAIS_{i}", i * 1.5] for i in range(2500)]
+    try:
+        trabajo = cola.enviar("excel", "x.xlsx", "p", "t", "SELECT 1", ["PAIS", "TOTAL"], filas)
+        with pytest.raises(Rechazo):
+            cola.enviar("pptx", "x.pptx", "p", "t", "SELECT 1", ["PAIS"], [["Chile"]])
+        _esperar(lambda: cola.obtener(trabajo.id).estado == "listo")
+        vista = cola.obtener(trabajo.id).publico()
+        assert vista["hechas"] == vista["total"] == 2500 and vista["progreso"] == 1.0 and vista["bytes"] > 0
+        ruta = cola.archivo(trabajo)
+        assert load_workbook(ruta).worksheets[-1].max_row >= 2500
+        assert cola.estadisticas()["rechazos"] == 1
+        reloj.t = 61
+        assert cola.obtener(trabajo.id) is None and not ruta.exists()
+    finally:
+        cola.cerrar()
+
+
+def test_pool_roto_se_reconstruye_y_relanza(tmp_path) -> None:
+    cola = ColaExportes(1, 2, 60, tmp_path)
+    try:
+        primero = cola.enviar("excel", "x.xlsx", "p", "t", "SELECT 1", ["A"], [[1]])
+        _esperar(lambda: cola.obtener(primero.id).estado == "listo")
+        for proceso in list(cola._pool._processes.values()):
+            proceso.kill()  # un trabajador muerto deja el pool en BrokenProcessPool
+        segundo = cola.enviar("pptx", "x.pptx", "p", "t", "SELECT 1", ["A"], [[1]])
+        _esperar(lambda: cola.obtener(segundo.id).estado in ESTADOS_FINALES)
+        assert cola.obtener(segundo.id).estado == "listo" and cola.archivo(segundo) is not None
+        assert cola.estadisticas()["reinicios_pool"] == 1
+    finally:
+        cola.cerrar()
+
+
+def test_trabajo_cancelado_al_cerrar_queda_en_error(tmp_path) -> None:
+    cola = ColaExportes(1, 2, 60, tmp_path)
+    cola.cerrar()
+    trabajo = TrabajoExport("t1", "excel", "x.xlsx", total=1, n_columnas=1)
+    futuro = Future()
+    futuro.cancel()  # lo que deja shutdown(cancel_futures=True) para lo que no llegó a un trabajador
+    cola._terminar(trabajo, futuro, ())
+    assert trabajo.estado == "error" and "cancel" in trabajo.error
+    assert cola.estadisticas()["fallidos"] == 1
+
+
+def test_api_de_trabajos_devuelve_id_progreso_y_archivo(entorno_limpio, tmp_path) -> None:
+    entorno_limpio.setenv("EXPORT_TRABAJOS_DIR", str(tmp_path))
+    entorno_limpio.setenv("EXPORT_TRABAJADORES", "1")
+    entorno_limpio.setenv("EXPORT_CACHE_DIR", str(tmp_path / "cache"))
+    cuerpo = {"pregunta": "p", "texto": "t", "sql": "SELECT 1", "columnas": ["A"], "filas": [[1], [2]]}
+    with TestClient(main_mod.crear_app()) as cliente:
+        r = cliente.post("/api/exportar/trabajos/excel", json=cuerpo)
+        assert r.status_code == 202 and r.json()["total"] == 2
+        trabajo_id = r.json()["id"]
+        assert cliente.get(f"/api/exportar/trabajos/{trabajo_id}/archivo").status_code in (200, 409)
+        eventos = cliente.get(f"/api/exportar/trabajos/{trabajo_id}/eventos").text
+        assert '"estado": "listo"' in eventos.strip().split("\n\n")[-1]
+        r = cliente.get(f"/api/exportar/trabajos/{trabajo_id}/archivo")
+        assert r.status_code == 200 and r.headers["content-disposition"].startswith("attachment")
+        assert load_workbook(io.BytesIO(r.content)).worksheets[-1].max_row >= 2
+        assert cliente.get("/api/exportar/trabajos/desconocido").status_code == 404
+        assert cliente.post("/api/exportar/trabajos/csv", json=cuerpo).status_code == 404
+        salud = cliente.get("/api/salud").json()
+        assert salud["exportes_segundo_plano"]["listo"] == 1
+        assert salud["cache_exportes"]["archivos_disco"] == 1  # al_terminar lo dejó en la caché
+        fallido = cliente.app.state.exportes.obtener(trabajo_id)
+        fallido.estado, fallido.error = "error", "No se pudo generar el archivo."
+        r = cliente.get(f"/api/exportar/trabajos/{trabajo_id}/archivo")
+        assert r.status_code == 500 and r.json()["detail"] == "No se pudo generar el archivo."
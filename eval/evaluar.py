@@ -73,9 +73,9 @@ def main() -> int:
             if not v.ok:
                 registro["motivo"] = f"validacion: {v.motivo}"
                 raise RuntimeError(registro["motivo"])
-            conn = gestor.obtener()
-            obtenido = ejecutar_select(conn, v.sql, cfg.max_filas_resultado)
-            esperado = ejecutar_select(conn, caso["sql_referencia"], cfg.max_filas_resultado)
+            with gestor.prestamo() as conn:
+                obtenido = ejecutar_select(conn, v.sql, cfg.max_filas_resultado)
+                esperado = ejecutar_select(conn, caso["sql_referencia"], cfg.max_filas_resultado)
             iguales = _normalizar(obtenido.filas) == _normalizar(esperado.filas)
             registro.update(
                 ok=iguales,
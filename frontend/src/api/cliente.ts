@@ -1,6 +1,6 @@
 /** Cliente HTTP del frontend: SSE del chat, exportables, métricas y feedback. */
 
-import type { Celda, EventoChat, Proveedor } from "../tipos";
+import type { Celda, EventoChat, PaginaResultado, Proveedor, TrabajoExport } from "../tipos";
 
 const sesion = (() => {
   const clave = "exportbot_session";
@@ -27,6 +27,17 @@ export async function chatStream(
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ pregunta, proveedor, session_id: sesion, historial: [] }),
   });
+  if (resp.status === 429) {
+    const cuerpo = (await resp.json().catch(() => ({}))) as { detail?: string };
+    const espera = Number(resp.headers.get("Retry-After")) || undefined;
+    onEvento({
+      tipo: "error",
+      chat_id: "",
+      mensaje: cuerpo.detail ?? "ExportBot está ocupado; intente de nuevo en unos segundos.",
+      reintentar_en_s: espera,
+    });
+    return;
+  }
   if (!resp.ok || !resp.body) {
     onEvento({ tipo: "error", chat_id: "", mensaje: `Error HTTP ${resp.status} del servidor.` });
     return;
@@ -53,6 +64,23 @@ export async function chatStream(
   }
 }
 
+/** Filas del resultado completo más allá de las que llegaron por el stream. */
+export async function paginaResultado(
+  chatId: string,
+  offset: number,
+  limit: number,
+  opciones: { orden?: string; desc?: boolean; filtro?: string; columna?: string } = {},
+): Promise<PaginaResultado> {
+  const params = new URLSearchParams({ offset: String(offset), limit: String(limit) });
+  for (const [clave, valor] of Object.entries(opciones)) {
+    if (valor !== undefined && valor !== "") params.set(clave, String(valor));
+  }
+  const r = await fetch(`/api/resultados/${encodeURIComponent(chatId)}?${params}`);
+  if (r.status === 404) throw new Error("El resultado ya no está disponible; repita la pregunta.");
+  if (!r.ok) throw new Error(`HTTP ${r.status}`);
+  return (await r.json()) as PaginaResultado;
+}
+
 export interface CuerpoExport {
   pregunta: string;
   texto: string;
@@ -62,22 +90,95 @@ export interface CuerpoExport {
   chat_id: string;
 }
 
-/** Descarga Excel o PPTX construidos en el servidor. */
-export async function exportar(tipo: "excel" | "pptx", cuerpo: CuerpoExport): Promise<void> {
-  const resp = await fetch(`/api/exportar/${tipo}`, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ ...cuerpo, session_id: sesion }),
-  });
-  if (!resp.ok) throw new Error(`Exportación falló (HTTP ${resp.status}).`);
-  const blob = await resp.blob();
-  const disp = resp.headers.get("Content-Disposition") ?? "";
-  const nombre = /filename="(.+?)"/.exec(disp)?.[1] ?? `exportbot.${tipo === "excel" ? "xlsx" : "pptx"}`;
-  const url = URL.createObjectURL(blob);
+export type FormatoExport = "excel" | "pptx" | "csv" | "parquet" | "arrow";
+
+const EXTENSION_EXPORT: Record<FormatoExport, string> = {
+  excel: "xlsx",
+  pptx: "pptx",
+  csv: "csv",
+  parquet: "parquet",
+  arrow: "arrow",
+};
+
+const SONDEO_TRABAJO_MS = 500;
+
+function bajar(href: string, nombre: string): void {
   const a = document.createElement("a");
-  a.href = url;
+  a.href = href;
   a.download = nombre;
   a.click();
+}
+
+/** POST por ``chat_id``; si el servidor ya no tiene el resultado (404), con las filas visibles. */
+async function pedirExporte(ruta: string, cuerpo: CuerpoExport): Promise<Response> {
+  const enviar = (datos: Partial<CuerpoExport>) =>
+    fetch(ruta, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ ...datos, session_id: sesion }),
+    });
+  const { columnas, filas, ...referencia } = cuerpo;
+  const resp = await enviar(referencia);
+  return resp.status === 404 ? enviar({ ...referencia, columnas, filas }) : resp;
+}
+
+/** Error de un exporte fallido; con 429 lleva el motivo del servidor y la espera sugerida. */
+async function errorExporte(resp: Response): Promise<Error> {
+  if (resp.status !== 429) return new Error(`Exportación falló (HTTP ${resp.status}).`);
+  const cuerpo = (await resp.json().catch(() => ({}))) as { detail?: string };
+  const espera = Number(resp.headers.get("Retry-After"));
+  const motivo = cuerpo.detail ?? "Hay demasiados exportes en curso.";
+  return new Error(espera ? `${motivo} (reintente en ${espera} s)` : motivo);
+}
+
+/**
+ * Excel o PPTX como trabajo en segundo plano: se sondea el progreso y, listo, se baja el
+ * archivo. Devuelve ``false`` si el servidor no ofrece trabajos (apagados, 503, o sin la
+ * ruta, 404) para que se use la ruta directa. Con la cola llena (429) no cae a la ruta
+ * directa, que generaría el archivo dentro del servidor justo bajo carga: se informa el
+ * motivo y la espera.
+ */
+async function exportarEnSegundoPlano(
+  tipo: "excel" | "pptx",
+  cuerpo: CuerpoExport,
+  alProgreso?: (progreso: number) => void,
+): Promise<boolean> {
+  const resp = await pedirExporte(`/api/exportar/trabajos/${tipo}`, cuerpo);
+  if (resp.status === 503 || resp.status === 404) return false;
+  if (!resp.ok) throw await errorExporte(resp);
+  let trabajo = (await resp.json()) as TrabajoExport;
+  while (trabajo.estado !== "listo") {
+    if (trabajo.estado === "error") throw new Error(trabajo.error || "No se pudo generar el archivo.");
+    alProgreso?.(trabajo.progreso);
+    await new Promise((r) => setTimeout(r, SONDEO_TRABAJO_MS));
+    const r = await fetch(`/api/exportar/trabajos/${trabajo.id}`);
+    if (!r.ok) throw new Error(`Exportación falló (HTTP ${r.status}).`);
+    trabajo = (await r.json()) as TrabajoExport;
+  }
+  bajar(`/api/exportar/trabajos/${trabajo.id}/archivo`, trabajo.nombre);
+  return true;
+}
+
+/**
+ * Descarga un archivo construido en el servidor (Excel, PPTX o datos: CSV, Parquet, Arrow).
+ *
+ * Se pide primero por ``chat_id`` (el servidor usa el resultado completo que ya guarda);
+ * solo si ya no lo tiene (404) se reenvían las filas visibles de la tarjeta. Excel y PPTX
+ * se generan como trabajo en segundo plano (``alProgreso`` recibe la fracción hecha).
+ */
+export async function exportar(
+  tipo: FormatoExport,
+  cuerpo: CuerpoExport,
+  alProgreso?: (progreso: number) => void,
+): Promise<void> {
+  if ((tipo === "excel" || tipo === "pptx") && (await exportarEnSegundoPlano(tipo, cuerpo, alProgreso))) return;
+  const resp = await pedirExporte(`/api/exportar/${tipo}`, cuerpo);
+  if (!resp.ok) throw await errorExporte(resp);
+  const blob = await resp.blob();
+  const disp = resp.headers.get("Content-Disposition") ?? "";
+  const nombre = /filename="(.+?)"/.exec(disp)?.[1] ?? `exportbot.${EXTENSION_EXPORT[tipo]}`;
+  const url = URL.createObjectURL(blob);
+  bajar(url, nombre);
   URL.revokeObjectURL(url);
 }
 
@@ -2,8 +2,9 @@
 
 import { FormEvent, useEffect, useRef, useState } from "react";
 import Icon from "../components/Icon";
-import { chatStream, enviarFeedback, exportar, listarProveedores } from "../api/cliente";
-import type { EventoFinal, Proveedor, Turno } from "../tipos";
+import { chatStream, enviarFeedback, exportar, listarProveedores, paginaResultado } from "../api/cliente";
+import type { FormatoExport } from "../api/cliente";
+import type { EventoResultado, Proveedor, Turno } from "../tipos";
 
 const SUGERENCIAS = [
   "¿Cuánto exportó Colombia en USD FOB en 2025?",
@@ -43,19 +44,40 @@ function esNumero(valor: unknown): valor is number {
   return typeof valor === "number" && Number.isFinite(valor);
 }
 
-function Tabla({ final }: { final: EventoFinal }) {
-  if (!final.columnas.length) return null;
+const FILAS_POR_PAGINA = 200;
+
+/** Tabla del resultado; con ``paginable``, trae del servidor las filas que no viajaron en el stream. */
+function Tabla({ datos, paginable = false }: { datos: Omit<EventoResultado, "tipo">; paginable?: boolean }) {
+  const [extra, setExtra] = useState<EventoResultado["filas"]>([]);
+  const [cargando, setCargando] = useState(false);
+  const [aviso, setAviso] = useState("");
+  if (!datos.columnas.length) return null;
+  const filas = extra.length ? [...datos.filas, ...extra] : datos.filas;
+
+  const verMas = async () => {
+    setCargando(true);
+    try {
+      const pagina = await paginaResultado(datos.chat_id, filas.length, FILAS_POR_PAGINA);
+      setExtra((previas) => [...previas, ...pagina.filas]);
+      setAviso("");
+    } catch (error) {
+      setAviso(error instanceof Error ? error.message : "No se pudieron traer más filas.");
+    } finally {
+      setCargando(false);
+    }
+  };
+
   return (
     <>
       <div className="tbl-scroll">
         <table className="res">
           <thead>
             <tr>
-              {final.columnas.map((columna) => <th key={columna}>{columna}</th>)}
+              {datos.columnas.map((columna) => <th key={columna}>{columna}</th>)}
             </tr>
           </thead>
           <tbody>
-            {final.filas.map((fila, indiceFila) => (
+            {filas.map((fila, indiceFila) => (
               <tr key={indiceFila}>
                 {fila.map((valor, indiceColumna) => (
                   <td key={indiceColumna} className={esNumero(valor) ? "tnum celda-num" : undefined}>
@@ -67,9 +89,15 @@ function Tabla({ final }: { final: EventoFinal }) {
           </tbody>
         </table>
       </div>
-      {final.truncado && (
+      {datos.truncado && (
         <div className="nota-truncado">
-          Mostrando {final.filas.length} de {final.n_filas} filas. La descarga incluye el resultado visible.
+          Mostrando {filas.length} de {datos.n_filas} filas. La descarga incluye el resultado completo.
+          {paginable && filas.length < datos.n_filas && (
+            <button className="btn btn-ghost btn-sm nota-truncado__mas" disabled={cargando} onClick={() => void verMas()}>
+              {cargando ? "Cargando…" : "Ver más filas"}
+            </button>
+          )}
+          {aviso && <span className="nota-truncado__aviso"> {aviso}</span>}
         </div>
       )}
     </>
@@ -84,20 +112,28 @@ interface TarjetaProps {
 
 function TarjetaRespuesta({ turno, onFeedback, onSugerencia }: TarjetaProps) {
   const final = turno.final;
-  const [exportando, setExportando] = useState<"" | "excel" | "pptx">("");
+  const [exportando, setExportando] = useState<"" | FormatoExport>("");
+  const [progreso, setProgreso] = useState(0);
   if (!final) return null;
 
-  const descargar = async (tipo: "excel" | "pptx") => {
+  const generando = progreso > 0 ? `Generando… ${Math.round(progreso * 100)} %` : "Generando…";
+
+  const descargar = async (tipo: FormatoExport) => {
     setExportando(tipo);
+    setProgreso(0);
     try {
-      await exportar(tipo, {
-        pregunta: turno.pregunta,
-        texto: final.texto,
-        sql: final.sql,
-        columnas: final.columnas,
-        filas: final.filas,
-        chat_id: final.chat_id,
-      });
+      await exportar(
+        tipo,
+        {
+          pregunta: turno.pregunta,
+          texto: final.texto,
+          sql: final.sql,
+          columnas: final.columnas,
+          filas: final.filas,
+          chat_id: final.chat_id,
+        },
+        setProgreso,
+      );
     } catch (error) {
       alert(error instanceof Error ? error.message : "No se pudo exportar el resultado.");
     } finally {
@@ -138,7 +174,7 @@ function TarjetaRespuesta({ turno, onFeedback, onSugerencia }: TarjetaProps) {
         </details>
       )}
 
-      <Tabla final={final} />
+      <Tabla datos={final} paginable />
 
       <div className="resultado-card__acciones">
         <div className="resultado-card__descargas">
@@ -146,11 +182,19 @@ function TarjetaRespuesta({ turno, onFeedback, onSugerencia }: TarjetaProps) {
             <>
               <button className="btn btn-export btn-sm" disabled={exportando !== ""} onClick={() => void descargar("excel")}>
                 <Icon name="download" size={14} />
-                {exportando === "excel" ? "Generando…" : "Descargar Excel"}
+                {exportando === "excel" ? generando : "Descargar Excel"}
               </button>
               <button className="btn btn-export btn-sm" disabled={exportando !== ""} onClick={() => void descargar("pptx")}>
                 <Icon name="presentation" size={14} />
-                {exportando === "pptx" ? "Generando…" : "Descargar presentación"}
+                {exportando === "pptx" ? generando : "Descargar presentación"}
+              </button>
+              <button className="btn btn-export btn-sm" disabled={exportando !== ""} onClick={() => void descargar("csv")}>
+                <Icon name="download" size={14} />
+                {exportando === "csv" ? "Generando…" : "CSV"}
+              </button>
+              <button className="btn btn-export btn-sm" disabled={exportando !== ""} onClick={() => void descargar("parquet")}>
+                <Icon name="download" size={14} />
+                {exportando === "parquet" ? "Generando…" : "Parquet"}
               </button>
             </>
           )}
@@ -197,18 +241,26 @@ function TarjetaRespuesta({ turno, onFeedback, onSugerencia }: TarjetaProps) {
 function Procesando({ turno }: { turno: Turno }) {
   const etapaActual = turno.etapas[turno.etapas.length - 1]?.detalle ?? "Preparando la consulta…";
   return (
-    <div className="card procesando-card" role="status" aria-live="polite">
-      <div className="procesando-card__fila">
-        <span className="spinner procesando-card__spinner" aria-hidden="true" />
-        <div>
-          <div className="procesando-card__titulo">
-            <Icon name="bolt" size={15} /> Procesando consulta
+    <>
+      <div className="card procesando-card" role="status" aria-live="polite">
+        <div className="procesando-card__fila">
+          <span className="spinner procesando-card__spinner" aria-hidden="true" />
+          <div>
+            <div className="procesando-card__titulo">
+              <Icon name="bolt" size={15} /> Procesando consulta
+            </div>
+            <div className="procesando-card__etapa">{etapaActual}</div>
           </div>
-          <div className="procesando-card__etapa">{etapaActual}</div>
         </div>
+        {turno.textoParcial && <p className="procesando-card__parcial">{turno.textoParcial}</p>}
+        <div className="procesando-card__barra"><span /></div>
       </div>
-      <div className="procesando-card__barra"><span /></div>
-    </div>
+      {turno.resultado && (
+        <div className="card resultado-card resultado-card--previo">
+          <Tabla datos={turno.resultado} />
+        </div>
+      )}
+    </>
   );
 }
 
@@ -246,7 +298,13 @@ export default function ChatPage() {
 
     try {
       await chatStream(limpia, proveedor, (evento) => {
-        if (evento.tipo === "etapa") actualizar((turno) => ({ ...turno, etapas: [...turno.etapas, evento] }));
+        if (evento.tipo === "etapa" && evento.etapa === "texto_parcial")
+          actualizar((turno) => ({
+            ...turno,
+            textoParcial: evento.reiniciar ? "" : (turno.textoParcial ?? "") + (evento.delta ?? ""),
+          }));
+        else if (evento.tipo === "etapa") actualizar((turno) => ({ ...turno, etapas: [...turno.etapas, evento] }));
+        else if (evento.tipo === "resultado") actualizar((turno) => ({ ...turno, resultado: evento }));
         else if (evento.tipo === "final") actualizar((turno) => ({ ...turno, final: evento }));
         else actualizar((turno) => ({ ...turno, error: evento.mensaje }));
       });
@@ -12,6 +12,11 @@ export interface MetaRespuesta {
   version_app: string;
   fuente_semantica: string;
   intentos: number;
+  cache?: boolean;
+  /** La respuesta se sirvió del flujo en curso de una pregunta idéntica. */
+  coalescida?: boolean;
+  proveedor_sql?: "analyst" | "verified";
+  confianza_sql?: number | null;
 }
 
 export interface EventoFinal {
@@ -33,20 +38,66 @@ export interface EventoEtapa {
   etapa: string;
   detalle: string;
   sql?: string;
+  /** Puesto en la cola de admisión (solo en `etapa: "cola"`). */
+  posicion?: number;
+  /** Trozo de la respuesta en redacción (solo en `etapa: "texto_parcial"`). */
+  delta?: string;
+  /** Descarta el texto parcial recibido hasta ahora (la redacción se corta o reinicia). */
+  reiniciar?: boolean;
 }
 
 export interface EventoError {
   tipo: "error";
   chat_id: string;
   mensaje: string;
+  /** Segundos sugeridos antes de reintentar (Snowflake con el circuito abierto). */
+  reintentar_en_s?: number;
 }
 
-export type EventoChat = EventoFinal | EventoEtapa | EventoError;
+/** Tabla del resultado, enviada apenas responde Snowflake (antes de la redacción). */
+export interface EventoResultado {
+  tipo: "resultado";
+  chat_id: string;
+  columnas: string[];
+  filas: Celda[][];
+  n_filas: number;
+  truncado: boolean;
+}
+
+/** Página de ``GET /api/resultados/{chat_id}`` (resultado completo guardado en el servidor). */
+export interface PaginaResultado {
+  chat_id: string;
+  columnas: string[];
+  filas: Celda[][];
+  offset: number;
+  limite: number;
+  total: number;
+  n_filas: number;
+  truncado: boolean;
+}
+
+export interface TrabajoExport {
+  id: string;
+  formato: string;
+  estado: "en_cola" | "generando" | "listo" | "error";
+  hechas: number;
+  total: number;
+  progreso: number;
+  nombre: string;
+  bytes: number;
+  error: string;
+}
+
+export type EventoChat = EventoFinal | EventoEtapa | EventoResultado | EventoError;
 
 export interface Turno {
   id: string;
   pregunta: string;
   etapas: EventoEtapa[];
+  /** Tabla recibida antes del final (se muestra mientras se redacta). */
+  resultado?: EventoResultado;
+  /** Prosa recibida en vivo mientras se redacta; la reemplaza el texto del final. */
+  textoParcial?: string;
   final?: EventoFinal;
   error?: string;
   enviandoFeedback?: boolean;
@@ -0,0 +1,122 @@
+"""Benchmark del Excel institucional: modo normal de openpyxl contra write-only.
+
+El modo normal es el motor anterior (un `Border`, relleno y formato nuevos
+por celda, todo el libro en memoria hasta ``wb.save``); se conserva aquí
+solo como referencia. El write-only es `exportadores.excel.escribir`, que
+recibe las filas desde un generador. Se mide la mediana del tiempo y el pico
+de memoria de Python (``tracemalloc``, en una corrida aparte).
+
+Uso:
+    python scripts/benchmark_excel.py
+    python scripts/benchmark_excel.py --filas 1000 10000 --columnas 12 --repeticiones 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "backend"
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from exportadores import ADVERTENCIA_LEGAL, AZUL_INSTITUCIONAL, excel
+
+
+def _modo_normal(sql: str, columnas: list[str], filas: list[list[Any]]) -> bytes:
+    """El motor anterior, celda a celda en modo normal (solo para comparar)."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Resultado"
+    etiqueta = Font(bold=True, size=10, color=AZUL_INSTITUCIONAL)
+    cab_fill = PatternFill("solid", fgColor=AZUL_INSTITUCIONAL)
+    cab_font = Font(bold=True, color="FFFFFF")
+    borde = Border(*(Side(style="thin", color="C9D2E0"),) * 4)
+    ws["A1"] = "ExportBot 2.0 · ProColombia — Cifras de exportaciones de bienes"
+    ws["A1"].font = Font(bold=True, size=14, color=AZUL_INSTITUCIONAL)
+    ws["A3"], ws["B3"], ws["A4"], ws["B4"] = "Pregunta:", "p", "Respuesta:", "t"
+    ws["A3"].font = ws["A4"].font = etiqueta
+    ws["B4"].alignment = Alignment(wrap_text=True, vertical="top")
+    for j, col in enumerate(columnas, start=1):
+        c = ws.cell(row=6, column=j, value=col)
+        c.fill, c.font, c.border = cab_fill, cab_font, borde
+    for i, fila in enumerate(filas, start=7):
+        for j, v in enumerate(fila, start=1):
+            c = ws.cell(row=i, column=j, value=v)
+            c.border = borde
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                c.number_format = "#,##0.00"
+    for j, col in enumerate(columnas, start=1):
+        ancho = max([len(str(col))] + [len(str(f[j - 1])) for f in filas[:200] if j - 1 < len(f)] + [10])
+        ws.column_dimensions[get_column_letter(j)].width = min(ancho + 2, 60)
+    fila_sql = 6 + len(filas) + 2
+    ws.cell(row=fila_sql, column=1, value="SQL ejecutada (auditoría):").font = etiqueta
+    ws.cell(row=fila_sql + 1, column=1, value=sql).alignment = Alignment(wrap_text=True, vertical="top")
+    ws.cell(row=fila_sql + 3, column=1, value=ADVERTENCIA_LEGAL).font = Font(italic=True, size=8)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _fila(i: int, columnas: int) -> list[Any]:
+    base: list[Any] = [f"PAIS_{i % 180}", i * 1234.56, 2020 + i % 6, f"2025-{1 + i % 12:02d}-01"]
+    return [base[c % len(base)] for c in range(columnas)]
+
+
+def _generador(filas: int, columnas: int) -> Iterator[list[Any]]:
+    return (_fila(i, columnas) for i in range(filas))
+
+
+def _write_only(filas: int, columnas: int, nombres: list[str]) -> int:
+    buf = io.BytesIO()
+    excel.escribir(buf, "p", "t", "SELECT 1", nombres, _generador(filas, columnas))
+    return buf.tell()
+
+
+def _medir(funcion: Callable[[], Any], repeticiones: int) -> tuple[float, float]:
+    """(mediana en ms, pico de memoria en MiB)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(tiempos) * 1000, pico / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--columnas", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    nombres = [f"C{c}" for c in range(args.columnas)]
+    print(f"{args.columnas} columnas, mediana de {args.repeticiones} (pico de memoria en una corrida aparte):")
+    print(f"{'filas':>8}  {'normal ms':>10} {'MiB':>7}  {'write-only ms':>13} {'MiB':>7}  {'x':>5}")
+    for n in args.filas:
+        datos = [_fila(i, args.columnas) for i in range(n)]
+        normal_ms, normal_mib = _medir(lambda d=datos: _modo_normal("SELECT 1", nombres, d), args.repeticiones)
+        wo_ms, wo_mib = _medir(lambda n=n: _write_only(n, args.columnas, nombres), args.repeticiones)
+        print(
+            f"{n:>8}  {normal_ms:>10.0f} {normal_mib:>7.1f}  {wo_ms:>13.0f} {wo_mib:>7.1f}  {normal_ms / wo_ms:>5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark de las láminas de tabla del PPTX: API de objetos contra DrawingML en bloque.
+
+La API de objetos es el motor anterior (texto, tamaño, color y relleno
+celda por celda con python-pptx); se conserva aquí solo como referencia.
+El motor en bloque es `exportadores.pptx._laminas_tabla`. Antes de medir se
+comprueba que las dos rutas dejan el mismo XML en cada tabla; se mide la
+mediana del tiempo de ``construir`` completo (portada, tablas, cierre y
+``prs.save``).
+
+Uso:
+    python scripts/benchmark_pptx.py
+    python scripts/benchmark_pptx.py --filas 30 100 500 --columnas 8 --repeticiones 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "backend"
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from lxml import etree
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.util import Inches, Pt
+
+from exportadores import pptx
+
+
+def _laminas_objetos(prs: Any, columnas: list[str], filas: list[list[Any]]) -> None:
+    """El motor anterior, celda a celda con la API de objetos (solo para comparar)."""
+    columnas = columnas[: pptx._MAX_COLUMNAS]
+    tope = pptx._FILAS_POR_LAMINA * pptx._MAX_LAMINAS_TABLA
+    for bloque in range(0, min(len(filas), tope), pptx._FILAS_POR_LAMINA):
+        trozo = filas[bloque : bloque + pptx._FILAS_POR_LAMINA]
+        lam = prs.slides.add_slide(prs.slide_layouts[6])
+        forma = lam.shapes.add_table(
+            rows=len(trozo) + 1,
+            cols=len(columnas),
+            left=Inches(0.4),
+            top=Inches(0.5),
+            width=prs.slide_width - Inches(0.8),
+            height=Inches(0.4) * (len(trozo) + 1),
+        )
+        tabla = forma.table
+        for j, col in enumerate(columnas):
+            celda = tabla.cell(0, j)
+            celda.text = str(col)
+            celda.fill.solid()
+            celda.fill.fore_color.rgb = pptx._AZUL
+            celda.text_frame.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
+            celda.text_frame.paragraphs[0].font.size = Pt(11)
+            celda.text_frame.paragraphs[0].font.bold = True
+        for i, fila in enumerate(trozo, start=1):
+            for j in range(len(columnas)):
+                v = fila[j] if j < len(fila) else ""
+                if isinstance(v, float):
+                    v = f"{v:,.2f}"
+                c = tabla.cell(i, j)
+                c.text = "" if v is None else str(v)
+                c.text_frame.paragraphs[0].font.size = Pt(10)
+
+
+def _fila(i: int, columnas: int) -> list[Any]:
+    base: list[Any] = [f"PAIS_{i % 180} & <Cía>", i * 1234.56, 2020 + i % 6, None, "línea 1\nlínea 2"]
+    return [base[c % len(base)] for c in range(columnas)]
+
+
+def _tablas(motor: Callable[..., None], nombres: list[str], datos: list[list[Any]]) -> list[bytes]:
+    prs = Presentation()
+    motor(prs, nombres, datos)
+    return [etree.tostring(lam.shapes[0]._element, method="c14n") for lam in prs.slides]
+
+
+def _medir(funcion: Callable[[], Any], repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return statistics.median(tiempos) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[30, 100, 500])
+    parser.add_argument("--columnas", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    nombres = [f"C{c}" for c in range(args.columnas)]
+    print(f"{args.columnas} columnas, {pptx._FILAS_POR_LAMINA} filas por lámina, mediana de {args.repeticiones}:")
+    print(f"{'filas':>6}  {'láminas':>7}  {'objetos ms':>10}  {'en bloque ms':>12}  {'x':>5}")
+    original = pptx._laminas_tabla
+    for n in args.filas:
+        datos = [_fila(i, args.columnas) for i in range(n)]
+        if _tablas(_laminas_objetos, nombres, datos) != _tablas(original, nombres, datos):
+            raise SystemExit("⛔ Los dos motores no dejan el mismo XML de tabla.")
+        en_bloque = _medir(lambda d=datos: pptx.construir("p", "t", "SELECT 1", nombres, d), args.repeticiones)
+        pptx._laminas_tabla = _laminas_objetos
+        try:
+            objetos = _medir(lambda d=datos: pptx.construir("p", "t", "SELECT 1", nombres, d), args.repeticiones)
+        finally:
+            pptx._laminas_tabla = original
+        laminas = -(-min(n, pptx._FILAS_POR_LAMINA * pptx._MAX_LAMINAS_TABLA) // pptx._FILAS_POR_LAMINA)
+        print(f"{n:>6}  {laminas:>7}  {objetos:>10.0f}  {en_bloque:>12.0f}  {objetos / en_bloque:>5.1f}")
+
+
+if __name__ == "__main__":
+    main()
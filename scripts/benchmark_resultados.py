@@ -0,0 +1,112 @@
+"""Micro-benchmark de la conversión de resultados de Snowflake (5 000 × 20 por defecto).
+
+Compara la conversión celda a celda (`_celda` con su cadena de ``isinstance``)
+contra la conversión por columna de `ejecutar_select_columnar`, con un cursor
+simulado que entrega tipos como el conector (Decimal, fechas, texto, enteros).
+
+Uso:
+    python scripts/benchmark_resultados.py
+    python scripts/benchmark_resultados.py --filas 20000 --columnas 30 --repeticiones 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import decimal
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "backend"
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from snowflake_.ejecutor import _celda, ejecutar_select_columnar
+
+# (type_code, escala, generador de valor por fila) — mezcla típica de FACT_EXPORTACIONES.
+_TIPOS: list[tuple[int, int | None, Callable[[int], Any]]] = [
+    (2, None, lambda i: f"PAIS_{i % 180}"),
+    (0, 2, lambda i: decimal.Decimal(i * 1234) / 100),
+    (0, 0, lambda i: i % 2025),
+    (3, None, lambda i: dt.date(2020 + i % 6, 1 + i % 12, 1)),
+    (1, None, lambda i: i * 0.5),
+]
+
+
+class _Cursor:
+    def __init__(self, filas: list[tuple[Any, ...]], descripcion: list[tuple[Any, ...]]) -> None:
+        self._filas = filas
+        self.description = descripcion
+
+    def execute(self, sql: str) -> None:
+        pass
+
+    def fetchmany(self, n: int) -> list[tuple[Any, ...]]:
+        lote, self._filas = self._filas[:n], self._filas[n:]
+        return lote
+
+    def close(self) -> None:
+        pass
+
+
+class _Conexion:
+    def __init__(self, cursor: _Cursor) -> None:
+        self._cursor = cursor
+
+    def cursor(self) -> _Cursor:
+        return self._cursor
+
+
+def _datos(filas: int, columnas: int) -> tuple[list[tuple[Any, ...]], list[tuple[Any, ...]]]:
+    tipos = [_TIPOS[c % len(_TIPOS)] for c in range(columnas)]
+    descripcion = [(f"C{c}", t, None, None, 38, escala, True) for c, (t, escala, _) in enumerate(tipos)]
+    crudas = [tuple(gen(i) for _, _, gen in tipos) for i in range(filas)]
+    return crudas, descripcion
+
+
+def _medir(funcion: Callable[[], Any], repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return statistics.median(tiempos) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=5000)
+    parser.add_argument("--columnas", type=int, default=20)
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    crudas, descripcion = _datos(args.filas, args.columnas)
+
+    def por_celda() -> list[list[Any]]:
+        return [[_celda(v) for v in fila] for fila in crudas]
+
+    def por_columna() -> Any:
+        return ejecutar_select_columnar(_Conexion(_Cursor(list(crudas), descripcion)), "", args.filas, args.lote)
+
+    def por_columna_con_filas() -> list[list[Any]]:
+        return por_columna().filas
+
+    if por_celda() != por_columna_con_filas():
+        raise SystemExit("⛔ Las dos rutas de conversión no dan las mismas filas.")
+    celda = _medir(por_celda, args.repeticiones)
+    columna = _medir(por_columna, args.repeticiones)
+    con_filas = _medir(por_columna_con_filas, args.repeticiones)
+    print(f"{args.filas} filas × {args.columnas} columnas, lote {args.lote}, mediana de {args.repeticiones}:")
+    print(f"  celda a celda (_celda)        {celda:8.1f} ms")
+    print(f"  por columna                   {columna:8.1f} ms  ({celda / columna:.1f}x)")
+    print(f"  por columna + vista por filas {con_filas:8.1f} ms  ({celda / con_filas:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+-- ============================================================================
+-- ExportBot 2.0 · TELEMETRÍA — stage interno para la carga masiva (opcional)
+-- ----------------------------------------------------------------------------
+-- Solo hace falta con TELEMETRIA_MODO=stage: EVENT_LOG y UI_EVENT llegan en
+-- archivos NDJSON comprimidos (PUT) y se cargan con COPY INTO por tabla cada
+-- TELEMETRIA_STAGE_INTERVALO_S. CHAT_LOG, DOWNLOAD_EVENT y FEEDBACK siguen
+-- por INSERT. Ejecutar DESPUÉS de sql/02_telemetria_v2_ddl.sql.
+--   SF_ESQUEMA_TELEMETRIA=DB_EXPORTBOT.TELEMETRY
+--   TELEMETRIA_STAGE=DB_EXPORTBOT.TELEMETRY.STG_TELEMETRIA   (valor por defecto)
+-- ============================================================================
+
+USE ROLE SYSADMIN;
+USE SCHEMA DB_EXPORTBOT.TELEMETRY;
+
+CREATE STAGE IF NOT EXISTS STG_TELEMETRIA
+  FILE_FORMAT = (TYPE = JSON)
+  COMMENT = 'Archivos NDJSON.gz de EVENT_LOG/UI_EVENT subidos por ExportBot (COPY ... PURGE = TRUE los borra al cargar)';
+
+-- PUT necesita WRITE y COPY INTO ... PURGE necesita READ + WRITE sobre el stage;
+-- el INSERT sobre las tablas ya lo otorga sql/02.
+GRANT READ, WRITE ON STAGE DB_EXPORTBOT.TELEMETRY.STG_TELEMETRIA TO ROLE R_EXPORTBOT_APP;
+
+-- Verificación: archivos pendientes y últimas cargas.
+-- LIST @DB_EXPORTBOT.TELEMETRY.STG_TELEMETRIA;
+-- SELECT * FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(
+--   TABLE_NAME => 'DB_EXPORTBOT.TELEMETRY.EVENT_LOG', START_TIME => DATEADD('hour', -1, CURRENT_TIMESTAMP())));